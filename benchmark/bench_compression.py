@@ -0,0 +1,99 @@
+"""Bytes and write capacity saved by compressing metadata and files, against the CPU cost of doing so.
+
+With --offload-threshold large attributes are moved to a blob store in a temporary directory instead.
+
+Run from the repository root: python -m benchmark.bench_compression
+"""
+import argparse
+import math
+import random
+import string
+import tempfile
+import time
+
+from benchmark.common import SRC_DIR  # noqa: F401
+
+from classes.FileBlobStore import FileBlobStore  # noqa: E402
+from classes.StorageCodec import StorageCodec, item_size  # noqa: E402
+
+
+def random_word(length):
+    return ''.join(random.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def realistic_item(file_count):
+    metadata = {
+        'creators': ['AUTHORITY_IDENTIFIER_' + str(counter) for counter in range(8)],
+        'handle': 'https://hdl.handle.net/11250.1/' + str(random.randint(1, 100000)),
+        'license': 'CC-BY-4.0',
+        'publicationYear': '2019',
+        'publisher': 'Unit',
+        'titles': {
+            'no': ' '.join(random_word(8) for _ in range(12)),
+            'en': ' '.join(random_word(8) for _ in range(12))
+        },
+        'type': 'text'
+    }
+    files = dict()
+    for counter in range(file_count):
+        files['FILE_IDENTIFIER_' + str(counter)] = {
+            'filename': random_word(10) + '.pdf',
+            'mimetype': 'application/pdf',
+            'checksum': '%032x' % random.getrandbits(128),
+            'size': str(random.randint(1000, 100000000))
+        }
+    return {
+        'resource_identifier': 'ebf20333-35a5-4a06-9c58-68ea688a9a8b',
+        'modifiedDate': '2019-10-24T12:57:02.655994Z',
+        'createdDate': '2019-10-24T12:57:02.655994Z',
+        'metadata': metadata,
+        'files': files,
+        'owner': 'owner@unit.no'
+    }
+
+
+def cpu_time(function, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        function()
+    return (time.process_time() - start) / iterations
+
+
+def run(file_counts, iterations, threshold, offload_threshold=0, blob_root=None):
+    codec = StorageCodec(threshold, blob_store=None if blob_root is None else FileBlobStore(blob_root),
+                         offload_threshold=offload_threshold)
+    results = []
+    for file_count in file_counts:
+        item = realistic_item(file_count)
+        encoded_item = codec.encode_item(item)
+        raw_size = item_size(item)
+        compressed_size = item_size(encoded_item)
+        results.append({
+            'name': '%s, %d files' % ('offload' if offload_threshold > 0 else 'compression', file_count),
+            'raw_bytes': raw_size,
+            'compressed_bytes': compressed_size,
+            'raw_wcu': math.ceil(raw_size / 1024),
+            'compressed_wcu': math.ceil(compressed_size / 1024),
+            'encode_ms': cpu_time(lambda: codec.encode_item(item), iterations) * 1000,
+            'decode_ms': cpu_time(lambda: codec.decode_item(encoded_item), iterations) * 1000
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--threshold', type=int, default=1024)
+    parser.add_argument('--offload-threshold', type=int, default=0)
+    parser.add_argument('--files', type=int, nargs='+', default=[1, 10, 100, 1000])
+    arguments = parser.parse_args()
+    with tempfile.TemporaryDirectory() as blob_root:
+        results = run(arguments.files, arguments.iterations, arguments.threshold, arguments.offload_threshold,
+                      blob_root if arguments.offload_threshold > 0 else None)
+    for result in results:
+        print('{name:<28} bytes {raw_bytes:>8} -> {compressed_bytes:>8}  WCU {raw_wcu:>4} -> {compressed_wcu:>4}  '
+              'encode {encode_ms:7.3f} ms  decode {decode_ms:7.3f} ms'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
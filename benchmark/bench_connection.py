@@ -0,0 +1,44 @@
+"""Per-call latency of the Lambda entry point with and without a reused connection.
+
+Run from the repository root: python -m benchmark.bench_connection
+"""
+import argparse
+
+from benchmark.common import setup_environment, create_table, insert_event, measure, summary, print_summary
+
+setup_environment()
+
+import boto3  # noqa: E402
+from moto import mock_dynamodb2  # noqa: E402
+
+import app  # noqa: E402
+from classes.RequestHandler import RequestHandler  # noqa: E402
+
+
+def run(iterations):
+    with mock_dynamodb2():
+        create_table(boto3.resource('dynamodb', region_name='eu-west-1'))
+        event = insert_event()
+
+        def new_handler_per_call():
+            RequestHandler().handler(event, None)
+
+        def reused_handler():
+            app.handler(event, None)
+
+        app.handler(event, None)
+        results = [summary('insert, new RequestHandler per call', measure(new_handler_per_call, iterations)),
+                   summary('insert, reused RequestHandler', measure(reused_handler, iterations))]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200)
+    arguments = parser.parse_args()
+    for result in run(arguments.iterations):
+        print_summary(result)
+
+
+if __name__ == '__main__':
+    main()
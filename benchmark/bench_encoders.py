@@ -0,0 +1,84 @@
+"""Encoding time of the schema-generated encoders against the previous hand-written ones.
+
+Run from the repository root: python -m benchmark.bench_encoders
+"""
+import argparse
+import json
+
+from benchmark.bench_compression import realistic_item
+from benchmark.common import measure, summary
+
+from common.encoders import encode_resource, iterencode_resource  # noqa: E402
+from common.helpers import remove_none_values  # noqa: E402
+from data.creator import Creator  # noqa: E402
+from data.file_metadata import FileMetadata  # noqa: E402
+from data.metadata import Metadata  # noqa: E402
+from data.resource import Resource  # noqa: E402
+
+
+def legacy_encode_file_metadata(instance):
+    if isinstance(instance, FileMetadata):
+        return remove_none_values({'filename': instance.filename, 'mimetype': instance.mime_type,
+                                   'checksum': instance.checksum, 'size': instance.size})
+    raise TypeError(instance.__class__.__name__)
+
+
+def legacy_encode_metadata(instance):
+    if isinstance(instance, Metadata):
+        creators = None
+        if instance.creators is not None:
+            creators = []
+            for creator in instance.creators:
+                if not isinstance(creator, Creator):
+                    raise TypeError(creator.__class__.__name__)
+                creators.append(creator.identifier)
+        titles = None
+        if instance.titles is not None:
+            titles = {key: value for key, value in instance.titles.items() if value is not None} or None
+        return remove_none_values({'creators': creators, 'handle': instance.handle,
+                                   'license': instance.license_identifier,
+                                   'publicationYear': instance.publication_year, 'publisher': instance.publisher,
+                                   'titles': titles, 'type': instance.resource_type})
+    raise TypeError(instance.__class__.__name__)
+
+
+def legacy_encode_resource(instance):
+    files = dict()
+    for key, value in instance.files.items():
+        files[key] = legacy_encode_file_metadata(value)
+    return remove_none_values({
+        'resource_identifier': instance.resource_identifier,
+        'modifiedDate': instance.modified_date,
+        'createdDate': instance.created_date,
+        'metadata': legacy_encode_metadata(instance.metadata),
+        'files': files,
+        'owner': instance.owner,
+        'status': instance.status,
+        'publishedDate': instance.published_date,
+        'indexedDate': instance.indexed_date
+    })
+
+
+def run(file_counts, iterations):
+    results = []
+    for file_count in file_counts:
+        resource = Resource.from_dict(realistic_item(file_count))
+        for name, function in (('hand-written', lambda: legacy_encode_resource(resource)),
+                               ('generated', lambda: encode_resource(resource)),
+                               ('hand-written + dumps', lambda: json.dumps(legacy_encode_resource(resource))),
+                               ('streamed', lambda: ''.join(iterencode_resource(resource)))):
+            results.append(summary('%s, %d files' % (name, file_count), measure(function, iterations)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--files', type=int, nargs='+', default=[10, 1000, 10000])
+    arguments = parser.parse_args()
+    for result in run(arguments.files, arguments.iterations):
+        print('{name:<34} mean={mean_ms:9.3f} ms  p50={p50_ms:9.3f} ms  p99={p99_ms:9.3f} ms'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
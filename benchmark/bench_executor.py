@@ -0,0 +1,52 @@
+"""Throughput of batch writes as the number of executor workers grows.
+
+The table is a stand-in whose batch_write_item sleeps for a fixed latency, like a round trip to DynamoDB, so the
+scaling of the executor is measured rather than the speed of moto.
+
+Run from the repository root: python -m benchmark.bench_executor
+"""
+import argparse
+import time
+
+from benchmark.common import measure, summary
+
+from classes.BoundedExecutor import BoundedExecutor  # noqa: E402
+from common.batch import batch_write, put_requests  # noqa: E402
+
+
+class SlowDynamoDB:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def batch_write_item(self, RequestItems):
+        time.sleep(self.latency)
+        return {'UnprocessedItems': {}}
+
+
+def run(worker_counts, item_count, latency, iterations):
+    dynamodb = SlowDynamoDB(latency)
+    requests = put_requests([{'resource_identifier': str(index)} for index in range(item_count)])
+    results = []
+    for workers in worker_counts:
+        with BoundedExecutor(workers) as executor:
+            result = summary('batch write, %d workers' % workers, measure(
+                lambda: batch_write(dynamodb, 'benchmark', requests, executor=executor), iterations))
+        result['items_per_second'] = item_count / (result['mean_ms'] / 1000)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=10)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    arguments = parser.parse_args()
+    for result in run(arguments.workers, arguments.items, arguments.latency_ms / 1000, arguments.iterations):
+        print('{name:<28} mean={mean_ms:9.3f} ms  p99={p99_ms:9.3f} ms  {items_per_second:10.0f} items/s'
+              .format(**result))
+
+
+if __name__ == '__main__':
+    main()
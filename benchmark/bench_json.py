@@ -0,0 +1,73 @@
+"""Throughput of parsing request bodies and encoding response bodies with each JSON backend.
+
+Run from the repository root: python -m benchmark.bench_json
+"""
+import argparse
+import json
+import time
+
+from benchmark.bench_compression import realistic_item
+from benchmark.common import SRC_DIR  # noqa: F401
+
+from classes.JsonCodec import JsonCodec, available_backends  # noqa: E402
+from classes.RequestHandler import slim_response  # noqa: E402
+
+FULL_RESPONSE = {
+    'ResponseMetadata': {
+        'RequestId': 'R5J8O8TJ5EFQ8K9JHGD2OVMLC7VV4KQNSO5AEMVJF66Q9ASUAAJG',
+        'HTTPStatusCode': 200,
+        'HTTPHeaders': {
+            'server': 'Server',
+            'date': 'Thu, 24 Oct 2019 12:57:02 GMT',
+            'content-type': 'application/x-amz-json-1.0',
+            'content-length': '2',
+            'connection': 'keep-alive',
+            'x-amzn-requestid': 'R5J8O8TJ5EFQ8K9JHGD2OVMLC7VV4KQNSO5AEMVJF66Q9ASUAAJG',
+            'x-amz-crc32': '2745614147'
+        },
+        'RetryAttempts': 0
+    },
+    'resource_identifier': 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+}
+
+
+def throughput(function, data_size, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed, data_size * iterations / elapsed / 1024 / 1024
+
+
+def run(file_counts, iterations):
+    results = []
+    for backend in available_backends():
+        json_codec = JsonCodec(backend)
+        for file_count in file_counts:
+            item = realistic_item(file_count)
+            body = json.dumps({'operation': 'MODIFY', 'resource': item})
+            operations, megabytes = throughput(lambda: json_codec.loads(body), len(body), iterations)
+            results.append({'name': '%s parse, %d files' % (backend, file_count), 'bytes': len(body),
+                            'operations': operations, 'megabytes': megabytes})
+            operations, megabytes = throughput(lambda: json_codec.dumps(item), len(body), iterations)
+            results.append({'name': '%s encode, %d files' % (backend, file_count), 'bytes': len(body),
+                            'operations': operations, 'megabytes': megabytes})
+        for name, envelope in (('full', FULL_RESPONSE), ('slim', slim_response(realistic_item(0)))):
+            size = len(json_codec.dumps(envelope))
+            operations, megabytes = throughput(lambda: json_codec.dumps(envelope), size, iterations)
+            results.append({'name': '%s encode, %s envelope' % (backend, name), 'bytes': size,
+                            'operations': operations, 'megabytes': megabytes})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--files', type=int, nargs='+', default=[1, 10, 100])
+    arguments = parser.parse_args()
+    for result in run(arguments.files, arguments.iterations):
+        print('{name:<32} bytes {bytes:>8}  {operations:12.0f} ops/s  {megabytes:8.1f} MB/s'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
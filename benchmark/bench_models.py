@@ -0,0 +1,49 @@
+"""Decode time and memory of resources with large files maps, as plain dicts and as slot-based models.
+
+Run from the repository root: python -m benchmark.bench_models
+"""
+import argparse
+import copy
+import tracemalloc
+
+from benchmark.bench_compression import realistic_item
+from benchmark.common import measure, summary
+
+from common.constants import Constants  # noqa: E402
+from data.resource import Resource  # noqa: E402
+
+
+def peak_bytes(function):
+    tracemalloc.start()
+    value = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del value
+    return size
+
+
+def run(file_counts, iterations):
+    results = []
+    for file_count in file_counts:
+        item = realistic_item(file_count)
+        for name, function in (('dict', lambda: copy.deepcopy(item)),
+                               ('strict', lambda: Resource.from_dict(item, Constants.DECODE_MODE_STRICT)),
+                               ('lenient', lambda: Resource.from_dict(item, Constants.DECODE_MODE_LENIENT))):
+            result = summary('%s, %d files' % (name, file_count), measure(function, iterations))
+            result['kilobytes'] = peak_bytes(function) / 1024
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--files', type=int, nargs='+', default=[10, 1000, 10000])
+    arguments = parser.parse_args()
+    for result in run(arguments.files, arguments.iterations):
+        print('{name:<24} mean={mean_ms:9.3f} ms  p99={p99_ms:9.3f} ms  {kilobytes:10.1f} KiB retained'
+              .format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Latency of INSERT, MODIFY and GET through the handler on each storage engine.
+
+On moto most of the time is spent emulating DynamoDB. The memory and SQLite engines show what the handler itself
+costs, and what the same requests cost with the versions on local disk.
+
+Run from the repository root: python -m benchmark.bench_storage
+"""
+import argparse
+import json
+
+from benchmark.common import setup_environment, create_table, insert_event, modify_event, measure, summary, \
+    print_summary
+
+setup_environment()
+
+import boto3  # noqa: E402
+from moto import mock_dynamodb2  # noqa: E402
+
+from classes.MemoryStorage import MemoryStorage  # noqa: E402
+from classes.RequestHandler import RequestHandler  # noqa: E402
+from classes.SqliteStorage import SqliteStorage  # noqa: E402
+from common.constants import Constants  # noqa: E402
+
+
+def handler_timings(name, request_handler, iterations):
+    resource_identifier = json.loads(request_handler.handler(insert_event(), None)[Constants.RESPONSE_BODY])[
+        Constants.DDB_FIELD_RESOURCE_IDENTIFIER]
+    get_event = {
+        'body': json.dumps({
+            Constants.JSON_ATTRIBUTE_NAME_OPERATION: Constants.OPERATION_GET,
+            Constants.JSON_ATTRIBUTE_NAME_RESOURCE: {Constants.DDB_FIELD_RESOURCE_IDENTIFIER: resource_identifier},
+            Constants.JSON_ATTRIBUTE_NAME_CONSISTENT_READ: True
+        })
+    }
+    return [
+        summary('insert, ' + name, measure(lambda: request_handler.handler(insert_event(), None), iterations)),
+        summary('modify, ' + name, measure(
+            lambda: request_handler.handler(modify_event(resource_identifier), None), iterations)),
+        summary('get, ' + name, measure(lambda: request_handler.handler(get_event, None), iterations))
+    ]
+
+
+def run(iterations, sqlite_path):
+    with mock_dynamodb2():
+        dynamodb = boto3.resource('dynamodb', region_name='eu-west-1')
+        create_table(dynamodb)
+        results = handler_timings('moto', RequestHandler(dynamodb), iterations)
+    results.extend(handler_timings('memory', RequestHandler(storage=MemoryStorage()), iterations))
+    storage = SqliteStorage(sqlite_path)
+    results.extend(handler_timings('sqlite', RequestHandler(storage=storage), iterations))
+    storage.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--sqlite-path', default=Constants.DEFAULT_SQLITE_PATH)
+    arguments = parser.parse_args()
+    for result in run(arguments.iterations, arguments.sqlite_path):
+        print_summary(result)
+
+
+if __name__ == '__main__':
+    main()
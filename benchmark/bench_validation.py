@@ -0,0 +1,38 @@
+"""Throughput of validating resources with large files maps against the compiled schema.
+
+Run from the repository root: python -m benchmark.bench_validation
+"""
+import argparse
+
+from benchmark.bench_compression import realistic_item
+from benchmark.common import measure, summary
+
+from common.constants import Constants  # noqa: E402
+from common.validator import validate_resource  # noqa: E402
+from data.resource import Resource  # noqa: E402
+
+
+def run(file_counts, iterations):
+    results = []
+    for file_count in file_counts:
+        item = realistic_item(file_count)
+        resource = Resource.from_dict(item)
+        result = summary('validate, %d files' % file_count,
+                         measure(lambda: validate_resource(Constants.OPERATION_MODIFY, resource), iterations))
+        result['files_per_second'] = file_count / (result['mean_ms'] / 1000)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--files', type=int, nargs='+', default=[10, 1000, 10000])
+    arguments = parser.parse_args()
+    for result in run(arguments.files, arguments.iterations):
+        print('{name:<28} mean={mean_ms:9.3f} ms  p99={p99_ms:9.3f} ms  {files_per_second:12.0f} files/s'
+              .format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import os
+import statistics
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from common.constants import Constants  # noqa: E402
+
+TABLE_NAME = 'benchmark'
+REGION = 'eu-west-1'
+
+
+def setup_environment():
+    os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+    os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+    os.environ['AWS_SECURITY_TOKEN'] = 'testing'
+    os.environ['AWS_SESSION_TOKEN'] = 'testing'
+    os.environ[Constants.ENV_VAR_TABLE_NAME] = TABLE_NAME
+    os.environ[Constants.ENV_VAR_REGION] = REGION
+
+
+def create_table(dynamodb):
+    return dynamodb.create_table(TableName=os.environ[Constants.ENV_VAR_TABLE_NAME],
+                                 KeySchema=[{'AttributeName': 'resource_identifier', 'KeyType': 'HASH'},
+                                            {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                                 AttributeDefinitions=[
+                                     {'AttributeName': 'resource_identifier', 'AttributeType': 'S'},
+                                     {'AttributeName': 'modifiedDate', 'AttributeType': 'S'},
+                                     {'AttributeName': 'latestOwner', 'AttributeType': 'S'}],
+                                 GlobalSecondaryIndexes=[
+                                     {'IndexName': 'OwnerIndex',
+                                      'KeySchema': [{'AttributeName': 'latestOwner', 'KeyType': 'HASH'},
+                                                    {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                                      'Projection': {'ProjectionType': 'ALL'},
+                                      'ProvisionedThroughput': {'ReadCapacityUnits': 1, 'WriteCapacityUnits': 1}}],
+                                 ProvisionedThroughput={'ReadCapacityUnits': 1, 'WriteCapacityUnits': 1})
+
+
+def insert_event(title='En tittel'):
+    return {
+        'body': '{"operation": "INSERT", "resource": {"owner": "owner@unit.no", "files": {}, '
+                '"metadata": {"titles": {"no": "' + title + '"}}}}'
+    }
+
+
+def modify_event(resource_identifier, title='En tittel'):
+    return {
+        'body': '{"operation": "MODIFY", "resource": {"resource_identifier": "' + resource_identifier + '", '
+                '"owner": "owner@unit.no", "files": {}, "metadata": {"titles": {"no": "' + title + '"}}}}'
+    }
+
+
+def measure(function, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summary(name, timings):
+    ordered = sorted(timings)
+    return {
+        'name': name,
+        'iterations': len(timings),
+        'mean_ms': statistics.mean(timings) * 1000,
+        'p50_ms': ordered[len(ordered) // 2] * 1000,
+        'p99_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+    }
+
+
+def print_summary(result):
+    print('{name:<40} n={iterations:<6} mean={mean_ms:8.3f} ms  p50={p50_ms:8.3f} ms  p99={p99_ms:8.3f} ms'
+          .format(**result))
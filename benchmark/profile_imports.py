@@ -0,0 +1,61 @@
+"""Import-time profile of the Lambda entry point, grouped by top-level package.
+
+Each run imports app in a fresh interpreter with python -X importtime and the median over the runs is reported, so
+the profile is reproducible enough to track cold-start cost between commits.
+
+Run from the repository root: python -m benchmark.profile_imports [--runs 5] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmark.common import SRC_DIR
+
+
+def import_profile():
+    """Returns the microseconds spent importing each top-level package, excluding what it imports itself."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=SRC_DIR, check=True,
+                            capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=SRC_DIR)).stderr
+    packages = dict()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_time)
+    return packages
+
+
+def run(runs):
+    profiles = [import_profile() for _ in range(runs)]
+    packages = set().union(*profiles)
+    medians = {package: statistics.median(profile.get(package, 0) for profile in profiles) for package in packages}
+    total = statistics.median(sum(profile.values()) for profile in profiles)
+    return {
+        'runs': runs,
+        'total_ms': total / 1000,
+        'packages': [{'package': package, 'ms': medians[package] / 1000}
+                     for package in sorted(medians, key=medians.get, reverse=True)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--json', action='store_true', help='Print the whole profile as JSON')
+    arguments = parser.parse_args()
+    profile = run(arguments.runs)
+    if arguments.json:
+        print(json.dumps(profile, indent=2))
+        return
+    print('import app: {total_ms:.1f} ms, median of {runs} runs'.format(**profile))
+    for entry in profile['packages'][:arguments.top]:
+        print('  {package:<32} {ms:8.1f} ms'.format(**entry))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Benchmark suite for the request path, with machine-readable results and regression checks against a baseline.
+
+Run from the repository root:
+
+    python -m benchmark.run --output baseline.json
+    python -m benchmark.run --compare baseline.json --threshold 0.2
+
+Cases are compared on their mean time. The run exits with status 1 when a case is slower than the baseline by more
+than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmark.common import SRC_DIR, setup_environment, create_table, insert_event, modify_event, measure, summary
+
+SUITES = ('import', 'handler', 'versions', 'encoders', 'models', 'validation')
+IMPORT_APP = 'import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)'
+
+
+def import_timings(iterations):
+    timings = []
+    for _ in range(iterations):
+        output = subprocess.run([sys.executable, '-c', IMPORT_APP], cwd=SRC_DIR, check=True, capture_output=True,
+                                text=True, env=dict(os.environ, PYTHONPATH=SRC_DIR)).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return [summary('import app, cold', timings)]
+
+
+def handler_timings(iterations):
+    setup_environment()
+    import boto3
+    from moto import mock_dynamodb2
+    from classes.RequestHandler import RequestHandler
+
+    with mock_dynamodb2():
+        create_table(boto3.resource('dynamodb', region_name='eu-west-1'))
+        request_handler = RequestHandler()
+        response = request_handler.handler(insert_event(), None)
+        resource_identifier = json.loads(response['body'])['resource_identifier']
+        return [summary('handler INSERT', measure(lambda: request_handler.handler(insert_event(), None), iterations)),
+                summary('handler MODIFY', measure(
+                    lambda: request_handler.handler(modify_event(resource_identifier), None), iterations))]
+
+
+def version_timings(iterations, version_counts):
+    setup_environment()
+    import boto3
+    from moto import mock_dynamodb2
+    from classes.RequestHandler import RequestHandler
+
+    results = []
+    with mock_dynamodb2():
+        create_table(boto3.resource('dynamodb', region_name='eu-west-1'))
+        request_handler = RequestHandler()
+        for version_count in version_counts:
+            response = request_handler.handler(insert_event(), None)
+            resource_identifier = json.loads(response['body'])['resource_identifier']
+            event = modify_event(resource_identifier)
+            for _ in range(version_count - 1):
+                request_handler.handler(event, None)
+            results.append(summary('handler MODIFY, %d versions' % version_count,
+                                   measure(lambda: request_handler.handler(event, None), iterations)))
+    return results
+
+
+def run(suites, iterations, file_counts, version_counts):
+    results = []
+    if 'import' in suites:
+        results += import_timings(max(3, iterations // 10))
+    if 'handler' in suites:
+        results += handler_timings(iterations)
+    if 'versions' in suites:
+        results += version_timings(iterations, version_counts)
+    if 'encoders' in suites:
+        from benchmark import bench_encoders
+        results += bench_encoders.run(file_counts, iterations)
+    if 'models' in suites:
+        from benchmark import bench_models
+        results += bench_models.run(file_counts, iterations)
+    if 'validation' in suites:
+        from benchmark import bench_validation
+        results += bench_validation.run(file_counts, iterations)
+    return results
+
+
+def compare(baseline, results, threshold):
+    """Returns the cases whose mean time grew by more than threshold, as a fraction of the baseline."""
+    baseline_means = {result['name']: result['mean_ms'] for result in baseline['results']}
+    regressions = []
+    for result in results:
+        baseline_mean = baseline_means.get(result['name'])
+        if baseline_mean is not None and baseline_mean > 0:
+            change = result['mean_ms'] / baseline_mean - 1
+            if change > threshold:
+                regressions.append({'name': result['name'], 'baseline_ms': baseline_mean,
+                                     'mean_ms': result['mean_ms'], 'change': change})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--files', type=int, nargs='+', default=[10, 1000])
+    parser.add_argument('--versions', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--output', help='Write the results as JSON to this file instead of standard output')
+    parser.add_argument('--compare', help='Baseline results written by an earlier run with --output')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed slowdown against the baseline as a fraction, default 0.2')
+    arguments = parser.parse_args()
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'iterations': arguments.iterations,
+        'results': run(arguments.suites, arguments.iterations, arguments.files, arguments.versions)
+    }
+    if arguments.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(arguments.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    if arguments.compare is not None:
+        with open(arguments.compare) as baseline_file:
+            regressions = compare(json.load(baseline_file), report['results'], arguments.threshold)
+        for regression in regressions:
+            print('REGRESSION {name}: {baseline_ms:.3f} ms -> {mean_ms:.3f} ms ({change:+.0%})'.format(**regression),
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,47 @@
+from classes.RecordBatchHandler import RecordBatchHandler
 from classes.RequestHandler import RequestHandler
 from common.constants import Constants
+from common.helpers import env_bool
+
+request_handler = None
+record_batch_handler = None
+
+
+def get_request_handler():
+    global request_handler
+    if request_handler is None:
+        request_handler = RequestHandler()
+    return request_handler
+
+
+def get_record_batch_handler():
+    global record_batch_handler
+    if record_batch_handler is None:
+        record_batch_handler = RecordBatchHandler(get_request_handler())
+    return record_batch_handler
+
+
+def prewarm():
+    """Builds the handler and its DynamoDB connection while the container initialises, so the first request does
+    not pay for loading the service model.
+    """
+    get_request_handler().storage.prewarm()
 
 
 def handler(event, context):
     if event is None:
         raise ValueError(Constants.ERROR_MISSING_EVENT)
     else:
-        request_handler = RequestHandler()
-        return request_handler.handler(event, context)
+        return get_request_handler().handler(event, context)
+
+
+def batch_handler(event, context):
+    """Entry point for SQS and Kinesis event sources, reports the records to retry as batchItemFailures."""
+    if event is None:
+        raise ValueError(Constants.ERROR_MISSING_EVENT)
+    else:
+        return get_record_batch_handler().handler(event, context)
+
+
+if env_bool(Constants.ENV_VAR_PREWARM, Constants.DEFAULT_PREWARM):
+    prewarm()
@@ -0,0 +1,19 @@
+class BlobStore:
+    """Content-addressed storage of attribute bodies too large to keep in an item.
+
+    A blob is stored under the SHA-256 digest of its content, so storing the same content again is a no-op and every
+    version with unchanged content shares one blob. Blobs are never changed once written, and never deleted: no
+    tool tracks which blobs the versions in the table still point to. FileBlobStore keeps them on a local or mounted
+    filesystem.
+    """
+
+    def exists(self, digest):
+        raise NotImplementedError
+
+    def put(self, digest, data):
+        """Stores data under digest. Readers never see a partly written blob."""
+        raise NotImplementedError
+
+    def open(self, digest):
+        """Returns a binary file object to stream the blob from, or raises BlobError if there is none."""
+        raise NotImplementedError
@@ -0,0 +1,111 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+
+
+class Call:
+    __slots__ = ('function', 'args', 'started', 'clock')
+
+    def __init__(self, function, args, clock):
+        self.function = function
+        self.args = args
+        self.started = None
+        self.clock = clock
+
+    def run(self):
+        self.started = self.clock()
+        return self.function(*self.args)
+
+
+class BoundedExecutor:
+    """Thread pool for independent DynamoDB calls of one multi-resource operation.
+
+    At most max_pending calls are queued or running at any time, submit() blocks until one finishes, so a large
+    operation never holds more than that in memory. map() returns results in input order. A call that has been
+    running for longer than timeout seconds makes its result raise TimeoutError; the thread is not interrupted and
+    keeps its slot until the call returns. With max_workers of 1 or less calls run on the calling thread. Every call
+    runs in a copy of the submitter's context, so context variables such as the request's metrics carry over.
+
+    The workers share the caller's boto3 client and with it its connection pool, so max_workers should not exceed
+    DDB_MAX_POOL_CONNECTIONS. Calls must not submit to the executor that runs them.
+    """
+
+    def __init__(self, max_workers, max_pending=None, timeout=None, clock=time.monotonic):
+        self.max_workers = max_workers
+        self.max_pending = max(1, max_pending if max_pending is not None else 2 * max_workers)
+        self.timeout = timeout if timeout else None
+        self.clock = clock
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.pool = None
+        self.lock = threading.Lock()
+
+    @property
+    def inline(self):
+        return self.max_workers <= 1
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='BoundedExecutor')
+            return self.pool
+
+    def submit_call(self, function, args):
+        call = Call(function, args, self.clock)
+        if self.inline:
+            future = Future()
+            try:
+                future.set_result(call.run())
+            except Exception as e:
+                future.set_exception(e)
+            return future, call
+        self.slots.acquire()
+        try:
+            future = self.get_pool().submit(contextvars.copy_context().run, call.run)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future, call
+
+    def submit(self, function, *args):
+        return self.submit_call(function, args)[0]
+
+    def result(self, future, call):
+        if self.timeout is None or future.done():
+            return future.result()
+        while True:
+            started = call.started
+            wait = self.timeout if started is None else started + self.timeout - self.clock()
+            try:
+                return future.result(timeout=max(wait, 0))
+            except TimeoutError:
+                if call.started is not None and self.clock() - call.started >= self.timeout:
+                    raise TimeoutError('Call did not finish within ' + str(self.timeout) + ' seconds')
+
+    def map(self, function, iterable):
+        """Yields function(item) for every item in input order, reading ahead at most max_pending items."""
+        pending = deque()
+        try:
+            for item in iterable:
+                if len(pending) >= self.max_pending:
+                    yield self.result(*pending.popleft())
+                pending.append(self.submit_call(function, (item,)))
+            while pending:
+                yield self.result(*pending.popleft())
+        finally:
+            for future, _ in pending:
+                future.cancel()
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
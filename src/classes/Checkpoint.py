@@ -0,0 +1,32 @@
+import json
+import os
+import threading
+
+
+class Checkpoint:
+    """Progress of a segmented scan, stored as JSON so an interrupted job can resume where it stopped.
+
+    Each segment records the last key it finished, whether it is done and its counters. The file is replaced
+    atomically on every save. Without a path nothing is stored.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.segments = dict()
+        self.lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, encoding='utf-8') as checkpoint_file:
+                self.segments = json.load(checkpoint_file)
+
+    def segment(self, segment):
+        return dict(self.segments.get(str(segment), {}))
+
+    def save(self, segment, last_key, done, statistics):
+        with self.lock:
+            self.segments[str(segment)] = {'last_key': last_key, 'done': done, 'statistics': statistics}
+            if self.path is None:
+                return
+            temporary_path = self.path + '.tmp'
+            with open(temporary_path, 'w', encoding='utf-8') as checkpoint_file:
+                json.dump(self.segments, checkpoint_file, indent=2, sort_keys=True)
+            os.replace(temporary_path, self.path)
@@ -0,0 +1,61 @@
+import os
+
+import boto3
+from botocore.config import Config
+
+from common.constants import Constants
+from common.helpers import env_int, env_float, env_bool
+
+
+def client_config():
+    return Config(
+        max_pool_connections=env_int(Constants.ENV_VAR_DDB_MAX_POOL_CONNECTIONS,
+                                     Constants.DEFAULT_DDB_MAX_POOL_CONNECTIONS),
+        tcp_keepalive=env_bool(Constants.ENV_VAR_DDB_TCP_KEEPALIVE, Constants.DEFAULT_DDB_TCP_KEEPALIVE),
+        connect_timeout=env_float(Constants.ENV_VAR_DDB_CONNECT_TIMEOUT, Constants.DEFAULT_DDB_CONNECT_TIMEOUT),
+        read_timeout=env_float(Constants.ENV_VAR_DDB_READ_TIMEOUT, Constants.DEFAULT_DDB_READ_TIMEOUT)
+    )
+
+
+class ConnectionManager:
+    """Owns the boto3 session, DynamoDB resource and Table for the lifetime of a container.
+
+    Everything is built on first use and reused afterwards. The connection is rebuilt when
+    TABLE_NAME or REGION change. An injected resource is kept as is, only its Table is rebuilt.
+    """
+
+    def __init__(self, dynamodb=None):
+        self.injected_dynamodb = dynamodb
+        self.session = None
+        self.dynamodb = None
+        self.table = None
+        self.table_name = None
+        self.region = None
+
+    def connection_key(self):
+        return os.environ.get(Constants.ENV_VAR_TABLE_NAME), os.environ.get(Constants.ENV_VAR_REGION)
+
+    def is_stale(self):
+        return self.table is None or self.connection_key() != (self.table_name, self.region)
+
+    def connect(self):
+        table_name, region = self.connection_key()
+        if self.injected_dynamodb is not None:
+            self.dynamodb = self.injected_dynamodb
+        elif self.dynamodb is None or region != self.region:
+            self.session = boto3.session.Session()
+            self.dynamodb = self.session.resource('dynamodb', region_name=os.environ[Constants.ENV_VAR_REGION],
+                                                  config=client_config())
+        self.table = self.dynamodb.Table(table_name)
+        self.table_name = table_name
+        self.region = region
+
+    def get_resource(self):
+        if self.is_stale():
+            self.connect()
+        return self.dynamodb
+
+    def get_table(self):
+        if self.is_stale():
+            self.connect()
+        return self.table
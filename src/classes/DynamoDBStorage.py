@@ -0,0 +1,206 @@
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+from classes.Storage import Storage, concurrent_modification
+from common.batch import batch_write, put_requests
+from common.constants import Constants
+from common.exceptions import DuplicateRequestError
+from common.helpers import cancellation_codes, projection_expression
+
+
+def version_key_condition(resource_identifier, modified_from=None, modified_to=None):
+    key_condition = Key(Constants.DDB_FIELD_RESOURCE_IDENTIFIER).eq(resource_identifier)
+    if modified_from is not None and modified_to is not None:
+        key_condition = key_condition & Key(Constants.DDB_FIELD_MODIFIED_DATE).between(modified_from, modified_to)
+    elif modified_from is not None:
+        key_condition = key_condition & Key(Constants.DDB_FIELD_MODIFIED_DATE).gte(modified_from)
+    elif modified_to is not None:
+        key_condition = key_condition & Key(Constants.DDB_FIELD_MODIFIED_DATE).lte(modified_to)
+    return key_condition
+
+
+def idempotency_put(idempotency):
+    return {
+        'Put': {
+            'TableName': idempotency.table_name,
+            'Item': idempotency.record,
+            'ConditionExpression': 'attribute_not_exists(#key) OR #expires <= :now',
+            'ExpressionAttributeNames': {
+                '#key': Constants.DDB_FIELD_IDEMPOTENCY_KEY,
+                '#expires': Constants.DDB_FIELD_EXPIRES_AT
+            },
+            'ExpressionAttributeValues': {
+                ':now': idempotency.now
+            }
+        }
+    }
+
+
+def page(ddb_response):
+    return (ddb_response[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS],
+            ddb_response.get(Constants.DDB_RESPONSE_ATTRIBUTE_NAME_LAST_EVALUATED_KEY))
+
+
+class DynamoDBStorage(Storage):
+    """Stores versions in the table behind TABLE_NAME through the connection, and idempotency records in their own
+    table. Batch writes run on executor when one is given."""
+
+    def __init__(self, connection, executor=None):
+        self.connection = connection
+        self.executor = executor
+
+    @property
+    def table(self):
+        return self.connection.get_table()
+
+    def prewarm(self):
+        self.connection.get_table()
+
+    def instrument(self, metrics):
+        metrics.instrument(self.connection.get_resource().meta.client)
+
+    def put(self, item, idempotency=None):
+        if idempotency is None:
+            return self.table.put_item(Item=item)
+        try:
+            return self.connection.get_resource().meta.client.transact_write_items(
+                TransactItems=[
+                    {
+                        'Put': {
+                            'TableName': self.table.name,
+                            'Item': item,
+                            'ConditionExpression': 'attribute_not_exists(#identifier)',
+                            'ExpressionAttributeNames': {
+                                '#identifier': Constants.DDB_FIELD_RESOURCE_IDENTIFIER
+                            }
+                        }
+                    },
+                    idempotency_put(idempotency)
+                ]
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == Constants.DDB_ERROR_TRANSACTION_CANCELED:
+                raise DuplicateRequestError(idempotency.record[Constants.DDB_FIELD_IDEMPOTENCY_KEY])
+            raise
+
+    def modify(self, item, expected_modified_date, idempotency=None):
+        """Only the latest version carries latestOwner, which keeps the owner index sparse."""
+        transact_items = [
+            {
+                'Update': {
+                    'TableName': self.table.name,
+                    'Key': {
+                        Constants.DDB_FIELD_RESOURCE_IDENTIFIER: item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER],
+                        Constants.DDB_FIELD_MODIFIED_DATE: expected_modified_date
+                    },
+                    'UpdateExpression': 'SET #superseded = :modified REMOVE #latestOwner',
+                    'ConditionExpression': 'attribute_exists(#identifier) AND #created = :created '
+                                           'AND attribute_not_exists(#superseded)',
+                    'ExpressionAttributeNames': {
+                        '#identifier': Constants.DDB_FIELD_RESOURCE_IDENTIFIER,
+                        '#created': Constants.DDB_FIELD_CREATED_DATE,
+                        '#superseded': Constants.DDB_FIELD_SUPERSEDED_DATE,
+                        '#latestOwner': Constants.DDB_FIELD_LATEST_OWNER
+                    },
+                    'ExpressionAttributeValues': {
+                        ':modified': item[Constants.DDB_FIELD_MODIFIED_DATE],
+                        ':created': item[Constants.DDB_FIELD_CREATED_DATE]
+                    }
+                }
+            },
+            {
+                'Put': {
+                    'TableName': self.table.name,
+                    'Item': item,
+                    'ConditionExpression': 'attribute_not_exists(#identifier)',
+                    'ExpressionAttributeNames': {
+                        '#identifier': Constants.DDB_FIELD_RESOURCE_IDENTIFIER
+                    }
+                }
+            }
+        ]
+        if idempotency is not None:
+            transact_items.append(idempotency_put(idempotency))
+        try:
+            return self.connection.get_resource().meta.client.transact_write_items(TransactItems=transact_items)
+        except ClientError as e:
+            if e.response['Error']['Code'] == Constants.DDB_ERROR_TRANSACTION_CANCELED:
+                codes = cancellation_codes(e)
+                if idempotency is not None and len(codes) == len(transact_items) and \
+                        codes[-1] == Constants.DDB_CANCELLATION_CONDITIONAL_CHECK_FAILED:
+                    raise DuplicateRequestError(idempotency.record[Constants.DDB_FIELD_IDEMPOTENCY_KEY])
+                raise concurrent_modification(item, expected_modified_date)
+            raise
+
+    def query(self, resource_identifier, modified_from=None, modified_to=None, ascending=True, limit=None,
+              exclusive_start_key=None, consistent_read=False, attributes=None):
+        query_arguments = {
+            'KeyConditionExpression': version_key_condition(resource_identifier, modified_from, modified_to),
+            'ScanIndexForward': ascending,
+            'ConsistentRead': consistent_read
+        }
+        if limit is not None:
+            query_arguments['Limit'] = limit
+        if exclusive_start_key is not None:
+            query_arguments['ExclusiveStartKey'] = exclusive_start_key
+        if attributes is not None:
+            expression, names = projection_expression(attributes)
+            query_arguments['ProjectionExpression'] = expression
+            query_arguments['ExpressionAttributeNames'] = names
+        return page(self.table.query(**query_arguments))
+
+    def query_owner(self, owner, status=None, limit=None, exclusive_start_key=None):
+        query_arguments = {
+            'IndexName': Constants.DDB_INDEX_OWNER,
+            'KeyConditionExpression': Key(Constants.DDB_FIELD_LATEST_OWNER).eq(owner),
+            'ScanIndexForward': False
+        }
+        if limit is not None:
+            query_arguments['Limit'] = limit
+        if status is not None:
+            query_arguments['FilterExpression'] = Attr(Constants.DDB_FIELD_STATUS).eq(status)
+        if exclusive_start_key is not None:
+            query_arguments['ExclusiveStartKey'] = exclusive_start_key
+        return page(self.table.query(**query_arguments))
+
+    def scan(self, segment=0, total_segments=1, limit=None, exclusive_start_key=None):
+        scan_arguments = dict()
+        if total_segments > 1:
+            scan_arguments['Segment'] = segment
+            scan_arguments['TotalSegments'] = total_segments
+        if limit is not None:
+            scan_arguments['Limit'] = limit
+        if exclusive_start_key is not None:
+            scan_arguments['ExclusiveStartKey'] = exclusive_start_key
+        return page(self.table.scan(**scan_arguments))
+
+    def write_items(self, items):
+        unprocessed = batch_write(self.connection.get_resource(), self.table.name, put_requests(items),
+                                  executor=self.executor)
+        return [request[Constants.DDB_BATCH_PUT_REQUEST][Constants.DDB_BATCH_ITEM] for request in unprocessed]
+
+    def get_record(self, table_name, idempotency_key):
+        ddb_response = self.connection.get_resource().Table(table_name).get_item(
+            Key={Constants.DDB_FIELD_IDEMPOTENCY_KEY: idempotency_key},
+            ConsistentRead=True
+        )
+        return ddb_response.get('Item')
+
+    def update_record(self, table_name, idempotency_key, fingerprint, attributes):
+        names = {'#fingerprint': Constants.DDB_FIELD_FINGERPRINT}
+        values = {':fingerprint': fingerprint}
+        for position, (name, value) in enumerate(attributes.items()):
+            names['#attribute%d' % position] = name
+            values[':attribute%d' % position] = value
+        try:
+            self.connection.get_resource().Table(table_name).update_item(
+                Key={Constants.DDB_FIELD_IDEMPOTENCY_KEY: idempotency_key},
+                UpdateExpression='SET ' + ', '.join('#attribute%d = :attribute%d' % (position, position)
+                                                    for position in range(len(attributes))),
+                ConditionExpression='#fingerprint = :fingerprint',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
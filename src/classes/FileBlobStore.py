@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from classes.BlobStore import BlobStore
+from common.exceptions import BlobError
+
+
+class FileBlobStore(BlobStore):
+    """Keeps blobs as files below root, in directories named by the first two characters of their digest.
+
+    Blobs are written to a temporary file and renamed into place, so concurrent writers of the same content are safe.
+    Every container needs the same root, for example an EFS mount, for the blobs written by one to be read by another.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, digest, data):
+        path = self.path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.' + digest[:8])
+        try:
+            with os.fdopen(descriptor, 'wb') as blob_file:
+                blob_file.write(data)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def open(self, digest):
+        try:
+            return open(self.path(digest), 'rb')
+        except FileNotFoundError:
+            raise BlobError('Blob ' + digest + ' not found')
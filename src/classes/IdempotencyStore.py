@@ -0,0 +1,66 @@
+import hashlib
+import json
+import time
+
+from common.constants import Constants
+
+
+def request_fingerprint(operation, resource):
+    """Identifies the request an idempotency key was first used for, so reusing the key for another one is caught."""
+    canonical = json.dumps([operation, resource], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class IdempotencyWrite:
+    """An idempotency record to store in the same atomic write as a version, unless a live record has its key."""
+    __slots__ = ('table_name', 'record', 'now')
+
+    def __init__(self, table_name, record, now):
+        self.table_name = table_name
+        self.record = record
+        self.now = now
+
+
+class IdempotencyStore:
+    """Records the outcome of INSERT and MODIFY requests that carry an idempotency key.
+
+    A record is written in the same transaction as the resource version it describes, on the condition that no live
+    record with the same key exists, so at most one of several concurrent duplicates writes anything. Records expire
+    ttl seconds after they were written through DynamoDB TTL on expiresAt. TTL deletion is lazy, so expired records
+    that are still stored are ignored and may be overwritten.
+    """
+
+    def __init__(self, storage, table_name=None, ttl=Constants.DEFAULT_IDEMPOTENCY_TTL_SECONDS, clock=time.time):
+        self.storage = storage
+        self.table_name = table_name
+        self.ttl = ttl
+        self.clock = clock
+
+    @property
+    def enabled(self):
+        return self.table_name is not None
+
+    def get(self, idempotency_key):
+        record = self.storage.get_record(self.table_name, idempotency_key)
+        if record is None or record[Constants.DDB_FIELD_EXPIRES_AT] <= int(self.clock()):
+            return None
+        return record
+
+    def record(self, idempotency_key, fingerprint, operation, status_code, item):
+        record = {field: item[field] for field in Constants.DDB_IDEMPOTENCY_RESPONSE_FIELDS if field in item}
+        record[Constants.DDB_FIELD_IDEMPOTENCY_KEY] = idempotency_key
+        record[Constants.DDB_FIELD_FINGERPRINT] = fingerprint
+        record[Constants.DDB_FIELD_OPERATION] = operation
+        record[Constants.DDB_FIELD_STATUS_CODE] = int(status_code)
+        record[Constants.DDB_FIELD_EXPIRES_AT] = int(self.clock()) + self.ttl
+        return record
+
+    def write(self, record):
+        return IdempotencyWrite(self.table_name, record, int(self.clock()))
+
+    def record_response(self, idempotency_key, fingerprint, response_format, response_body):
+        """Adds the response body sent for the first request to its record, so repeats get exactly the same one."""
+        self.storage.update_record(self.table_name, idempotency_key, fingerprint, {
+            Constants.DDB_FIELD_RESPONSE_FORMAT: response_format,
+            Constants.DDB_FIELD_RESPONSE_BODY: response_body
+        })
@@ -0,0 +1,42 @@
+import json
+
+from common.constants import Constants
+from common.helpers import encode_decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment package
+    orjson = None
+
+
+def available_backends():
+    backends = [Constants.JSON_BACKEND_STDLIB]
+    if orjson is not None:
+        backends.insert(0, Constants.JSON_BACKEND_ORJSON)
+    return backends
+
+
+class JsonCodec:
+    """Parses request bodies and serialises response bodies.
+
+    The auto backend uses orjson when it is installed and the standard library otherwise. Asking for orjson when it
+    is not installed falls back to the standard library as well. Both backends write Decimal values as numbers.
+    """
+
+    def __init__(self, backend=Constants.JSON_BACKEND_AUTO):
+        if backend not in (Constants.JSON_BACKEND_AUTO, Constants.JSON_BACKEND_ORJSON, Constants.JSON_BACKEND_STDLIB):
+            raise ValueError('Unknown JSON backend ' + backend)
+        if backend == Constants.JSON_BACKEND_STDLIB or orjson is None:
+            self.backend = Constants.JSON_BACKEND_STDLIB
+        else:
+            self.backend = Constants.JSON_BACKEND_ORJSON
+
+    def loads(self, data):
+        if self.backend == Constants.JSON_BACKEND_ORJSON:
+            return orjson.loads(data)
+        return json.loads(data)
+
+    def dumps(self, value):
+        if self.backend == Constants.JSON_BACKEND_ORJSON:
+            return orjson.dumps(value, default=encode_decimal).decode('utf-8')
+        return json.dumps(value, default=encode_decimal)
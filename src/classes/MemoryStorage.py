@@ -0,0 +1,147 @@
+import bisect
+import copy
+import threading
+
+from classes.Storage import Storage, normalize_item, concurrent_modification, can_supersede, superseded, \
+    check_idempotency, scan_segment
+from common.constants import Constants
+from common.exceptions import DuplicateRequestError
+from common.helpers import project_item
+
+
+def page(keys, limit, key_position):
+    """Returns up to limit keys and the last of them when more keys follow."""
+    if limit is None or len(keys) <= limit:
+        return keys, None
+    keys = keys[:limit]
+    return keys, key_position(keys[-1])
+
+
+class MemoryStorage(Storage):
+    """Keeps everything in dictionaries of this process, for load tests of the handler without DynamoDB.
+
+    Every resource has a sorted list of its modified dates and the owner index is a dictionary of sets, so reads do
+    not scan other resources. A lock makes every call atomic. Reads return copies, like items read from DynamoDB.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = dict()
+        self.dates = dict()
+        self.owners = dict()
+        self.records = dict()
+
+    def store(self, item):
+        key = (item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER], item[Constants.DDB_FIELD_MODIFIED_DATE])
+        previous_item = self.items.get(key)
+        if previous_item is None:
+            bisect.insort(self.dates.setdefault(key[0], []), key[1])
+        elif Constants.DDB_FIELD_LATEST_OWNER in previous_item:
+            self.owners[previous_item[Constants.DDB_FIELD_LATEST_OWNER]].discard((key[1], key[0]))
+        if Constants.DDB_FIELD_LATEST_OWNER in item:
+            self.owners.setdefault(item[Constants.DDB_FIELD_LATEST_OWNER], set()).add((key[1], key[0]))
+        self.items[key] = item
+
+    def store_record(self, idempotency):
+        records = self.records.setdefault(idempotency.table_name, dict())
+        key = idempotency.record[Constants.DDB_FIELD_IDEMPOTENCY_KEY]
+        check_idempotency(idempotency, records.get(key))
+        records[key] = normalize_item(idempotency.record)
+
+    def put(self, item, idempotency=None):
+        item = normalize_item(item)
+        key = (item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER], item[Constants.DDB_FIELD_MODIFIED_DATE])
+        with self.lock:
+            if idempotency is not None:
+                if key in self.items:
+                    raise DuplicateRequestError(idempotency.record[Constants.DDB_FIELD_IDEMPOTENCY_KEY])
+                self.store_record(idempotency)
+            self.store(item)
+        return dict()
+
+    def modify(self, item, expected_modified_date, idempotency=None):
+        item = normalize_item(item)
+        resource_identifier = item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER]
+        with self.lock:
+            expected_item = self.items.get((resource_identifier, expected_modified_date))
+            if not can_supersede(expected_item, item) or \
+                    (resource_identifier, item[Constants.DDB_FIELD_MODIFIED_DATE]) in self.items:
+                raise concurrent_modification(item, expected_modified_date)
+            if idempotency is not None:
+                self.store_record(idempotency)
+            self.store(superseded(expected_item, item))
+            self.store(item)
+        return dict()
+
+    def query(self, resource_identifier, modified_from=None, modified_to=None, ascending=True, limit=None,
+              exclusive_start_key=None, consistent_read=False, attributes=None):
+        with self.lock:
+            dates = self.dates.get(resource_identifier, [])
+            start = 0 if modified_from is None else bisect.bisect_left(dates, modified_from)
+            end = len(dates) if modified_to is None else bisect.bisect_right(dates, modified_to)
+            if exclusive_start_key is not None:
+                start_date = exclusive_start_key[Constants.DDB_FIELD_MODIFIED_DATE]
+                if ascending:
+                    start = max(start, bisect.bisect_right(dates, start_date))
+                else:
+                    end = min(end, bisect.bisect_left(dates, start_date))
+            selected = dates[start:end] if ascending else dates[start:end][::-1]
+            selected, last_key = page(selected, limit, lambda modified_date: {
+                Constants.DDB_FIELD_RESOURCE_IDENTIFIER: resource_identifier,
+                Constants.DDB_FIELD_MODIFIED_DATE: modified_date
+            })
+            items = [copy.deepcopy(self.items[(resource_identifier, modified_date)]) for modified_date in selected]
+        if attributes is not None:
+            items = [project_item(item, attributes) for item in items]
+        return items, last_key
+
+    def query_owner(self, owner, status=None, limit=None, exclusive_start_key=None):
+        with self.lock:
+            keys = sorted(self.owners.get(owner, ()), reverse=True)
+            if exclusive_start_key is not None:
+                start_key = (exclusive_start_key[Constants.DDB_FIELD_MODIFIED_DATE],
+                             exclusive_start_key[Constants.DDB_FIELD_RESOURCE_IDENTIFIER])
+                keys = [key for key in keys if key < start_key]
+            keys, last_key = page(keys, limit, lambda key: {
+                Constants.DDB_FIELD_RESOURCE_IDENTIFIER: key[1],
+                Constants.DDB_FIELD_MODIFIED_DATE: key[0],
+                Constants.DDB_FIELD_LATEST_OWNER: owner
+            })
+            items = [copy.deepcopy(self.items[(resource_identifier, modified_date)])
+                     for modified_date, resource_identifier in keys]
+        if status is not None:
+            items = [item for item in items if item.get(Constants.DDB_FIELD_STATUS) == status]
+        return items, last_key
+
+    def scan(self, segment=0, total_segments=1, limit=None, exclusive_start_key=None):
+        with self.lock:
+            keys = [(resource_identifier, modified_date) for resource_identifier in sorted(self.dates)
+                    if total_segments <= 1 or scan_segment(resource_identifier, total_segments) == segment
+                    for modified_date in self.dates[resource_identifier]]
+            if exclusive_start_key is not None:
+                keys = keys[bisect.bisect_right(keys, (exclusive_start_key[Constants.DDB_FIELD_RESOURCE_IDENTIFIER],
+                                                       exclusive_start_key[Constants.DDB_FIELD_MODIFIED_DATE])):]
+            keys, last_key = page(keys, limit, lambda key: {
+                Constants.DDB_FIELD_RESOURCE_IDENTIFIER: key[0],
+                Constants.DDB_FIELD_MODIFIED_DATE: key[1]
+            })
+            items = [copy.deepcopy(self.items[key]) for key in keys]
+        return items, last_key
+
+    def write_items(self, items):
+        items = [normalize_item(item) for item in items]
+        with self.lock:
+            for item in items:
+                self.store(item)
+        return []
+
+    def get_record(self, table_name, idempotency_key):
+        with self.lock:
+            return copy.deepcopy(self.records.get(table_name, dict()).get(idempotency_key))
+
+    def update_record(self, table_name, idempotency_key, fingerprint, attributes):
+        attributes = normalize_item(attributes)
+        with self.lock:
+            record = self.records.get(table_name, dict()).get(idempotency_key)
+            if record is not None and record[Constants.DDB_FIELD_FINGERPRINT] == fingerprint:
+                record.update(attributes)
@@ -0,0 +1,130 @@
+import contextvars
+import json
+import threading
+import time
+
+from common.constants import Constants
+
+
+class RequestMetrics:
+    """Phase timings, consumed capacity and retries of one request.
+
+    mark(phase) adds the time since the previous mark to phase, so a phase that occurs more than once is summed.
+    record_call() may be called from the executor's workers, so it updates the counts under a lock.
+    """
+    __slots__ = ('clock', 'start', 'last', 'phases', 'operation', 'consumed_capacity', 'retry_attempts',
+                 'storage_calls', 'lock')
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.start = self.last = clock()
+        self.phases = dict()
+        self.operation = None
+        self.consumed_capacity = 0.0
+        self.retry_attempts = 0
+        self.storage_calls = 0
+        self.lock = threading.Lock()
+
+    def label(self, operation):
+        self.operation = operation
+
+    def mark(self, phase):
+        now = self.clock()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def record_call(self, parsed):
+        consumed = parsed.get('ConsumedCapacity')
+        consumed = consumed if isinstance(consumed, list) else (consumed,) if consumed else ()
+        capacity_units = sum(float(capacity.get('CapacityUnits', 0)) for capacity in consumed)
+        retry_attempts = parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        with self.lock:
+            self.storage_calls += 1
+            self.consumed_capacity += capacity_units
+            self.retry_attempts += retry_attempts
+
+    def log_line(self, status_code, timestamp):
+        """An embedded metric format document, which CloudWatch turns into metrics when it is logged."""
+        values = {phase: elapsed * 1000 for phase, elapsed in self.phases.items()}
+        values[Constants.METRICS_TOTAL_TIME] = (self.last - self.start) * 1000
+        counts = {
+            Constants.METRICS_CONSUMED_CAPACITY: self.consumed_capacity,
+            Constants.METRICS_RETRY_ATTEMPTS: self.retry_attempts,
+            Constants.METRICS_STORAGE_CALLS: self.storage_calls
+        }
+        definitions = [{'Name': name, 'Unit': Constants.METRICS_UNIT_MILLISECONDS} for name in values] + \
+                      [{'Name': name, 'Unit': Constants.METRICS_UNIT_COUNT} for name in counts]
+        line = {
+            '_aws': {
+                'Timestamp': int(timestamp * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': Constants.METRICS_NAMESPACE,
+                    'Dimensions': [[Constants.METRICS_DIMENSION_OPERATION]],
+                    'Metrics': definitions
+                }]
+            },
+            Constants.METRICS_DIMENSION_OPERATION: str(self.operation),
+            Constants.METRICS_STATUS_CODE: int(status_code)
+        }
+        line.update(values)
+        line.update(counts)
+        return line
+
+
+class DisabledRequestMetrics:
+    """Stands in for RequestMetrics when metrics are off, so instrumented code does not need to check."""
+    __slots__ = ()
+
+    def label(self, operation):
+        pass
+
+    def mark(self, phase):
+        pass
+
+
+DISABLED_REQUEST_METRICS = DisabledRequestMetrics()
+
+
+class Metrics:
+    """Per-request instrumentation, written to the log as one structured line per request.
+
+    instrument() hooks into a DynamoDB client so every call asks for ReturnConsumedCapacity and reports its consumed
+    capacity and retry count to the request in progress. The request is kept in a context variable, which
+    BoundedExecutor copies into its workers, so calls a request makes on other threads are counted too.
+    """
+
+    def __init__(self, enabled, clock=time.perf_counter, wall_clock=time.time, emit=print):
+        self.enabled = enabled
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.emit = emit
+        self.current = contextvars.ContextVar('request_metrics', default=None)
+
+    def instrument(self, client):
+        events = client.meta.events
+        events.register('before-parameter-build.dynamodb', self.request_capacity, unique_id='metrics-capacity')
+        events.register('after-call.dynamodb', self.record_call, unique_id='metrics-call')
+
+    @staticmethod
+    def request_capacity(params, model, **kwargs):
+        if model.name in Constants.DDB_CAPACITY_OPERATIONS:
+            params.setdefault('ReturnConsumedCapacity', Constants.DDB_RETURN_CONSUMED_CAPACITY_TOTAL)
+
+    def record_call(self, parsed, **kwargs):
+        request_metrics = self.current.get()
+        if request_metrics is not None:
+            request_metrics.record_call(parsed)
+
+    def begin(self):
+        if not self.enabled:
+            return DISABLED_REQUEST_METRICS
+        request_metrics = RequestMetrics(self.clock)
+        self.current.set(request_metrics)
+        return request_metrics
+
+    def end(self, request_metrics, status_code):
+        if request_metrics is DISABLED_REQUEST_METRICS:
+            return
+        self.current.set(None)
+        request_metrics.last = self.clock()
+        self.emit(json.dumps(request_metrics.log_line(status_code, self.wall_clock())))
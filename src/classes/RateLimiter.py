@@ -0,0 +1,41 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket shared between threads. Tokens refill at rate per second, up to burst.
+
+    A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.burst
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        """Takes tokens from the bucket, waiting until they are available.
+
+        Requests larger than burst are allowed and leave the bucket in debt, so large pages are paid for later.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.refill()
+            self.tokens -= tokens
+            delay = 0 if self.tokens >= 0 else -self.tokens / self.rate
+        if delay > 0:
+            self.sleep(delay)
@@ -0,0 +1,156 @@
+import base64
+import http
+import json
+from concurrent.futures import TimeoutError
+
+from botocore.exceptions import ClientError
+
+from classes.Metrics import DISABLED_REQUEST_METRICS
+from classes.RequestHandler import batch_result
+from common.constants import Constants
+from common.helpers import utc_timestamp
+
+
+def record_identifier(record):
+    """The identifier Lambda expects in batchItemFailures, the sequence number of Kinesis records and the message id
+    of SQS messages."""
+    if Constants.EVENT_KINESIS in record:
+        return record[Constants.EVENT_KINESIS][Constants.EVENT_KINESIS_SEQUENCE_NUMBER]
+    return record[Constants.EVENT_SQS_MESSAGE_ID]
+
+
+def record_payload(record):
+    if Constants.EVENT_KINESIS in record:
+        return base64.b64decode(record[Constants.EVENT_KINESIS][Constants.EVENT_KINESIS_DATA], validate=True)
+    return record[Constants.EVENT_BODY]
+
+
+def is_retryable(status_code):
+    return status_code >= http.HTTPStatus.INTERNAL_SERVER_ERROR or status_code == http.HTTPStatus.CONFLICT
+
+
+def modify_rounds(modifications, coalesce=False):
+    """Splits MODIFY records, (index, resource, payload) with a payload only for records written as single requests,
+    into rounds that keep the order of the records of each resource.
+
+    A resource occurs once per round, except that with coalesce its consecutive batched records share a round, where
+    they are coalesced. A single request always gets a round of its own for its resource.
+    """
+    rounds = []
+    previous = dict()
+    for index, resource, payload in modifications:
+        resource_identifier = resource.get(Constants.DDB_FIELD_RESOURCE_IDENTIFIER) if isinstance(resource, dict) \
+            else None
+        key = resource_identifier if isinstance(resource_identifier, str) else None
+        round_number, previous_payload = previous.get(key, (-1, None))
+        if not (coalesce and payload is None and previous_payload is None and round_number >= 0):
+            round_number += 1
+        previous[key] = (round_number, payload)
+        if round_number == len(rounds):
+            rounds.append([])
+        rounds[round_number].append((index, resource, payload))
+    return rounds
+
+
+class RecordBatchHandler:
+    """Runs INSERT and MODIFY requests delivered as SQS messages or Kinesis records.
+
+    Every record holds the same JSON body as a request to the API. Records are written with the batch operations,
+    except those with an idempotencyKey or expectedModifiedDate, which need the checks of a single request. The
+    records of one resource are written in record order, whichever way they are written, except that consecutive
+    batched modifications are coalesced into one version unless coalescing is off. Records that failed for a reason
+    that may pass on a retry, a conflict or a failed write, are returned as batchItemFailures. SQS delivers only
+    those again, Kinesis replays the stream from the first of them, so every later record of the shard is written
+    again and an INSERT without an idempotencyKey creates a duplicate. Invalid records are logged and dropped.
+    """
+
+    def __init__(self, request_handler, emit=print):
+        self.request_handler = request_handler
+        self.emit = emit
+
+    def handler(self, event, context):
+        records = event.get(Constants.EVENT_RECORDS) if isinstance(event, dict) else None
+        if not isinstance(records, list):
+            raise ValueError(Constants.ERROR_INSUFFICIENT_PARAMETERS)
+        metrics = self.request_handler.metrics
+        if metrics.enabled:
+            self.request_handler.storage.instrument(metrics)
+        request_metrics = metrics.begin()
+        request_metrics.label(records[0].get(Constants.EVENT_SOURCE) if len(records) > 0 else None)
+        try:
+            results = self.process(records)
+        finally:
+            metrics.end(request_metrics, http.HTTPStatus.OK)
+        failures = []
+        for record, result in zip(records, results):
+            status_code = result[Constants.JSON_ATTRIBUTE_NAME_STATUS_CODE]
+            if status_code >= http.HTTPStatus.BAD_REQUEST:
+                self.emit(json.dumps(dict(result, **{Constants.BATCH_ITEM_IDENTIFIER: record_identifier(record)})))
+                if is_retryable(status_code):
+                    failures.append({Constants.BATCH_ITEM_IDENTIFIER: record_identifier(record)})
+        return {Constants.BATCH_ITEM_FAILURES: failures}
+
+    def process(self, records):
+        """Returns a batch result per record, in record order."""
+        results = [None] * len(records)
+        insertions = []
+        single_insertions = []
+        modifications = []
+        for index, record in enumerate(records):
+            try:
+                payload = record_payload(record)
+                body = self.request_handler.json_codec.loads(payload)
+                if not isinstance(body, dict):
+                    raise ValueError(Constants.ERROR_INSUFFICIENT_PARAMETERS)
+                operation = body.get(Constants.JSON_ATTRIBUTE_NAME_OPERATION)
+                if operation not in (Constants.OPERATION_INSERT, Constants.OPERATION_MODIFY):
+                    raise ValueError(Constants.ERROR_UNSUPPORTED_RECORD_OPERATION)
+                single = Constants.JSON_ATTRIBUTE_NAME_IDEMPOTENCY_KEY in body or \
+                    Constants.JSON_ATTRIBUTE_NAME_EXPECTED_MODIFIED_DATE in body
+                if operation == Constants.OPERATION_INSERT:
+                    if single:
+                        single_insertions.append((index, payload))
+                    else:
+                        insertions.append((index, body.get(Constants.JSON_ATTRIBUTE_NAME_RESOURCE)))
+                else:
+                    modifications.append((index, body.get(Constants.JSON_ATTRIBUTE_NAME_RESOURCE),
+                                          payload if single else None))
+            except (TypeError, ValueError) as e:
+                results[index] = batch_result(index, http.HTTPStatus.BAD_REQUEST, error=e.args[0])
+
+        if len(insertions) > 0:
+            self.process_group(Constants.OPERATION_BATCH_INSERT, insertions, results, False)
+        for index, payload in single_insertions:
+            results[index] = self.process_single(index, payload)
+        coalesce = self.request_handler.coalesce_mode != Constants.COALESCE_MODE_OFF
+        for round_number, modify_round in enumerate(modify_rounds(modifications, coalesce)):
+            group = [(index, resource) for index, resource, payload in modify_round if payload is None]
+            if len(group) > 0:
+                self.process_group(Constants.OPERATION_BATCH_MODIFY, group, results, round_number > 0)
+            for index, _, payload in modify_round:
+                if payload is not None:
+                    results[index] = self.process_single(index, payload)
+        return results
+
+    def process_group(self, operation, group, results, consistent_read):
+        try:
+            group_results = self.request_handler.batch_resources(operation, utc_timestamp(),
+                                                                 [resource for _, resource in group], consistent_read)
+        except (ClientError, TimeoutError) as e:
+            for index, _ in group:
+                results[index] = batch_result(index, http.HTTPStatus.SERVICE_UNAVAILABLE, error=str(e))
+            return
+        for (index, _), result in zip(group, group_results):
+            result[Constants.JSON_ATTRIBUTE_NAME_INDEX] = index
+            results[index] = result
+
+    def process_single(self, index, payload):
+        try:
+            handler_response = self.request_handler.handle_request({Constants.EVENT_BODY: payload},
+                                                                   DISABLED_REQUEST_METRICS)
+        except (ClientError, TimeoutError) as e:
+            return batch_result(index, http.HTTPStatus.SERVICE_UNAVAILABLE, error=str(e))
+        status_code = int(handler_response[Constants.RESPONSE_STATUS_CODE])
+        if status_code >= http.HTTPStatus.BAD_REQUEST:
+            return batch_result(index, status_code, error=handler_response[Constants.RESPONSE_BODY])
+        return batch_result(index, status_code)
@@ -1,15 +1,28 @@
 import http
-import json
-import os
 import uuid
+from concurrent.futures import TimeoutError
 
-import arrow as arrow
-import boto3
-from boto3.dynamodb.conditions import Key
-from boto3_type_annotations.dynamodb import Table
+from botocore.exceptions import ClientError
 
+from classes.BoundedExecutor import BoundedExecutor
+from classes.ConnectionManager import ConnectionManager
+from classes.DynamoDBStorage import DynamoDBStorage
+from classes.FileBlobStore import FileBlobStore
+from classes.IdempotencyStore import IdempotencyStore, request_fingerprint
+from classes.JsonCodec import JsonCodec
+from classes.Metrics import Metrics
+from classes.ResourceCache import ResourceCache
+from classes.StorageCodec import StorageCodec
+from common.coalesce import group_by_identifier, merge_resources
 from common.constants import Constants
-from common.validator import validate_resource
+from common.decoders import decode_resource
+from common.encoders import encode_resource, encode_metadata, encode_files
+from common.exceptions import ConcurrentModificationError, DuplicateRequestError
+from common.helpers import env_bool, env_int, env_float, env_str, project_item, remove_none_values, \
+    encode_continuation_token, decode_continuation_token, utc_timestamp
+from common.validator import validate_resource, validate_fields, validate_order, validate_page_size, \
+    validate_date_range, validate_owner, validate_response_format, validate_idempotency_key
+from common.versioning import follows, is_snapshot, reconstruct, to_storage_item
 from data.resource import Resource
 
 
@@ -20,90 +33,666 @@ def response(status_code, body):
     }
 
 
+def batch_result(index, status_code, resource_identifier=None, error=None, coalesced=None):
+    return remove_none_values({
+        Constants.JSON_ATTRIBUTE_NAME_INDEX: index,
+        Constants.JSON_ATTRIBUTE_NAME_STATUS_CODE: status_code,
+        Constants.DDB_FIELD_RESOURCE_IDENTIFIER: resource_identifier,
+        Constants.JSON_ATTRIBUTE_NAME_ERROR: error,
+        Constants.JSON_ATTRIBUTE_NAME_COALESCED: coalesced
+    })
+
+
+def slim_response(item):
+    return remove_none_values({
+        Constants.DDB_FIELD_RESOURCE_IDENTIFIER: item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER],
+        Constants.DDB_FIELD_MODIFIED_DATE: item[Constants.DDB_FIELD_MODIFIED_DATE],
+        Constants.DDB_FIELD_CREATED_DATE: item.get(Constants.DDB_FIELD_CREATED_DATE),
+        Constants.DDB_FIELD_STATUS: item.get(Constants.DDB_FIELD_STATUS)
+    })
+
+
+def build_item(resource_identifier, modified_date, created_date, resource):
+    return remove_none_values({
+        Constants.DDB_FIELD_RESOURCE_IDENTIFIER: resource_identifier,
+        Constants.DDB_FIELD_MODIFIED_DATE: modified_date,
+        Constants.DDB_FIELD_CREATED_DATE: created_date,
+        Constants.DDB_FIELD_METADATA: encode_metadata(resource.metadata),
+        Constants.DDB_FIELD_FILES: encode_files(resource.files),
+        Constants.DDB_FIELD_OWNER: resource.owner,
+        Constants.DDB_FIELD_LATEST_OWNER: resource.owner,
+        Constants.DDB_FIELD_STATUS: resource.status,
+        Constants.DDB_FIELD_PUBLISHED_DATE: resource.published_date,
+        Constants.DDB_FIELD_INDEXED_DATE: resource.indexed_date
+    })
+
+
+def create_storage(engine, connection, executor):
+    """Builds the storage engine named by STORAGE_ENGINE. The local engines are only imported when used."""
+    if engine == Constants.STORAGE_ENGINE_DYNAMODB:
+        return DynamoDBStorage(connection, executor)
+    elif engine == Constants.STORAGE_ENGINE_MEMORY:
+        from classes.MemoryStorage import MemoryStorage
+        return MemoryStorage()
+    elif engine == Constants.STORAGE_ENGINE_SQLITE:
+        from classes.SqliteStorage import SqliteStorage
+        return SqliteStorage(env_str(Constants.ENV_VAR_SQLITE_PATH, Constants.DEFAULT_SQLITE_PATH))
+    raise ValueError('Unknown storage engine ' + engine)
+
+
+def item_key(item):
+    return item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER], item[Constants.DDB_FIELD_MODIFIED_DATE]
+
+
 class RequestHandler:
 
-    def __init__(self, dynamodb=None):
-        if dynamodb is None:
-            self.dynamodb = boto3.resource('dynamodb', region_name=os.environ[Constants.ENV_VAR_REGION])
-            # self.dynamodb = boto3.resource('dynamodb', region_name='eu-west-1')
-        else:
-            self.dynamodb = dynamodb
+    def __init__(self, dynamodb=None, cache=None, codec=None, versioning_mode=None, snapshot_interval=None,
+                 json_codec=None, response_format=None, decode_mode=None, metrics=None, idempotency=None,
+                 executor=None, coalesce_mode=None, storage=None):
+        self.connection = ConnectionManager(dynamodb)
+        if executor is None:
+            executor = BoundedExecutor(env_int(Constants.ENV_VAR_EXECUTOR_MAX_WORKERS,
+                                               Constants.DEFAULT_EXECUTOR_MAX_WORKERS),
+                                       timeout=env_float(Constants.ENV_VAR_EXECUTOR_CALL_TIMEOUT,
+                                                         Constants.DEFAULT_EXECUTOR_CALL_TIMEOUT))
+        self.executor = executor
+        if storage is None:
+            storage = create_storage(env_str(Constants.ENV_VAR_STORAGE_ENGINE, Constants.DEFAULT_STORAGE_ENGINE),
+                                     self.connection, executor)
+        self.storage = storage
+        if idempotency is None:
+            idempotency = IdempotencyStore(storage, env_str(Constants.ENV_VAR_IDEMPOTENCY_TABLE_NAME, None),
+                                           env_int(Constants.ENV_VAR_IDEMPOTENCY_TTL_SECONDS,
+                                                   Constants.DEFAULT_IDEMPOTENCY_TTL_SECONDS))
+        self.idempotency = idempotency
+        if metrics is None:
+            metrics = Metrics(env_bool(Constants.ENV_VAR_METRICS_ENABLED, Constants.DEFAULT_METRICS_ENABLED))
+        self.metrics = metrics
+        if decode_mode is None:
+            decode_mode = env_str(Constants.ENV_VAR_DECODE_MODE, Constants.DEFAULT_DECODE_MODE)
+        if decode_mode not in Constants.DECODE_MODES:
+            raise ValueError('Unknown decode mode ' + decode_mode)
+        self.decode_mode = decode_mode
+        if coalesce_mode is None:
+            coalesce_mode = env_str(Constants.ENV_VAR_COALESCE_MODE, Constants.DEFAULT_COALESCE_MODE)
+        if coalesce_mode not in Constants.COALESCE_MODES:
+            raise ValueError('Unknown coalesce mode ' + coalesce_mode)
+        self.coalesce_mode = coalesce_mode
+        if json_codec is None:
+            json_codec = JsonCodec(env_str(Constants.ENV_VAR_JSON_BACKEND, Constants.DEFAULT_JSON_BACKEND))
+        self.json_codec = json_codec
+        if response_format is None:
+            response_format = env_str(Constants.ENV_VAR_RESPONSE_FORMAT, Constants.DEFAULT_RESPONSE_FORMAT)
+        validate_response_format(response_format)
+        self.response_format = response_format
+        if versioning_mode is None:
+            versioning_mode = env_str(Constants.ENV_VAR_VERSIONING_MODE, Constants.DEFAULT_VERSIONING_MODE)
+        if versioning_mode not in Constants.VERSIONING_MODES:
+            raise ValueError('Unknown versioning mode ' + versioning_mode)
+        if snapshot_interval is None:
+            snapshot_interval = env_int(Constants.ENV_VAR_SNAPSHOT_INTERVAL, Constants.DEFAULT_SNAPSHOT_INTERVAL)
+        if snapshot_interval < 1:
+            raise ValueError('Snapshot interval must be at least 1')
+        self.versioning_mode = versioning_mode
+        self.snapshot_interval = snapshot_interval
+        if codec is None:
+            blob_store_path = env_str(Constants.ENV_VAR_BLOB_STORE_PATH, None)
+            codec = StorageCodec(env_int(Constants.ENV_VAR_COMPRESSION_THRESHOLD,
+                                         Constants.DEFAULT_COMPRESSION_THRESHOLD),
+                                 blob_store=None if blob_store_path is None else FileBlobStore(blob_store_path),
+                                 offload_threshold=env_int(Constants.ENV_VAR_OFFLOAD_THRESHOLD,
+                                                           Constants.DEFAULT_OFFLOAD_THRESHOLD))
+        self.codec = codec
+        if cache is None:
+            cache = ResourceCache(env_int(Constants.ENV_VAR_CACHE_MAX_SIZE, Constants.DEFAULT_CACHE_MAX_SIZE),
+                                  env_float(Constants.ENV_VAR_CACHE_TTL_SECONDS, Constants.DEFAULT_CACHE_TTL_SECONDS))
+        self.cache = cache
+
+    @property
+    def dynamodb(self):
+        return self.connection.get_resource()
+
+    @property
+    def table(self):
+        return self.connection.get_table()
 
-        self.table_name = os.environ.get(Constants.ENV_VAR_TABLE_NAME)
-        self.table: Table = self.dynamodb.Table(self.table_name)
+    @property
+    def table_name(self):
+        return self.connection.table_name
 
     def get_table_connection(self):
         return self.table
 
-    def insert_resource(self, generated_uuid, current_time, resource):
-        ddb_response = self.table.put_item(
-            Item={
-                Constants.DDB_FIELD_RESOURCE_IDENTIFIER: generated_uuid,
-                Constants.DDB_FIELD_MODIFIED_DATE: current_time,
-                Constants.DDB_FIELD_CREATED_DATE: current_time,
-                Constants.DDB_FIELD_METADATA: resource.metadata,
-                Constants.DDB_FIELD_FILES: resource.files,
-                Constants.DDB_FIELD_OWNER: resource.owner
-            }
-        )
-        return ddb_response
+    @property
+    def delta_versioning(self):
+        return self.versioning_mode == Constants.VERSIONING_MODE_DELTA
+
+    def storage_item(self, item, previous_item):
+        """Returns the item to write for a new version, given the full previous version or None."""
+        if not self.delta_versioning:
+            return item
+        return to_storage_item(item, previous_item, self.snapshot_interval)
+
+    def insert_resource(self, generated_uuid, current_time, resource, record_request=None):
+        """Puts the first version of a resource. record_request builds an idempotency record from the new item,
+        which is then put in the same transaction.
+        """
+        item = self.storage_item(build_item(generated_uuid, current_time, current_time, resource), None)
+        idempotency_write = None if record_request is None else self.idempotency.write(record_request(item))
+        ddb_response = self.storage.put(self.codec.encode_item(item), idempotency_write)
+        self.cache.put(generated_uuid, item)
+        return ddb_response, item
+
+    def read_version_chain(self, resource_identifier, modified_to=None, consistent_read=False):
+        """Reads the stored versions from the newest one up to modified_to back to the nearest snapshot.
+
+        Snapshots are written every snapshot_interval versions, so this is normally a single query.
+        """
+        chain = []
+        last_evaluated_key = None
+        while True:
+            items, last_evaluated_key = self.storage.query(
+                resource_identifier, modified_to=modified_to, ascending=False,
+                limit=self.snapshot_interval if self.delta_versioning else 1,
+                exclusive_start_key=last_evaluated_key, consistent_read=consistent_read)
+            for item in items:
+                chain.append(self.codec.decode_item(item))
+                if is_snapshot(item):
+                    return chain
+            if last_evaluated_key is None:
+                return chain
+
+    def read_version(self, resource_identifier, modified_to=None, consistent_read=False):
+        chain = self.read_version_chain(resource_identifier, modified_to, consistent_read)
+        return reconstruct(chain) if len(chain) > 0 else None
 
-    def modify_resource(self, current_time, modified_resource):
-        ddb_response = self.table.query(
-            KeyConditionExpression=Key(Constants.DDB_FIELD_RESOURCE_IDENTIFIER).eq(
-                modified_resource.resource_identifier))
+    def reconstruct_items(self, items):
+        """Replaces stored deltas with full versions.
 
-        if len(ddb_response[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]) == 0:
-            raise ValueError('Resource with identifier ' + modified_resource.resource_identifier + ' not found')
+        Consecutive versions in items are rebuilt from each other, others from their own version chain. Deltas are
+        read in either versioning mode, so histories written in delta mode stay readable after switching back.
+        """
+        if all(is_snapshot(item) for item in items):
+            return items
+        full_items = dict()
+        previous_item = None
+        for item in sorted(items, key=item_key):
+            if is_snapshot(item):
+                full_item = item
+            elif follows(item, previous_item):
+                full_item = reconstruct([item, previous_item])
+            else:
+                full_item = self.read_version(item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER],
+                                              item[Constants.DDB_FIELD_MODIFIED_DATE])
+            full_items[item_key(item)] = full_item
+            previous_item = full_item
+        return [full_items[item_key(item)] for item in items]
+
+    def get_latest_version(self, resource_identifier, attributes=None, consistent_read=False):
+        if self.delta_versioning and (attributes is None or any(
+                attribute.split('.', 1)[0] in Constants.DDB_DELTA_FIELDS for attribute in attributes)):
+            item = self.read_version(resource_identifier, consistent_read=consistent_read)
+            if item is not None and attributes is not None:
+                item = project_item(item, attributes)
+            return item
+        storage_attributes = attributes
+        if attributes is not None and self.codec.enabled:
+            storage_attributes = self.codec.storage_paths(attributes)
+        items, _ = self.storage.query(resource_identifier, ascending=False, limit=1, consistent_read=consistent_read,
+                                      attributes=storage_attributes)
+        if len(items) == 0:
+            return None
+        item = self.codec.decode_item(items[0])
+        if attributes is None and not is_snapshot(item):
+            item = self.read_version(resource_identifier, consistent_read=consistent_read)
+        if storage_attributes != attributes:
+            item = project_item(item, attributes)
+        return item
+
+    def get_resource(self, resource_identifier, fields=None, consistent_read=False):
+        attributes = None if fields is None else Constants.DDB_KEY_ATTRIBUTES + fields
+        item = None if consistent_read else self.cache.get(resource_identifier)
+        if item is None:
+            item = self.get_latest_version(resource_identifier, attributes, consistent_read)
+            if item is not None and attributes is None:
+                self.cache.put(resource_identifier, item)
+        elif attributes is not None:
+            item = project_item(item, attributes)
+        return item
+
+    def query_versions(self, resource_identifier, modified_from=None, modified_to=None, ascending=True,
+                       page_size=Constants.DEFAULT_PAGE_SIZE, exclusive_start_key=None):
+        items, last_evaluated_key = self.query_version_items(resource_identifier, modified_from, modified_to,
+                                                             ascending, page_size, exclusive_start_key)
+        return self.reconstruct_items(items), last_evaluated_key
+
+    def query_version_items(self, resource_identifier, modified_from=None, modified_to=None, ascending=True,
+                            page_size=Constants.DEFAULT_PAGE_SIZE, exclusive_start_key=None):
+        items, last_evaluated_key = self.storage.query(resource_identifier, modified_from, modified_to, ascending,
+                                                       page_size, exclusive_start_key)
+        return [self.codec.decode_item(item) for item in items], last_evaluated_key
+
+    def iterate_versions(self, resource_identifier, modified_from=None, modified_to=None, ascending=True,
+                         page_size=Constants.DEFAULT_PAGE_SIZE):
+        """Yields every version in the range one page at a time, so memory use does not grow with the history."""
+        exclusive_start_key = None
+        while True:
+            items, exclusive_start_key = self.query_versions(resource_identifier, modified_from, modified_to,
+                                                             ascending, page_size, exclusive_start_key)
+            yield from items
+            if exclusive_start_key is None:
+                return
+
+    def list_versions(self, resource_identifier, body):
+        order = body.get(Constants.JSON_ATTRIBUTE_NAME_ORDER, Constants.ORDER_ASCENDING)
+        page_size = body.get(Constants.JSON_ATTRIBUTE_NAME_PAGE_SIZE, Constants.DEFAULT_PAGE_SIZE)
+        modified_from = body.get(Constants.JSON_ATTRIBUTE_NAME_MODIFIED_FROM)
+        modified_to = body.get(Constants.JSON_ATTRIBUTE_NAME_MODIFIED_TO)
+        validate_order(order)
+        validate_page_size(page_size)
+        validate_date_range(modified_from, modified_to)
+        exclusive_start_key = decode_continuation_token(body.get(Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN))
+        if exclusive_start_key is not None and \
+                exclusive_start_key.get(Constants.DDB_FIELD_RESOURCE_IDENTIFIER) != resource_identifier:
+            raise ValueError('Invalid continuation token')
+        items, last_evaluated_key = self.query_versions(resource_identifier, modified_from, modified_to,
+                                                        order == Constants.ORDER_ASCENDING, page_size,
+                                                        exclusive_start_key)
+        return remove_none_values({
+            Constants.JSON_ATTRIBUTE_NAME_VERSIONS: [encode_resource(decode_resource(item)) for item in items],
+            Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN: encode_continuation_token(last_evaluated_key)
+        })
+
+    def query_by_owner(self, owner, status=None, page_size=Constants.DEFAULT_PAGE_SIZE, exclusive_start_key=None):
+        items, last_evaluated_key = self.storage.query_owner(owner, status, page_size, exclusive_start_key)
+        return self.reconstruct_items([self.codec.decode_item(item) for item in items]), last_evaluated_key
+
+    def list_by_owner(self, body):
+        owner = body.get(Constants.JSON_ATTRIBUTE_NAME_OWNER)
+        status = body.get(Constants.JSON_ATTRIBUTE_NAME_STATUS)
+        page_size = body.get(Constants.JSON_ATTRIBUTE_NAME_PAGE_SIZE, Constants.DEFAULT_PAGE_SIZE)
+        validate_owner(owner, status)
+        validate_page_size(page_size)
+        exclusive_start_key = decode_continuation_token(body.get(Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN),
+                                                        Constants.DDB_OWNER_INDEX_KEY_ATTRIBUTES)
+        if exclusive_start_key is not None and \
+                exclusive_start_key.get(Constants.DDB_FIELD_LATEST_OWNER) != owner:
+            raise ValueError('Invalid continuation token')
+        items, last_evaluated_key = self.query_by_owner(owner, status, page_size, exclusive_start_key)
+        return remove_none_values({
+            Constants.JSON_ATTRIBUTE_NAME_RESOURCES: [encode_resource(decode_resource(item)) for item in items],
+            Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN: encode_continuation_token(last_evaluated_key)
+        })
+
+    def previous_version(self, resource_identifier, attributes=Constants.DDB_LATEST_VERSION_ATTRIBUTES,
+                         previous_resource=None):
+        if previous_resource is None:
+            previous_resource = self.get_latest_version(resource_identifier, attributes)
+
+        if previous_resource is None:
+            raise ValueError('Resource with identifier ' + resource_identifier + ' not found')
+        elif Constants.DDB_FIELD_CREATED_DATE not in previous_resource:
+            raise ValueError(
+                'Resource with identifier ' + resource_identifier + ' has no ' + Constants.DDB_FIELD_CREATED_DATE + ' in DB')
         else:
-            previous_resource = ddb_response[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS][0]
-            if Constants.DDB_FIELD_CREATED_DATE not in previous_resource:
-                raise ValueError(
-                    'Resource with identifier ' + modified_resource.resource_identifier + ' has no ' + Constants.DDB_FIELD_CREATED_DATE + ' in DB')
+            return previous_resource
+
+    def write_modification(self, item, expected_modified_date, idempotency_record=None):
+        """Marks the expected version as superseded and puts the new version in one atomic write.
+
+        The write fails if the expected version does not exist, has another createdDate or has already been
+        superseded by another modification. An idempotency record is written with it.
+        """
+        return self.storage.modify(self.codec.encode_item(item), expected_modified_date,
+                                   None if idempotency_record is None else self.idempotency.write(idempotency_record))
+
+    def expected_version(self, resource_identifier, expected_modified_date):
+        """Returns the full version a conditional modification is based on, or None if it is not stored."""
+        if not self.delta_versioning:
+            return None
+        item = self.cache.get(resource_identifier)
+        if item is None or item.get(Constants.DDB_FIELD_MODIFIED_DATE) != expected_modified_date:
+            item = self.read_version(resource_identifier, expected_modified_date)
+        if item is None or item[Constants.DDB_FIELD_MODIFIED_DATE] != expected_modified_date:
+            return None
+        return item
+
+    def modify_resource(self, current_time, modified_resource, expected_modified_date=None, record_request=None):
+        from_cache = False
+        if expected_modified_date is None:
+            previous_resource = self.cache.get(modified_resource.resource_identifier)
+            from_cache = previous_resource is not None and Constants.DDB_FIELD_CREATED_DATE in previous_resource
+            if not from_cache:
+                previous_resource = self.previous_version(
+                    modified_resource.resource_identifier,
+                    None if self.delta_versioning else Constants.DDB_LATEST_VERSION_ATTRIBUTES)
+            expected_modified_date = previous_resource[Constants.DDB_FIELD_MODIFIED_DATE]
+            created_date = previous_resource[Constants.DDB_FIELD_CREATED_DATE]
+        elif modified_resource.created_date is None:
+            raise ValueError('Resource with identifier ' + modified_resource.resource_identifier + ' has no ' +
+                             Constants.DDB_FIELD_CREATED_DATE)
+        else:
+            created_date = modified_resource.created_date
+            previous_resource = self.expected_version(modified_resource.resource_identifier, expected_modified_date)
+        item = self.storage_item(
+            build_item(modified_resource.resource_identifier, current_time, created_date, modified_resource),
+            previous_resource)
+        try:
+            ddb_response = self.write_modification(item, expected_modified_date,
+                                                   None if record_request is None else record_request(item))
+        except ConcurrentModificationError:
+            self.cache.invalidate(modified_resource.resource_identifier)
+            if from_cache:
+                return self.modify_resource(current_time, modified_resource, None, record_request)
+            raise
+        self.cache.put(modified_resource.resource_identifier, reconstruct([item, previous_resource])
+                       if not is_snapshot(item) else item)
+        return ddb_response, item
+
+    def write_batch_modification(self, item, expected_modified_date):
+        """Writes a modification of a batch. Returns None once it is written, or the status and error it failed with."""
+        try:
+            self.write_modification(item, expected_modified_date)
+            return None
+        except ConcurrentModificationError as e:
+            return http.HTTPStatus.CONFLICT, e.args[0]
+        except ClientError as e:
+            return http.HTTPStatus.SERVICE_UNAVAILABLE, str(e)
+
+    def write_batch_modifications(self, modifications, expected_modified_dates):
+        """Writes the (indexes, item) modifications of a batch in parallel. Returns the failure of each, or None.
+
+        Every modification is its own transaction, so one that fails or times out does not fail the others.
+        """
+        calls = [(indexes, self.executor.submit_call(self.write_batch_modification,
+                                                     (item, expected_modified_dates[indexes])))
+                 for indexes, item in modifications]
+        failures = dict()
+        for indexes, (future, call) in calls:
+            try:
+                failures[indexes] = self.executor.result(future, call)
+            except TimeoutError as e:
+                failures[indexes] = http.HTTPStatus.SERVICE_UNAVAILABLE, str(e)
+        return failures
+
+    def write_items(self, items):
+        unprocessed = self.storage.write_items([self.codec.encode_item(item) for item in items])
+        return {item_key(item) for item in unprocessed}
+
+    def coalesce_modifications(self, accepted, results):
+        """Folds the modifications of each resource into one, keeping the last one or merging them all in order.
+
+        Returns (indexes, resource) pairs with the indexes of all modifications that were folded into resource.
+        """
+        entries = []
+        for group in group_by_identifier(accepted):
+            indexes = tuple(index for index, _, _ in group)
+            if len(group) == 1 or self.coalesce_mode == Constants.COALESCE_MODE_LAST:
+                entries.append((indexes, group[-1][2]))
+                continue
+            try:
+                resource = Resource.from_dict(merge_resources([resource_dict for _, resource_dict, _ in group]),
+                                              self.decode_mode)
+                validate_resource(Constants.OPERATION_MODIFY, resource)
+                entries.append((indexes, resource))
+            except (TypeError, ValueError) as e:
+                for index in indexes:
+                    results[index] = batch_result(index, http.HTTPStatus.BAD_REQUEST, group[0][2].resource_identifier,
+                                                  e.args[0])
+        return entries
+
+    def batch_resources(self, operation, current_time, resources, consistent_read=False):
+        """Decodes and validates every resource, reads the latest versions to modify concurrently, and writes the
+        new versions.
+
+        Inserts are written in batches. Each modification is written like a single MODIFY, superseding the version it
+        builds on in one transaction, and the modifications run concurrently on the executor. A modification whose
+        version was superseded in the meantime gets 409 Conflict.
+
+        Unless coalescing is off, several modifications of one resource are written as one version and each of them
+        gets the result of that write.
+        """
+        single_operation = Constants.OPERATION_INSERT if operation == Constants.OPERATION_BATCH_INSERT \
+            else Constants.OPERATION_MODIFY
+        success_status = http.HTTPStatus.CREATED if operation == Constants.OPERATION_BATCH_INSERT \
+            else http.HTTPStatus.OK
+        coalesce = single_operation == Constants.OPERATION_MODIFY and \
+            self.coalesce_mode != Constants.COALESCE_MODE_OFF
+        results = [None] * len(resources)
+        accepted = []
+        items = dict()
+        logical_items = dict()
+        expected_modified_dates = dict()
+        seen_identifiers = set()
+        for index, resource_dict_from_json in enumerate(resources):
+            resource_identifier = None
+            try:
+                resource = Resource.from_dict(resource_dict_from_json, self.decode_mode)
+                resource_identifier = resource.resource_identifier
+                validate_resource(single_operation, resource)
+                if single_operation == Constants.OPERATION_MODIFY and not coalesce:
+                    if resource_identifier in seen_identifiers:
+                        raise ValueError('Resource with identifier ' + resource_identifier + ' occurs more than once')
+                    seen_identifiers.add(resource_identifier)
+                accepted.append((index, resource_dict_from_json, resource))
+            except (TypeError, ValueError) as e:
+                results[index] = batch_result(index, http.HTTPStatus.BAD_REQUEST, resource_identifier, e.args[0])
+
+        if coalesce:
+            entries = self.coalesce_modifications(accepted, results)
+        else:
+            entries = [((index,), resource) for index, _, resource in accepted]
+
+        chains = dict()
+        if single_operation == Constants.OPERATION_MODIFY:
+            identifiers = [resource.resource_identifier for _, resource in entries]
+            chains = dict(zip(identifiers, self.executor.map(
+                lambda resource_identifier: self.read_version_chain(resource_identifier, None, consistent_read),
+                identifiers)))
+
+        for indexes, resource in entries:
+            resource_identifier = resource.resource_identifier
+            try:
+                if single_operation == Constants.OPERATION_INSERT:
+                    resource_identifier = uuid.uuid4().__str__()
+                    item = self.storage_item(build_item(resource_identifier, current_time, current_time, resource),
+                                             None)
+                else:
+                    chain = chains[resource_identifier]
+                    previous_resource = self.previous_version(resource_identifier, None,
+                                                              reconstruct(chain) if len(chain) > 0 else None)
+                    expected_modified_dates[indexes] = chain[0][Constants.DDB_FIELD_MODIFIED_DATE]
+                    item = build_item(resource_identifier, current_time,
+                                      previous_resource[Constants.DDB_FIELD_CREATED_DATE], resource)
+                    item = self.storage_item(item, previous_resource)
+                    logical_items[indexes] = item if is_snapshot(item) else reconstruct([item, previous_resource])
+                items[indexes] = item
+                for index in indexes:
+                    results[index] = batch_result(index, success_status, resource_identifier,
+                                                  coalesced=True if len(indexes) > 1 else None)
+            except (TypeError, ValueError) as e:
+                for index in indexes:
+                    results[index] = batch_result(index, http.HTTPStatus.BAD_REQUEST, resource_identifier, e.args[0])
+
+        if single_operation == Constants.OPERATION_INSERT:
+            unprocessed_keys = self.write_items(list(items.values()))
+            failures = {indexes: (http.HTTPStatus.SERVICE_UNAVAILABLE, Constants.ERROR_NOT_PROCESSED)
+                        for indexes, item in items.items() if item_key(item) in unprocessed_keys}
+        else:
+            failures = self.write_batch_modifications(list(items.items()), expected_modified_dates)
+        for indexes, item in items.items():
+            failure = failures.get(indexes)
+            if failure is not None:
+                self.cache.invalidate(item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER])
+                for index in indexes:
+                    results[index] = batch_result(index, failure[0], item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER],
+                                                  failure[1])
             else:
-                ddb_response = self.table.put_item(
-                    Item={
-                        Constants.DDB_FIELD_RESOURCE_IDENTIFIER: modified_resource.resource_identifier,
-                        Constants.DDB_FIELD_MODIFIED_DATE: current_time,
-                        Constants.DDB_FIELD_CREATED_DATE: previous_resource[Constants.DDB_FIELD_CREATED_DATE],
-                        Constants.DDB_FIELD_METADATA: modified_resource.metadata,
-                        Constants.DDB_FIELD_FILES: modified_resource.files,
-                        Constants.DDB_FIELD_OWNER: modified_resource.owner
-                    }
-                )
-                return ddb_response
+                self.cache.put(item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER], logical_items.get(indexes, item))
+        return results
+
+    def write_response(self, ddb_response, item, response_format):
+        """The full format echoes the DynamoDB response, the slim format only the identifier, dates and status."""
+        if response_format == Constants.RESPONSE_FORMAT_SLIM:
+            return slim_response(item)
+        ddb_response['resource_identifier'] = item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER]
+        return ddb_response
+
+    def idempotent_write(self, operation, body, response_format, status_code, write, request_metrics):
+        """Runs write at most once per idempotency key and returns the status code and serialized response to send.
+
+        write is called with a function that builds the idempotency record for the written item, or with None when
+        the request has no idempotency key. The response body of the first request is added to its record after the
+        write, and a repeated key in the same response format gets that body again. A repeat that finds no body,
+        because the first request stopped in between or asked for another format, gets one built from the record.
+        """
+        idempotency_key = body.get(Constants.JSON_ATTRIBUTE_NAME_IDEMPOTENCY_KEY)
+        if idempotency_key is None:
+            ddb_response, item = write(None)
+            request_metrics.mark(Constants.PHASE_STORAGE)
+            response_body = self.json_codec.dumps(self.write_response(ddb_response, item, response_format))
+            request_metrics.mark(Constants.PHASE_SERIALIZE)
+            return status_code, response_body
+        validate_idempotency_key(idempotency_key)
+        if not self.idempotency.enabled:
+            raise ValueError(Constants.ERROR_IDEMPOTENCY_DISABLED)
+        fingerprint = request_fingerprint(operation, body.get(Constants.JSON_ATTRIBUTE_NAME_RESOURCE))
+        record = self.idempotency.get(idempotency_key)
+        if record is None:
+            try:
+                ddb_response, item = write(lambda written_item: self.idempotency.record(
+                    idempotency_key, fingerprint, operation, status_code, written_item))
+                request_metrics.mark(Constants.PHASE_STORAGE)
+                response_body = self.json_codec.dumps(self.write_response(ddb_response, item, response_format))
+                request_metrics.mark(Constants.PHASE_SERIALIZE)
+                self.idempotency.record_response(idempotency_key, fingerprint, response_format, response_body)
+                request_metrics.mark(Constants.PHASE_STORAGE)
+                return status_code, response_body
+            except DuplicateRequestError:
+                record = self.idempotency.get(idempotency_key)
+                if record is None:
+                    raise ConcurrentModificationError('Request with ' + Constants.JSON_ATTRIBUTE_NAME_IDEMPOTENCY_KEY +
+                                                      ' ' + idempotency_key + ' is in conflict with another request')
+        if record[Constants.DDB_FIELD_FINGERPRINT] != fingerprint:
+            raise ValueError(Constants.ERROR_IDEMPOTENCY_KEY_REUSED)
+        request_metrics.mark(Constants.PHASE_STORAGE)
+        if Constants.DDB_FIELD_RESPONSE_BODY in record and \
+                record.get(Constants.DDB_FIELD_RESPONSE_FORMAT) == response_format:
+            return int(record[Constants.DDB_FIELD_STATUS_CODE]), record[Constants.DDB_FIELD_RESPONSE_BODY]
+        item = {field: record[field] for field in Constants.DDB_IDEMPOTENCY_RESPONSE_FIELDS if field in record}
+        response_body = self.json_codec.dumps(self.write_response(dict(), item, response_format))
+        request_metrics.mark(Constants.PHASE_SERIALIZE)
+        return int(record[Constants.DDB_FIELD_STATUS_CODE]), response_body
 
     def handler(self, event, context):
+        if self.metrics.enabled:
+            self.storage.instrument(self.metrics)
+        request_metrics = self.metrics.begin()
+        status_code = http.HTTPStatus.INTERNAL_SERVER_ERROR
+        try:
+            handler_response = self.handle_request(event, request_metrics)
+            status_code = handler_response[Constants.RESPONSE_STATUS_CODE]
+            return handler_response
+        finally:
+            self.metrics.end(request_metrics, status_code)
+
+    def handle_request(self, event, request_metrics):
         if event is None or Constants.EVENT_BODY not in event:
-            return response(http.HTTPStatus.BAD_REQUEST, 'Insufficient parameters')
+            return response(http.HTTPStatus.BAD_REQUEST, Constants.ERROR_INSUFFICIENT_PARAMETERS)
         else:
-            body = json.loads(event[Constants.EVENT_BODY])
+            body = self.json_codec.loads(event[Constants.EVENT_BODY])
             operation = body.get(Constants.JSON_ATTRIBUTE_NAME_OPERATION)
+            request_metrics.label(operation)
+            request_metrics.mark(Constants.PHASE_PARSE)
+            response_format = body.get(Constants.JSON_ATTRIBUTE_NAME_RESPONSE_FORMAT, self.response_format)
+            try:
+                validate_response_format(response_format)
+            except ValueError as e:
+                return response(http.HTTPStatus.BAD_REQUEST, e.args[0])
+
+            if operation in (Constants.OPERATION_BATCH_INSERT, Constants.OPERATION_BATCH_MODIFY):
+                resources = body.get(Constants.JSON_ATTRIBUTE_NAME_RESOURCES)
+                if not isinstance(resources, list) or len(resources) == 0:
+                    return response(http.HTTPStatus.BAD_REQUEST, Constants.ERROR_INSUFFICIENT_PARAMETERS)
+                current_time = utc_timestamp()
+                results = self.batch_resources(operation, current_time, resources)
+                request_metrics.mark(Constants.PHASE_STORAGE)
+                response_body = self.json_codec.dumps({Constants.JSON_ATTRIBUTE_NAME_RESULTS: results})
+                request_metrics.mark(Constants.PHASE_SERIALIZE)
+                return response(http.HTTPStatus.OK, response_body)
+            elif operation == Constants.OPERATION_LIST_BY_OWNER:
+                try:
+                    resources = self.list_by_owner(body)
+                except ValueError as e:
+                    return response(http.HTTPStatus.BAD_REQUEST, e.args[0])
+                request_metrics.mark(Constants.PHASE_STORAGE)
+                response_body = self.json_codec.dumps(resources)
+                request_metrics.mark(Constants.PHASE_SERIALIZE)
+                return response(http.HTTPStatus.OK, response_body)
+
             resource_dict_from_json = body.get(Constants.JSON_ATTRIBUTE_NAME_RESOURCE)
 
             try:
-                resource = Resource.from_dict(resource_dict_from_json)
+                resource = Resource.from_dict(resource_dict_from_json, self.decode_mode)
             except TypeError as e:
                 return response(http.HTTPStatus.BAD_REQUEST, e.args[0])
+            request_metrics.mark(Constants.PHASE_DECODE)
 
-            current_time = arrow.utcnow().isoformat().replace('+00:00', 'Z')
+            current_time = utc_timestamp()
 
             if operation == Constants.OPERATION_INSERT and resource is not None:
                 try:
                     validate_resource(operation, resource)
+                    request_metrics.mark(Constants.PHASE_VALIDATE)
+                    status_code, response_body = self.idempotent_write(
+                        operation, body, response_format, http.HTTPStatus.CREATED,
+                        lambda record_request: self.insert_resource(uuid.uuid4().__str__(), current_time, resource,
+                                                                    record_request), request_metrics)
+                except ConcurrentModificationError as e:
+                    return response(http.HTTPStatus.CONFLICT, e.args[0])
                 except ValueError as e:
                     return response(http.HTTPStatus.BAD_REQUEST, e.args[0])
-                generated_uuid = uuid.uuid4().__str__()
-                ddb_response = self.insert_resource(generated_uuid, current_time, resource)
-                ddb_response['resource_identifier'] = generated_uuid
-                return response(http.HTTPStatus.CREATED, json.dumps(ddb_response))
+                return response(status_code, response_body)
             elif operation == Constants.OPERATION_MODIFY and resource is not None:
                 try:
                     validate_resource(operation, resource)
-                    ddb_response = self.modify_resource(current_time, resource)
-                    ddb_response['resource_identifier'] = resource.resource_identifier
-                    return response(http.HTTPStatus.OK, json.dumps(ddb_response))
+                    request_metrics.mark(Constants.PHASE_VALIDATE)
+                    status_code, response_body = self.idempotent_write(
+                        operation, body, response_format, http.HTTPStatus.OK,
+                        lambda record_request: self.modify_resource(
+                            current_time, resource, body.get(Constants.JSON_ATTRIBUTE_NAME_EXPECTED_MODIFIED_DATE),
+                            record_request), request_metrics)
+                    return response(status_code, response_body)
+                except ConcurrentModificationError as e:
+                    return response(http.HTTPStatus.CONFLICT, e.args[0])
+                except ValueError as e:
+                    return response(http.HTTPStatus.BAD_REQUEST, e.args[0])
+            elif operation == Constants.OPERATION_GET and resource is not None:
+                fields = body.get(Constants.JSON_ATTRIBUTE_NAME_FIELDS)
+                try:
+                    validate_resource(operation, resource)
+                    validate_fields(fields)
+                except ValueError as e:
+                    return response(http.HTTPStatus.BAD_REQUEST, e.args[0])
+                request_metrics.mark(Constants.PHASE_VALIDATE)
+                item = self.get_resource(resource.resource_identifier, fields,
+                                         body.get(Constants.JSON_ATTRIBUTE_NAME_CONSISTENT_READ) is True)
+                request_metrics.mark(Constants.PHASE_STORAGE)
+                if item is None:
+                    return response(http.HTTPStatus.NOT_FOUND,
+                                    'Resource with identifier ' + resource.resource_identifier + ' not found')
+                response_body = self.json_codec.dumps(encode_resource(decode_resource(item)))
+                request_metrics.mark(Constants.PHASE_SERIALIZE)
+                return response(http.HTTPStatus.OK, response_body)
+            elif operation == Constants.OPERATION_LIST_VERSIONS and resource is not None:
+                try:
+                    validate_resource(operation, resource)
+                    versions = self.list_versions(resource.resource_identifier, body)
                 except ValueError as e:
                     return response(http.HTTPStatus.BAD_REQUEST, e.args[0])
+                request_metrics.mark(Constants.PHASE_STORAGE)
+                response_body = self.json_codec.dumps(versions)
+                request_metrics.mark(Constants.PHASE_SERIALIZE)
+                return response(http.HTTPStatus.OK, response_body)
             else:
-                return response(http.HTTPStatus.BAD_REQUEST, 'Insufficient parameters')
+                return response(http.HTTPStatus.BAD_REQUEST, Constants.ERROR_INSUFFICIENT_PARAMETERS)
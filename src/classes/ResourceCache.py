@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+
+
+class ResourceCache:
+    """Bounded LRU cache of latest resource versions keyed by resource_identifier.
+
+    Entries expire ttl seconds after they were stored. A max_size of 0 disables the cache.
+    """
+
+    def __init__(self, max_size, ttl, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, resource_identifier):
+        if self.max_size <= 0:
+            return None
+        entry = self.entries.get(resource_identifier)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, item = entry
+        if expires <= self.clock():
+            del self.entries[resource_identifier]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(resource_identifier)
+        self.hits += 1
+        return dict(item)
+
+    def put(self, resource_identifier, item):
+        if self.max_size <= 0:
+            return
+        self.entries[resource_identifier] = (self.clock() + self.ttl, dict(item))
+        self.entries.move_to_end(resource_identifier)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, resource_identifier):
+        self.entries.pop(resource_identifier, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def statistics(self):
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
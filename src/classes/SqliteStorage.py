@@ -0,0 +1,211 @@
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from classes.Storage import Storage, normalize_item, concurrent_modification, can_supersede, superseded, \
+    check_idempotency, scan_segment
+from common.constants import Constants
+from common.exceptions import DuplicateRequestError
+from common.helpers import project_item
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS versions (resource_identifier TEXT NOT NULL, modified_date TEXT NOT NULL, '
+    'latest_owner TEXT, item BLOB NOT NULL, PRIMARY KEY (resource_identifier, modified_date)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS owner_index ON versions (latest_owner, modified_date, resource_identifier) '
+    'WHERE latest_owner IS NOT NULL',
+    'CREATE TABLE IF NOT EXISTS records (table_name TEXT NOT NULL, idempotency_key TEXT NOT NULL, '
+    'record BLOB NOT NULL, PRIMARY KEY (table_name, idempotency_key)) WITHOUT ROWID'
+)
+
+
+def dump(item):
+    return pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+
+
+def load(data):
+    return pickle.loads(data)
+
+
+class SqliteStorage(Storage):
+    """Keeps versions in an SQLite database, for offline runs and tests with more data than fits in memory.
+
+    Items are stored as pickles of their DynamoDB types, next to the key and owner columns that queries use. The
+    default path ':memory:' keeps the database in memory. One connection is shared by all threads.
+    """
+
+    def __init__(self, path=Constants.DEFAULT_SQLITE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.create_function('scan_segment', 2, scan_segment)
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    @staticmethod
+    def read_item(connection, resource_identifier, modified_date):
+        row = connection.execute('SELECT item FROM versions WHERE resource_identifier = ? AND modified_date = ?',
+                                 (resource_identifier, modified_date)).fetchone()
+        return None if row is None else load(row[0])
+
+    def update_record(self, table_name, idempotency_key, fingerprint, attributes):
+        attributes = normalize_item(attributes)
+        with self.transaction() as connection:
+            row = connection.execute('SELECT record FROM records WHERE table_name = ? AND idempotency_key = ?',
+                                     (table_name, idempotency_key)).fetchone()
+            record = None if row is None else load(row[0])
+            if record is not None and record[Constants.DDB_FIELD_FINGERPRINT] == fingerprint:
+                record.update(attributes)
+                connection.execute('INSERT OR REPLACE INTO records VALUES (?, ?, ?)',
+                                   (table_name, idempotency_key, dump(record)))
+
+    @staticmethod
+    def store(connection, items):
+        connection.executemany('INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?)', [
+            (item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER], item[Constants.DDB_FIELD_MODIFIED_DATE],
+             item.get(Constants.DDB_FIELD_LATEST_OWNER), dump(item)) for item in items])
+
+    @staticmethod
+    def store_record(connection, idempotency):
+        key = idempotency.record[Constants.DDB_FIELD_IDEMPOTENCY_KEY]
+        row = connection.execute('SELECT record FROM records WHERE table_name = ? AND idempotency_key = ?',
+                                 (idempotency.table_name, key)).fetchone()
+        check_idempotency(idempotency, None if row is None else load(row[0]))
+        connection.execute('INSERT OR REPLACE INTO records VALUES (?, ?, ?)',
+                           (idempotency.table_name, key, dump(normalize_item(idempotency.record))))
+
+    def put(self, item, idempotency=None):
+        item = normalize_item(item)
+        with self.transaction() as connection:
+            if idempotency is not None:
+                if self.read_item(connection, item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER],
+                                  item[Constants.DDB_FIELD_MODIFIED_DATE]) is not None:
+                    raise DuplicateRequestError(idempotency.record[Constants.DDB_FIELD_IDEMPOTENCY_KEY])
+                self.store_record(connection, idempotency)
+            self.store(connection, [item])
+        return dict()
+
+    def modify(self, item, expected_modified_date, idempotency=None):
+        item = normalize_item(item)
+        resource_identifier = item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER]
+        modified_date = item[Constants.DDB_FIELD_MODIFIED_DATE]
+        with self.transaction() as connection:
+            expected_item = self.read_item(connection, resource_identifier, expected_modified_date)
+            if not can_supersede(expected_item, item) or \
+                    self.read_item(connection, resource_identifier, modified_date) is not None:
+                raise concurrent_modification(item, expected_modified_date)
+            if idempotency is not None:
+                self.store_record(connection, idempotency)
+            self.store(connection, [superseded(expected_item, item), item])
+        return dict()
+
+    def query(self, resource_identifier, modified_from=None, modified_to=None, ascending=True, limit=None,
+              exclusive_start_key=None, consistent_read=False, attributes=None):
+        statement = 'SELECT modified_date, item FROM versions WHERE resource_identifier = ?'
+        parameters = [resource_identifier]
+        if modified_from is not None:
+            statement += ' AND modified_date >= ?'
+            parameters.append(modified_from)
+        if modified_to is not None:
+            statement += ' AND modified_date <= ?'
+            parameters.append(modified_to)
+        if exclusive_start_key is not None:
+            statement += ' AND modified_date > ?' if ascending else ' AND modified_date < ?'
+            parameters.append(exclusive_start_key[Constants.DDB_FIELD_MODIFIED_DATE])
+        statement += ' ORDER BY modified_date ' + ('ASC' if ascending else 'DESC')
+        if limit is not None:
+            statement += ' LIMIT ?'
+            parameters.append(limit + 1)
+        with self.lock:
+            rows = self.connection.execute(statement, parameters).fetchall()
+        last_key = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last_key = {
+                Constants.DDB_FIELD_RESOURCE_IDENTIFIER: resource_identifier,
+                Constants.DDB_FIELD_MODIFIED_DATE: rows[-1][0]
+            }
+        items = [load(row[1]) for row in rows]
+        if attributes is not None:
+            items = [project_item(item, attributes) for item in items]
+        return items, last_key
+
+    def query_owner(self, owner, status=None, limit=None, exclusive_start_key=None):
+        statement = 'SELECT resource_identifier, modified_date, item FROM versions WHERE latest_owner = ?'
+        parameters = [owner]
+        if exclusive_start_key is not None:
+            statement += ' AND (modified_date, resource_identifier) < (?, ?)'
+            parameters.extend((exclusive_start_key[Constants.DDB_FIELD_MODIFIED_DATE],
+                               exclusive_start_key[Constants.DDB_FIELD_RESOURCE_IDENTIFIER]))
+        statement += ' ORDER BY modified_date DESC, resource_identifier DESC'
+        if limit is not None:
+            statement += ' LIMIT ?'
+            parameters.append(limit + 1)
+        with self.lock:
+            rows = self.connection.execute(statement, parameters).fetchall()
+        last_key = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last_key = {
+                Constants.DDB_FIELD_RESOURCE_IDENTIFIER: rows[-1][0],
+                Constants.DDB_FIELD_MODIFIED_DATE: rows[-1][1],
+                Constants.DDB_FIELD_LATEST_OWNER: owner
+            }
+        items = [load(row[2]) for row in rows]
+        if status is not None:
+            items = [item for item in items if item.get(Constants.DDB_FIELD_STATUS) == status]
+        return items, last_key
+
+    def scan(self, segment=0, total_segments=1, limit=None, exclusive_start_key=None):
+        statement = 'SELECT resource_identifier, modified_date, item FROM versions WHERE 1'
+        parameters = []
+        if total_segments > 1:
+            statement += ' AND scan_segment(resource_identifier, ?) = ?'
+            parameters.extend((total_segments, segment))
+        if exclusive_start_key is not None:
+            statement += ' AND (resource_identifier, modified_date) > (?, ?)'
+            parameters.extend((exclusive_start_key[Constants.DDB_FIELD_RESOURCE_IDENTIFIER],
+                               exclusive_start_key[Constants.DDB_FIELD_MODIFIED_DATE]))
+        statement += ' ORDER BY resource_identifier, modified_date'
+        if limit is not None:
+            statement += ' LIMIT ?'
+            parameters.append(limit + 1)
+        with self.lock:
+            rows = self.connection.execute(statement, parameters).fetchall()
+        last_key = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last_key = {
+                Constants.DDB_FIELD_RESOURCE_IDENTIFIER: rows[-1][0],
+                Constants.DDB_FIELD_MODIFIED_DATE: rows[-1][1]
+            }
+        return [load(row[2]) for row in rows], last_key
+
+    def write_items(self, items):
+        items = [normalize_item(item) for item in items]
+        with self.transaction() as connection:
+            self.store(connection, items)
+        return []
+
+    def get_record(self, table_name, idempotency_key):
+        with self.lock:
+            row = self.connection.execute('SELECT record FROM records WHERE table_name = ? AND idempotency_key = ?',
+                                          (table_name, idempotency_key)).fetchone()
+        return None if row is None else load(row[0])
@@ -0,0 +1,108 @@
+import zlib
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from common.constants import Constants
+from common.exceptions import ConcurrentModificationError, DuplicateRequestError
+
+SERIALIZER = TypeSerializer()
+DESERIALIZER = TypeDeserializer()
+
+
+def normalize_item(item):
+    """Converts an item to the types DynamoDB would return for it, numbers become Decimal and bytes Binary."""
+    return DESERIALIZER.deserialize(SERIALIZER.serialize(item))
+
+
+def concurrent_modification(item, expected_modified_date):
+    return ConcurrentModificationError('Resource with identifier ' + item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER] +
+                                       ' has been modified since ' + expected_modified_date)
+
+
+def can_supersede(expected_item, item):
+    """Whether item may replace expected_item as the latest version, the condition of a modification."""
+    return expected_item is not None and \
+        expected_item.get(Constants.DDB_FIELD_CREATED_DATE) == item.get(Constants.DDB_FIELD_CREATED_DATE) and \
+        Constants.DDB_FIELD_SUPERSEDED_DATE not in expected_item
+
+
+def superseded(expected_item, item):
+    superseded_item = dict(expected_item)
+    superseded_item[Constants.DDB_FIELD_SUPERSEDED_DATE] = item[Constants.DDB_FIELD_MODIFIED_DATE]
+    superseded_item.pop(Constants.DDB_FIELD_LATEST_OWNER, None)
+    return superseded_item
+
+
+def scan_segment(resource_identifier, total_segments):
+    """The segment engines other than DynamoDB scan a resource in, the same for all its versions."""
+    return zlib.crc32(resource_identifier.encode('utf-8')) % total_segments
+
+
+def check_idempotency(idempotency, existing_record):
+    """Raises DuplicateRequestError if a live record holds the key of the idempotency write."""
+    if existing_record is not None and existing_record[Constants.DDB_FIELD_EXPIRES_AT] > idempotency.now:
+        raise DuplicateRequestError(idempotency.record[Constants.DDB_FIELD_IDEMPOTENCY_KEY])
+
+
+class Storage:
+    """Where the versions of resources and idempotency records are kept.
+
+    Items are stored as StorageCodec encodes them, keyed by resource_identifier and modifiedDate. Only the latest
+    version of a resource has latestOwner, which is what query_owner() finds. Every engine behaves like the DynamoDB
+    table: a query page ends after limit evaluated items and returns the key of the last one when there are more,
+    and an idempotency write succeeds only when no live record with its key exists.
+
+    DynamoDBStorage is the production engine. MemoryStorage and SqliteStorage run the handler without DynamoDB, for
+    load tests and offline runs.
+    """
+
+    def prewarm(self):
+        """Opens connections ahead of the first request."""
+        pass
+
+    def instrument(self, metrics):
+        """Reports the calls of this engine to metrics."""
+        pass
+
+    def put(self, item, idempotency=None):
+        """Puts a version. With an IdempotencyWrite the version is put only if its key is new, together with the
+        record, or DuplicateRequestError is raised."""
+        raise NotImplementedError
+
+    def modify(self, item, expected_modified_date, idempotency=None):
+        """Marks the version at expected_modified_date as superseded by item and puts item, in one atomic step.
+
+        Raises ConcurrentModificationError if that version does not exist, has another createdDate or was already
+        superseded, and DuplicateRequestError if the key of the IdempotencyWrite has been recorded.
+        """
+        raise NotImplementedError
+
+    def query(self, resource_identifier, modified_from=None, modified_to=None, ascending=True, limit=None,
+              exclusive_start_key=None, consistent_read=False, attributes=None):
+        """Returns a page of versions of a resource in the inclusive date range, and the key to continue from or
+        None. attributes limits the returned attributes to these paths."""
+        raise NotImplementedError
+
+    def query_owner(self, owner, status=None, limit=None, exclusive_start_key=None):
+        """Returns a page of the latest versions owned by owner, newest first, and the key to continue from or None.
+        A status filter applies after limit, so a page can be short."""
+        raise NotImplementedError
+
+    def scan(self, segment=0, total_segments=1, limit=None, exclusive_start_key=None):
+        """Returns a page of the versions in one of total_segments segments, and the key to continue from or None.
+
+        Every resource is in one segment, with its versions next to each other in modifiedDate order.
+        """
+        raise NotImplementedError
+
+    def write_items(self, items):
+        """Puts items in batches and returns the ones that could not be written."""
+        raise NotImplementedError
+
+    def get_record(self, table_name, idempotency_key):
+        """Returns the idempotency record stored under idempotency_key, expired or not, or None."""
+        raise NotImplementedError
+
+    def update_record(self, table_name, idempotency_key, fingerprint, attributes):
+        """Sets attributes on the idempotency record stored under idempotency_key if it still has fingerprint."""
+        raise NotImplementedError
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import zlib
+from decimal import Decimal
+
+from boto3.dynamodb.types import Binary
+
+from common.constants import Constants
+from common.exceptions import BlobError
+from common.helpers import encode_decimal
+
+
+def attribute_size(value):
+    """Approximates the number of bytes DynamoDB bills for an attribute value."""
+    if value is None or isinstance(value, bool):
+        return 1
+    elif isinstance(value, str):
+        return len(value.encode('utf-8'))
+    elif isinstance(value, (bytes, bytearray)):
+        return len(value)
+    elif isinstance(value, Binary):
+        return len(value.value)
+    elif isinstance(value, (int, float, Decimal)):
+        return len(str(value).lstrip('-').replace('.', '')) // 2 + 2
+    elif isinstance(value, dict):
+        return 3 + sum(len(key.encode('utf-8')) + attribute_size(entry) + 1 for key, entry in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        return 3 + sum(attribute_size(entry) + 1 for entry in value)
+    else:
+        return len(str(value).encode('utf-8'))
+
+
+def item_size(item):
+    return sum(len(name.encode('utf-8')) + attribute_size(value) for name, value in item.items())
+
+
+class StorageCodec:
+    """Compresses metadata and files into a Binary attribute once their JSON form reaches threshold bytes.
+
+    Compressed values start with a format marker, so items written before compression was enabled, or below
+    the threshold, are read unchanged. A threshold of 0 disables compression on write.
+
+    With a blob_store, values whose JSON form reaches offload_threshold bytes are moved to it and the item keeps a
+    pointer: the offload marker and the SHA-256 digest of the JSON. Unchanged values share one blob. A blob is only
+    read when its attribute is decoded, and then eagerly: it is streamed and checked against its digest, but the whole
+    attribute is decoded and held in memory. Blobs are never deleted, not even when no version points to them any
+    more.
+    """
+
+    def __init__(self, threshold=0, level=Constants.DEFAULT_COMPRESSION_LEVEL,
+                 attributes=Constants.DDB_COMPRESSED_ATTRIBUTES, blob_store=None, offload_threshold=0):
+        if offload_threshold > 0 and blob_store is None:
+            raise ValueError('Offloading needs a blob store')
+        self.threshold = threshold
+        self.level = level
+        self.attributes = attributes
+        self.blob_store = blob_store
+        self.offload_threshold = offload_threshold
+
+    @property
+    def enabled(self):
+        return self.threshold > 0 or self.offload_threshold > 0
+
+    def encode_attribute(self, value):
+        if not self.enabled or value is None or isinstance(value, (bytes, bytearray, Binary)):
+            return value
+        data = json.dumps(value, separators=(',', ':'), ensure_ascii=False, sort_keys=True,
+                          default=encode_decimal).encode('utf-8')
+        if 0 < self.offload_threshold <= len(data):
+            return self.offload(data)
+        if self.threshold <= 0 or len(data) < self.threshold:
+            return value
+        return Binary(Constants.COMPRESSION_FORMAT_MARKER + zlib.compress(data, self.level))
+
+    def offload(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.blob_store.exists(digest):
+            self.blob_store.put(digest, zlib.compress(data, self.level))
+        return Binary(Constants.OFFLOAD_FORMAT_MARKER + digest.encode('ascii'))
+
+    def rehydrate(self, digest):
+        """Reads the blob in chunks, checks it against digest and returns the decoded attribute.
+
+        The decompressed JSON is collected in full before it is parsed, so memory grows with the size of the attribute.
+        """
+        if self.blob_store is None:
+            raise BlobError('Blob ' + digest + ' cannot be read without a blob store')
+        decompressor = zlib.decompressobj()
+        content_hash = hashlib.sha256()
+        data = bytearray()
+        with self.blob_store.open(digest) as blob:
+            for chunk in iter(lambda: blob.read(Constants.BLOB_CHUNK_SIZE), b''):
+                chunk = decompressor.decompress(chunk)
+                content_hash.update(chunk)
+                data += chunk
+        chunk = decompressor.flush()
+        content_hash.update(chunk)
+        data += chunk
+        if content_hash.hexdigest() != digest:
+            raise BlobError('Blob ' + digest + ' does not match its digest')
+        return json.loads(data.decode('utf-8'), parse_float=Decimal, parse_int=Decimal)
+
+    def decode_attribute(self, value):
+        if isinstance(value, Binary):
+            value = value.value
+        if isinstance(value, (bytes, bytearray)) and value.startswith(Constants.COMPRESSION_FORMAT_MARKER):
+            data = zlib.decompress(value[len(Constants.COMPRESSION_FORMAT_MARKER):])
+            return json.loads(data.decode('utf-8'), parse_float=Decimal, parse_int=Decimal)
+        if isinstance(value, (bytes, bytearray)) and value.startswith(Constants.OFFLOAD_FORMAT_MARKER):
+            return self.rehydrate(bytes(value[len(Constants.OFFLOAD_FORMAT_MARKER):]).decode('ascii'))
+        return value
+
+    def encode_item(self, item):
+        if not self.enabled:
+            return item
+        encoded_item = dict(item)
+        for attribute in self.attributes:
+            if attribute in encoded_item:
+                encoded_item[attribute] = self.encode_attribute(encoded_item[attribute])
+        return encoded_item
+
+    def decode_item(self, item):
+        if item is None:
+            return None
+        decoded_item = None
+        for attribute in self.attributes:
+            value = item.get(attribute)
+            if isinstance(value, (bytes, bytearray, Binary)):
+                if decoded_item is None:
+                    decoded_item = dict(item)
+                decoded_item[attribute] = self.decode_attribute(value)
+        return item if decoded_item is None else decoded_item
+
+    def storage_paths(self, paths):
+        """Maps projection paths to paths that can be read from storage.
+
+        Nested paths inside an attribute that may be compressed or offloaded are widened to the whole attribute.
+        """
+        storage_paths = []
+        for path in paths:
+            attribute = path.split('.', 1)[0]
+            storage_path = attribute if attribute in self.attributes else path
+            if storage_path not in storage_paths:
+                storage_paths.append(storage_path)
+        return storage_paths
@@ -0,0 +1,55 @@
+import random
+import time
+
+from common.constants import Constants
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def backoff_delay(attempt, base_delay=Constants.DDB_BATCH_WRITE_BASE_DELAY,
+                  max_delay=Constants.DDB_BATCH_WRITE_MAX_DELAY):
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def put_requests(items):
+    return [{Constants.DDB_BATCH_PUT_REQUEST: {Constants.DDB_BATCH_ITEM: item}} for item in items]
+
+
+def delete_requests(keys):
+    return [{Constants.DDB_BATCH_DELETE_REQUEST: {Constants.DDB_BATCH_KEY: key}} for key in keys]
+
+
+def write_chunk(dynamodb, table_name, chunk, max_attempts=Constants.DDB_BATCH_WRITE_MAX_ATTEMPTS, sleep=time.sleep):
+    """Writes up to 25 requests and returns the ones still unprocessed after max_attempts."""
+    pending = chunk
+    attempt = 0
+    while len(pending) > 0:
+        ddb_response = dynamodb.batch_write_item(RequestItems={table_name: pending})
+        pending = ddb_response.get(Constants.DDB_RESPONSE_ATTRIBUTE_NAME_UNPROCESSED_ITEMS, {}).get(table_name, [])
+        attempt += 1
+        if len(pending) > 0:
+            if attempt >= max_attempts:
+                return pending
+            sleep(backoff_delay(attempt))
+    return []
+
+
+def batch_write(dynamodb, table_name, requests, max_attempts=Constants.DDB_BATCH_WRITE_MAX_ATTEMPTS,
+                sleep=time.sleep, executor=None):
+    """Writes requests in chunks of 25 and retries unprocessed items with jittered exponential backoff.
+
+    With an executor the chunks are written concurrently. Returns the requests that were still unprocessed after
+    max_attempts, in request order.
+    """
+    def write(chunk):
+        return write_chunk(dynamodb, table_name, chunk, max_attempts, sleep)
+
+    all_chunks = chunks(requests, Constants.DDB_BATCH_WRITE_MAX_ITEMS)
+    results = map(write, all_chunks) if executor is None else executor.map(write, all_chunks)
+    unprocessed = []
+    for pending in results:
+        unprocessed.extend(pending)
+    return unprocessed
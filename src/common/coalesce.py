@@ -0,0 +1,28 @@
+def merge_values(base, update):
+    """Merges update into base, recursing into objects. Values that are not objects are replaced."""
+    if not isinstance(base, dict) or not isinstance(update, dict):
+        return update
+    merged = dict(base)
+    for key, value in update.items():
+        merged[key] = merge_values(base[key], value) if key in base else value
+    return merged
+
+
+def merge_resources(resource_dicts):
+    """Folds JSON resources into one, later resources win, so a map like files keeps the entries of earlier ones."""
+    merged = resource_dicts[0]
+    for resource_dict in resource_dicts[1:]:
+        merged = merge_values(merged, resource_dict)
+    return merged
+
+
+def group_by_identifier(entries):
+    """Groups (index, resource dict, resource) entries by resource identifier.
+
+    Groups are returned in the order of their first entry and keep the order of their entries.
+    """
+    groups = dict()
+    for entry in entries:
+        groups.setdefault(entry[2].resource_identifier, []).append(entry)
+    return list(groups.values())
+
@@ -1,14 +1,146 @@
 class Constants:
     ENV_VAR_REGION = 'REGION'
     ENV_VAR_TABLE_NAME = 'TABLE_NAME'
+    ENV_VAR_DDB_MAX_POOL_CONNECTIONS = 'DDB_MAX_POOL_CONNECTIONS'
+    ENV_VAR_DDB_TCP_KEEPALIVE = 'DDB_TCP_KEEPALIVE'
+    ENV_VAR_DDB_CONNECT_TIMEOUT = 'DDB_CONNECT_TIMEOUT'
+    ENV_VAR_DDB_READ_TIMEOUT = 'DDB_READ_TIMEOUT'
+
+    ENV_VAR_CACHE_MAX_SIZE = 'CACHE_MAX_SIZE'
+    ENV_VAR_CACHE_TTL_SECONDS = 'CACHE_TTL_SECONDS'
+    ENV_VAR_COMPRESSION_THRESHOLD = 'COMPRESSION_THRESHOLD_BYTES'
+    ENV_VAR_OFFLOAD_THRESHOLD = 'OFFLOAD_THRESHOLD_BYTES'
+    ENV_VAR_BLOB_STORE_PATH = 'BLOB_STORE_PATH'
+    ENV_VAR_VERSIONING_MODE = 'VERSIONING_MODE'
+    ENV_VAR_SNAPSHOT_INTERVAL = 'SNAPSHOT_INTERVAL'
+    ENV_VAR_JSON_BACKEND = 'JSON_BACKEND'
+    ENV_VAR_RESPONSE_FORMAT = 'RESPONSE_FORMAT'
+    ENV_VAR_DECODE_MODE = 'DECODE_MODE'
+    ENV_VAR_COALESCE_MODE = 'COALESCE_MODE'
+    ENV_VAR_STORAGE_ENGINE = 'STORAGE_ENGINE'
+    ENV_VAR_SQLITE_PATH = 'SQLITE_PATH'
+    ENV_VAR_PREWARM = 'PREWARM'
+    ENV_VAR_METRICS_ENABLED = 'METRICS_ENABLED'
+    ENV_VAR_IDEMPOTENCY_TABLE_NAME = 'IDEMPOTENCY_TABLE_NAME'
+    ENV_VAR_IDEMPOTENCY_TTL_SECONDS = 'IDEMPOTENCY_TTL_SECONDS'
+    ENV_VAR_EXECUTOR_MAX_WORKERS = 'EXECUTOR_MAX_WORKERS'
+    ENV_VAR_EXECUTOR_CALL_TIMEOUT = 'EXECUTOR_CALL_TIMEOUT_SECONDS'
+
+    DEFAULT_DDB_MAX_POOL_CONNECTIONS = 10
+    DEFAULT_DDB_TCP_KEEPALIVE = True
+    DEFAULT_DDB_CONNECT_TIMEOUT = 2.0
+    DEFAULT_DDB_READ_TIMEOUT = 5.0
+    DEFAULT_CACHE_MAX_SIZE = 1000
+    DEFAULT_CACHE_TTL_SECONDS = 10.0
+    DEFAULT_COMPRESSION_THRESHOLD = 0
+    DEFAULT_COMPRESSION_LEVEL = 6
+    DEFAULT_OFFLOAD_THRESHOLD = 0
+    BLOB_CHUNK_SIZE = 65536
+    DEFAULT_SNAPSHOT_INTERVAL = 10
+    DEFAULT_PREWARM = False
+    DEFAULT_METRICS_ENABLED = False
+    DEFAULT_IDEMPOTENCY_TTL_SECONDS = 86400
+    MAX_IDEMPOTENCY_KEY_LENGTH = 255
+    DEFAULT_EXECUTOR_MAX_WORKERS = 8
+    DEFAULT_EXECUTOR_CALL_TIMEOUT = 0.0
+    DEFAULT_ENCODE_CHUNK_SIZE = 500
+
+    METRICS_NAMESPACE = 'DataPersistence'
+    METRICS_DIMENSION_OPERATION = 'Operation'
+    METRICS_STATUS_CODE = 'StatusCode'
+    METRICS_TOTAL_TIME = 'TotalTime'
+    METRICS_CONSUMED_CAPACITY = 'ConsumedCapacity'
+    METRICS_RETRY_ATTEMPTS = 'RetryAttempts'
+    METRICS_STORAGE_CALLS = 'StorageCalls'
+    METRICS_UNIT_MILLISECONDS = 'Milliseconds'
+    METRICS_UNIT_COUNT = 'Count'
+    PHASE_PARSE = 'ParseTime'
+    PHASE_DECODE = 'DecodeTime'
+    PHASE_VALIDATE = 'ValidateTime'
+    PHASE_STORAGE = 'StorageTime'
+    PHASE_SERIALIZE = 'SerializeTime'
+    DDB_RETURN_CONSUMED_CAPACITY_TOTAL = 'TOTAL'
+    DDB_CAPACITY_OPERATIONS = frozenset(('GetItem', 'PutItem', 'UpdateItem', 'DeleteItem', 'Query', 'Scan',
+                                         'BatchGetItem', 'BatchWriteItem', 'TransactGetItems', 'TransactWriteItems'))
+
+    VERSIONING_MODE_FULL = 'full'
+    VERSIONING_MODE_DELTA = 'delta'
+    VERSIONING_MODES = (VERSIONING_MODE_FULL, VERSIONING_MODE_DELTA)
+    DEFAULT_VERSIONING_MODE = VERSIONING_MODE_FULL
+
+    JSON_BACKEND_AUTO = 'auto'
+    JSON_BACKEND_ORJSON = 'orjson'
+    JSON_BACKEND_STDLIB = 'json'
+    DEFAULT_JSON_BACKEND = JSON_BACKEND_AUTO
+
+    DECODE_MODE_STRICT = 'strict'
+    DECODE_MODE_LENIENT = 'lenient'
+    DECODE_MODES = (DECODE_MODE_STRICT, DECODE_MODE_LENIENT)
+    DEFAULT_DECODE_MODE = DECODE_MODE_STRICT
+
+    COALESCE_MODE_OFF = 'off'
+    COALESCE_MODE_LAST = 'last'
+    COALESCE_MODE_MERGE = 'merge'
+    COALESCE_MODES = (COALESCE_MODE_OFF, COALESCE_MODE_LAST, COALESCE_MODE_MERGE)
+    DEFAULT_COALESCE_MODE = COALESCE_MODE_OFF
+
+    STORAGE_ENGINE_DYNAMODB = 'dynamodb'
+    STORAGE_ENGINE_MEMORY = 'memory'
+    STORAGE_ENGINE_SQLITE = 'sqlite'
+    STORAGE_ENGINES = (STORAGE_ENGINE_DYNAMODB, STORAGE_ENGINE_MEMORY, STORAGE_ENGINE_SQLITE)
+    DEFAULT_STORAGE_ENGINE = STORAGE_ENGINE_DYNAMODB
+    DEFAULT_SQLITE_PATH = ':memory:'
+
+    RESPONSE_FORMAT_FULL = 'full'
+    RESPONSE_FORMAT_SLIM = 'slim'
+    RESPONSE_FORMATS = (RESPONSE_FORMAT_FULL, RESPONSE_FORMAT_SLIM)
+    DEFAULT_RESPONSE_FORMAT = RESPONSE_FORMAT_FULL
 
     EVENT_BODY = 'body'
+    EVENT_RECORDS = 'Records'
+    EVENT_SOURCE = 'eventSource'
+    EVENT_SQS_MESSAGE_ID = 'messageId'
+    EVENT_KINESIS = 'kinesis'
+    EVENT_KINESIS_DATA = 'data'
+    EVENT_KINESIS_SEQUENCE_NUMBER = 'sequenceNumber'
+    BATCH_ITEM_FAILURES = 'batchItemFailures'
+    BATCH_ITEM_IDENTIFIER = 'itemIdentifier'
 
     OPERATION_INSERT = 'INSERT'
     OPERATION_MODIFY = 'MODIFY'
+    OPERATION_GET = 'GET'
+    OPERATION_LIST_VERSIONS = 'LIST_VERSIONS'
+    OPERATION_LIST_BY_OWNER = 'LIST_BY_OWNER'
+    OPERATION_BATCH_INSERT = 'BATCH_INSERT'
+    OPERATION_BATCH_MODIFY = 'BATCH_MODIFY'
 
     JSON_ATTRIBUTE_NAME_OPERATION = 'operation'
     JSON_ATTRIBUTE_NAME_RESOURCE = 'resource'
+    JSON_ATTRIBUTE_NAME_RESOURCES = 'resources'
+    JSON_ATTRIBUTE_NAME_EXPECTED_MODIFIED_DATE = 'expectedModifiedDate'
+    JSON_ATTRIBUTE_NAME_CONSISTENT_READ = 'consistentRead'
+    JSON_ATTRIBUTE_NAME_FIELDS = 'fields'
+    JSON_ATTRIBUTE_NAME_MODIFIED_FROM = 'modifiedFrom'
+    JSON_ATTRIBUTE_NAME_MODIFIED_TO = 'modifiedTo'
+    JSON_ATTRIBUTE_NAME_ORDER = 'order'
+    JSON_ATTRIBUTE_NAME_PAGE_SIZE = 'pageSize'
+    JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN = 'continuationToken'
+    JSON_ATTRIBUTE_NAME_VERSIONS = 'versions'
+    JSON_ATTRIBUTE_NAME_OWNER = 'owner'
+    JSON_ATTRIBUTE_NAME_STATUS = 'status'
+    JSON_ATTRIBUTE_NAME_RESPONSE_FORMAT = 'responseFormat'
+    JSON_ATTRIBUTE_NAME_IDEMPOTENCY_KEY = 'idempotencyKey'
+
+    ORDER_ASCENDING = 'ASC'
+    ORDER_DESCENDING = 'DESC'
+    DEFAULT_PAGE_SIZE = 50
+    BULK_CHECKPOINT_INTERVAL = 100
+    MAX_PAGE_SIZE = 1000
+    JSON_ATTRIBUTE_NAME_RESULTS = 'results'
+    JSON_ATTRIBUTE_NAME_INDEX = 'index'
+    JSON_ATTRIBUTE_NAME_STATUS_CODE = 'statusCode'
+    JSON_ATTRIBUTE_NAME_ERROR = 'error'
+    JSON_ATTRIBUTE_NAME_COALESCED = 'coalesced'
 
     RESPONSE_STATUS_CODE = 'statusCode'
     RESPONSE_BODY = 'body'
@@ -17,6 +149,21 @@ class Constants:
     DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS = 'Items'
     DDB_RESPONSE_ATTRIBUTE_NAME_RESPONSE_METADATA = 'ResponseMetadata'
     DDB_RESPONSE_ATTRIBUTE_NAME_RESPONSE_HTTP_STATUS_CODE = 'HTTPStatusCode'
+    DDB_RESPONSE_ATTRIBUTE_NAME_UNPROCESSED_ITEMS = 'UnprocessedItems'
+    DDB_RESPONSE_ATTRIBUTE_NAME_LAST_EVALUATED_KEY = 'LastEvaluatedKey'
+
+    DDB_ERROR_TRANSACTION_CANCELED = 'TransactionCanceledException'
+    DDB_CANCELLATION_REASONS = 'CancellationReasons'
+    DDB_CANCELLATION_CONDITIONAL_CHECK_FAILED = 'ConditionalCheckFailed'
+
+    DDB_BATCH_PUT_REQUEST = 'PutRequest'
+    DDB_BATCH_DELETE_REQUEST = 'DeleteRequest'
+    DDB_BATCH_ITEM = 'Item'
+    DDB_BATCH_KEY = 'Key'
+    DDB_BATCH_WRITE_MAX_ITEMS = 25
+    DDB_BATCH_WRITE_MAX_ATTEMPTS = 8
+    DDB_BATCH_WRITE_BASE_DELAY = 0.05
+    DDB_BATCH_WRITE_MAX_DELAY = 2.0
 
     DDB_FIELD_RESOURCE_IDENTIFIER = 'resource_identifier'
     DDB_FIELD_MODIFIED_DATE = 'modifiedDate'
@@ -24,5 +171,47 @@ class Constants:
     DDB_FIELD_METADATA = 'metadata'
     DDB_FIELD_FILES = 'files'
     DDB_FIELD_OWNER = 'owner'
+    DDB_FIELD_STATUS = 'status'
+    DDB_FIELD_PUBLISHED_DATE = 'publishedDate'
+    DDB_FIELD_INDEXED_DATE = 'indexedDate'
+    DDB_FIELD_SUPERSEDED_DATE = 'supersededDate'
+    DDB_FIELD_LATEST_OWNER = 'latestOwner'
+    DDB_FIELD_VERSION_NUMBER = 'versionNumber'
+    DDB_FIELD_DELTA = 'delta'
+    DDB_FIELD_IDEMPOTENCY_KEY = 'idempotencyKey'
+    DDB_FIELD_FINGERPRINT = 'fingerprint'
+    DDB_FIELD_OPERATION = 'operation'
+    DDB_FIELD_STATUS_CODE = 'statusCode'
+    DDB_FIELD_EXPIRES_AT = 'expiresAt'
+    DDB_FIELD_RESPONSE_BODY = 'responseBody'
+    DDB_FIELD_RESPONSE_FORMAT = 'responseFormat'
+    DDB_IDEMPOTENCY_RESPONSE_FIELDS = (DDB_FIELD_RESOURCE_IDENTIFIER, DDB_FIELD_MODIFIED_DATE, DDB_FIELD_CREATED_DATE,
+                                       DDB_FIELD_STATUS)
+
+    STATUS_PUBLISHED = 'published'
+
+    DELTA_SET = 'set'
+    DELTA_REMOVE = 'remove'
+    DELTA_VALUE = 'value'
+
+    DDB_INDEX_OWNER = 'OwnerIndex'
+
+    DDB_COMPRESSED_ATTRIBUTES = (DDB_FIELD_METADATA, DDB_FIELD_FILES)
+    TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+    COMPRESSION_FORMAT_MARKER = b'\x00zj1'
+    OFFLOAD_FORMAT_MARKER = b'\x00bp1'
+    DDB_DELTA_FIELDS = (DDB_FIELD_METADATA, DDB_FIELD_FILES)
+
+    DDB_KEY_ATTRIBUTES = [DDB_FIELD_RESOURCE_IDENTIFIER, DDB_FIELD_MODIFIED_DATE]
+    DDB_OWNER_INDEX_KEY_ATTRIBUTES = [DDB_FIELD_RESOURCE_IDENTIFIER, DDB_FIELD_MODIFIED_DATE, DDB_FIELD_LATEST_OWNER]
+    DDB_LATEST_VERSION_ATTRIBUTES = [DDB_FIELD_RESOURCE_IDENTIFIER, DDB_FIELD_MODIFIED_DATE, DDB_FIELD_CREATED_DATE]
+
+    SCHEMA_ERROR_INVALID_TYPE = 'invalid attribute type for '
+    SCHEMA_ERROR_UNKNOWN_ATTRIBUTE = 'unknown attribute '
 
     ERROR_MISSING_EVENT = 'Missing event'
+    ERROR_INSUFFICIENT_PARAMETERS = 'Insufficient parameters'
+    ERROR_NOT_PROCESSED = 'Not processed, retry later'
+    ERROR_UNSUPPORTED_RECORD_OPERATION = 'Records must be INSERT or MODIFY requests'
+    ERROR_IDEMPOTENCY_DISABLED = 'Idempotency keys are not enabled'
+    ERROR_IDEMPOTENCY_KEY_REUSED = 'Idempotency key has already been used for a different request'
@@ -0,0 +1,9 @@
+from common.constants import Constants
+from data.resource import Resource
+
+
+def decode_resource(value):
+    """Decodes a stored resource through the compiled resource schema, dropping bookkeeping attributes."""
+    if value is None:
+        return None
+    return Resource.from_dict(value, Constants.DECODE_MODE_LENIENT)
@@ -1,97 +1,67 @@
-from common.helpers import remove_none_values
-from data.creator import Creator
-from data.file_metadata import FileMetadata
-from data.metadata import Metadata
+import json
+
+from common.constants import Constants
+from common.schema import CREATOR_SCHEMA, FILE_METADATA_SCHEMA, FILES_SCHEMA, METADATA_SCHEMA, RESOURCE_SCHEMA, \
+    Schema, compile_encoder, not_serializable
 from data.resource import Resource
 
+_encode_file_metadata = FILE_METADATA_SCHEMA.encoder()
+_encode_files = compile_encoder(FILES_SCHEMA)
+_encode_creator = compile_encoder(CREATOR_SCHEMA)
+_encode_metadata = METADATA_SCHEMA.encoder()
+_encode_resource = RESOURCE_SCHEMA.encoder()
+_encode_resource_without_files = compile_encoder(Schema(RESOURCE_SCHEMA.name, tuple(
+    field for field in RESOURCE_SCHEMA.fields if field.key != Constants.DDB_FIELD_FILES)))
+
 
 def encode_file_metadata(instance):
-    if isinstance(instance, FileMetadata):
-        temp_value = {
-            'filename': instance.filename,
-            'mimetype': instance.mime_type,
-            'checksum': instance.checksum,
-            'size': instance.size
-        }
-        return remove_none_values(temp_value)
-    else:
-        type_name = instance.__class__.__name__
-        raise TypeError(f"Object of type '{type_name}' is not JSON serializable")
+    return _encode_file_metadata(instance)
 
 
 def encode_files(instance):
     if instance is None:
         return None
-    elif isinstance(instance, dict):
-        files = dict()
-        for key, value in instance.items():
-            files[key] = encode_file_metadata(value)
-        return files
-    else:
-        type_name = instance.__class__.__name__
-        raise TypeError(f"Object of type '{type_name}' is not JSON serializable")
+    return _encode_files(instance)
 
 
 def encode_creator(instance):
-    if isinstance(instance, Creator):
-        return instance.identifier
-    else:
-        type_name = instance.__class__.__name__
-        raise TypeError(f"Object of type '{type_name}' is not JSON serializable")
+    return _encode_creator(instance)
 
 
 def encode_metadata(instance):
     if instance is None:
         return None
-    elif isinstance(instance, Metadata):
-
-        if instance.creators is None:
-            creators = None
-        else:
-            creators = []
-            for creator in instance.creators:
-                creators.append(encode_creator(creator))
-
-        if instance.titles is None:
-            titles = None
-        else:
-            titles = dict()
-            for key, value in instance.titles.items():
-                if value is not None:
-                    titles[key] = value
-            if len(titles.keys()) is 0:
-                titles = None
-        temp_value = {
-            'creators': creators,
-            'handle': instance.handle,
-            'license': instance.license_identifier,
-            'publicationYear': instance.publication_year,
-            'publisher': instance.publisher,
-            'titles': titles,
-            'type': instance.resource_type
-        }
-        return remove_none_values(temp_value)
-    else:
-        type_name = instance.__class__.__name__
-        raise TypeError(f"Object of type {type_name} is not JSON serializable")
+    return _encode_metadata(instance)
 
 
 def encode_resource(instance):
     if instance is None:
         return None
-    if isinstance(instance, Resource):
-        temp_value = {
-            'resource_identifier': instance.resource_identifier,
-            'modifiedDate': instance.modified_date,
-            'createdDate': instance.created_date,
-            'metadata': encode_metadata(instance.metadata),
-            'files': encode_files(instance.files),
-            'owner': instance.owner,
-            'status': instance.status,
-            'publishedDate': instance.published_date,
-            'indexedDate': instance.indexed_date
-        }
-        return remove_none_values(temp_value)
-    else:
-        type_name = instance.__class__.__name__
-        raise TypeError(f"Object of type '{type_name}' is not JSON serializable")
+    if not isinstance(instance, Resource):
+        raise not_serializable(instance)
+    return _encode_resource(instance)
+
+
+def iterencode_resource(instance, dumps=json.dumps, chunk_size=Constants.DEFAULT_ENCODE_CHUNK_SIZE):
+    """Yields the JSON text of a resource in chunks, encoding chunk_size files at a time so a large files map is never
+    held in memory twice.
+    """
+    if not isinstance(instance, Resource) or instance.files is None:
+        yield dumps(encode_resource(instance))
+        return
+    if not isinstance(instance.files, dict):
+        raise not_serializable(instance.files)
+    head = dumps(_encode_resource_without_files(instance))
+    yield head[:-1]
+    yield (', ' if len(head) > 2 else '') + dumps(Constants.DDB_FIELD_FILES) + ': {'
+    separator = ''
+    chunk = dict()
+    for key, value in instance.files.items():
+        chunk[key] = _encode_file_metadata(value)
+        if len(chunk) == chunk_size:
+            yield separator + dumps(chunk)[1:-1]
+            separator = ', '
+            chunk = dict()
+    if chunk:
+        yield separator + dumps(chunk)[1:-1]
+    yield '}}'
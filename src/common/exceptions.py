@@ -0,0 +1,25 @@
+class ConcurrentModificationError(Exception):
+    pass
+
+
+class DuplicateRequestError(Exception):
+    """A write was cancelled because its idempotency key was recorded by another request first."""
+    pass
+
+
+class ValidationError(ValueError):
+    """Carries every problem found in a request. The message lists them in the order they were found."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+class UnprocessedItemsError(Exception):
+    """A batch write left items unwritten after all its retries."""
+    pass
+
+
+class BlobError(Exception):
+    """An offloaded attribute could not be read: its blob is missing or its content does not match the digest."""
+    pass
@@ -1,6 +1,115 @@
+import base64
+import binascii
+import json
+import os
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from common.constants import Constants
+
+
+def utc_timestamp(now=None):
+    """ISO 8601 UTC time with microseconds and a Z suffix, for example 2019-10-24T12:57:02.655994Z."""
+    if now is None:
+        now = datetime.now(timezone.utc)
+    return now.strftime(Constants.TIMESTAMP_FORMAT)
+
+
 def remove_none_values(temp_value):
     return_value = dict()
     for key, value in temp_value.items():
         if value is not None:
             return_value[key] = value
     return return_value
+
+
+def projection_expression(paths):
+    placeholders = dict()
+    expressions = []
+    for path in paths:
+        path_placeholders = []
+        for part in path.split('.'):
+            if part not in placeholders:
+                placeholders[part] = '#p' + str(len(placeholders))
+            path_placeholders.append(placeholders[part])
+        expressions.append('.'.join(path_placeholders))
+    names = {placeholder: part for part, placeholder in placeholders.items()}
+    return ', '.join(expressions), names
+
+
+def project_item(item, paths):
+    projected = dict()
+    for path in paths:
+        parts = path.split('.')
+        value = item
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, dict())
+            target[parts[-1]] = value
+    return projected
+
+
+def encode_decimal(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    type_name = value.__class__.__name__
+    raise TypeError(f"Object of type '{type_name}' is not JSON serializable")
+
+
+def encode_continuation_token(last_evaluated_key):
+    if last_evaluated_key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, sort_keys=True).encode('utf-8')).decode('ascii')
+
+
+def decode_continuation_token(continuation_token, attributes=Constants.DDB_KEY_ATTRIBUTES):
+    """Decodes a continuation token into an exclusive start key, which must hold exactly attributes as strings."""
+    if continuation_token is None:
+        return None
+    try:
+        exclusive_start_key = json.loads(base64.urlsafe_b64decode(continuation_token.encode('ascii')))
+    except (AttributeError, UnicodeError, ValueError, binascii.Error):
+        raise ValueError('Invalid continuation token')
+    if not isinstance(exclusive_start_key, dict) or set(exclusive_start_key) != set(attributes) or \
+            not all(isinstance(value, str) for value in exclusive_start_key.values()):
+        raise ValueError('Invalid continuation token')
+    return exclusive_start_key
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return default if value is None or value == '' else int(value)
+
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    return default if value is None or value == '' else float(value)
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    return default if value is None or value == '' else value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_str(name, default):
+    value = os.environ.get(name)
+    return default if value is None or value == '' else value
+
+
+def cancellation_codes(error):
+    """The cancellation reason code of every item in a cancelled transaction, in request order.
+
+    The reasons are taken from the error response, or from the error message when the response does not list them.
+    """
+    reasons = error.response.get(Constants.DDB_CANCELLATION_REASONS)
+    if reasons is not None:
+        return [reason.get('Code', 'None') for reason in reasons]
+    message = error.response.get('Error', {}).get('Message', '')
+    if '[' not in message:
+        return []
+    return [code.strip() for code in message[message.rindex('[') + 1:message.rindex(']')].split(',')]
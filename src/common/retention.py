@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+from common.constants import Constants
+from common.versioning import is_snapshot
+
+
+def retention_cutoff(keep_days, now=None):
+    if now is None:
+        now = datetime.now(timezone.utc)
+    return (now - timedelta(days=keep_days)).strftime(Constants.TIMESTAMP_FORMAT)
+
+
+def is_published(item):
+    return item.get(Constants.DDB_FIELD_STATUS) == Constants.STATUS_PUBLISHED
+
+
+def validate_retention(keep_versions, cutoff):
+    if keep_versions is None and cutoff is None:
+        raise ValueError('Retention policy needs a number of versions or a number of days to keep')
+    elif keep_versions is not None and keep_versions < 1:
+        raise ValueError('Retention policy must keep at least one version')
+
+
+def expired_versions(versions, keep_versions=None, cutoff=None):
+    """Returns the versions, oldest first, that the retention policy allows to delete.
+
+    A version is kept if it is one of the keep_versions newest, was modified after cutoff or is published. The
+    latest version is always kept, and so is every version a kept delta is rebuilt from.
+    """
+    validate_retention(keep_versions, cutoff)
+    kept = [is_published(item) or
+            (keep_versions is not None and index >= len(versions) - keep_versions) or
+            (cutoff is not None and item[Constants.DDB_FIELD_MODIFIED_DATE] > cutoff)
+            for index, item in enumerate(versions)]
+    if len(kept) > 0:
+        kept[-1] = True
+    needs_previous = False
+    for index in range(len(versions) - 1, -1, -1):
+        kept[index] = kept[index] or needs_previous
+        needs_previous = kept[index] and not is_snapshot(versions[index])
+    return [item for item, keep in zip(versions, kept) if not keep]
@@ -0,0 +1,47 @@
+from common.constants import Constants
+
+
+def scan_pages(table, segment=0, total_segments=1, exclusive_start_key=None, page_size=None, **scan_arguments):
+    """Yields the items of one scan segment a page at a time."""
+    if total_segments > 1:
+        scan_arguments['Segment'] = segment
+        scan_arguments['TotalSegments'] = total_segments
+    if page_size is not None:
+        scan_arguments['Limit'] = page_size
+    while True:
+        if exclusive_start_key is not None:
+            scan_arguments['ExclusiveStartKey'] = exclusive_start_key
+        ddb_response = table.scan(**scan_arguments)
+        yield ddb_response[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]
+        exclusive_start_key = ddb_response.get(Constants.DDB_RESPONSE_ATTRIBUTE_NAME_LAST_EVALUATED_KEY)
+        if exclusive_start_key is None:
+            return
+
+
+def storage_pages(storage, segment=0, total_segments=1, exclusive_start_key=None, page_size=None):
+    """Yields the items of one scan segment of a storage engine a page at a time."""
+    while True:
+        items, exclusive_start_key = storage.scan(segment, total_segments, page_size, exclusive_start_key)
+        yield items
+        if exclusive_start_key is None:
+            return
+
+
+def scan_resources(pages):
+    """Groups scanned items into the version histories of resources, oldest version first.
+
+    A scan returns the versions of a resource next to each other and in modifiedDate order, so only one history is
+    held in memory at a time. Yields each resource identifier with its versions.
+    """
+    resource_identifier = None
+    versions = []
+    for items in pages:
+        for item in items:
+            if item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER] != resource_identifier:
+                if len(versions) > 0:
+                    yield resource_identifier, versions
+                resource_identifier = item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER]
+                versions = []
+            versions.append(item)
+    if len(versions) > 0:
+        yield resource_identifier, versions
@@ -0,0 +1,331 @@
+from decimal import Decimal
+
+from common.constants import Constants
+from data.creator import Creator
+from data.file_metadata import FileMetadata
+from data.metadata import Metadata
+
+STRING = (str,)
+NUMBER_OR_STRING = (str, int, Decimal)
+
+
+class MapOf:
+    __slots__ = ('values', 'nullable')
+
+    def __init__(self, values, nullable=False):
+        self.values = values
+        self.nullable = nullable
+
+
+class ListOf:
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+
+class Wrapped:
+    """A JSON scalar that is decoded into a model with a single attribute, like a creator identifier."""
+    __slots__ = ('model', 'attribute', 'kind')
+
+    def __init__(self, model, attribute, kind=STRING):
+        self.model = model
+        self.attribute = attribute
+        self.kind = kind
+
+
+class Field:
+    __slots__ = ('key', 'attribute', 'kind', 'aliases')
+
+    def __init__(self, key, attribute=None, kind=STRING, aliases=()):
+        self.key = key
+        self.attribute = key if attribute is None else attribute
+        self.kind = kind
+        self.aliases = aliases
+
+
+class Schema:
+    """Field table of a JSON object and the model it decodes into.
+
+    The table is compiled once into nested checks that validate a whole value in one pass and collect every error
+    instead of stopping at the first, into decoders that build the nested model objects and into encoders that turn
+    them back into JSON objects, each in one pass.
+    """
+
+    def __init__(self, name, fields, model=None):
+        self.name = name
+        self.fields = fields
+        self.model = model
+        self.compiled = None
+        self.compiled_encoder = None
+
+    def validate(self, value, path=''):
+        if self.compiled is None:
+            self.compiled = compile_kind(self)
+        errors = []
+        self.compiled(value, path, errors)
+        return errors
+
+    def encoder(self):
+        if self.compiled_encoder is None:
+            self.compiled_encoder = compile_encoder(self)
+        return self.compiled_encoder
+
+
+def child_path(path, key):
+    return key if path == '' else path + '.' + key
+
+
+def compile_kind(kind):
+    if isinstance(kind, tuple):
+        types = frozenset(kind)
+
+        def check_type(value, path, errors):
+            if value.__class__ not in types:
+                errors.append(Constants.SCHEMA_ERROR_INVALID_TYPE + path)
+        return check_type
+
+    elif isinstance(kind, MapOf):
+        check_value = compile_kind(kind.values)
+        nullable = kind.nullable
+
+        def check_map(value, path, errors):
+            if value.__class__ is not dict:
+                errors.append(Constants.SCHEMA_ERROR_INVALID_TYPE + path)
+                return
+            for key, entry in value.items():
+                if entry is None:
+                    if not nullable:
+                        errors.append(Constants.SCHEMA_ERROR_INVALID_TYPE + child_path(path, key))
+                else:
+                    check_value(entry, child_path(path, key), errors)
+        return check_map
+
+    elif isinstance(kind, ListOf):
+        check_item = compile_kind(kind.items)
+
+        def check_list(value, path, errors):
+            if value.__class__ is not list:
+                errors.append(Constants.SCHEMA_ERROR_INVALID_TYPE + path)
+                return
+            for index, item in enumerate(value):
+                item_path = path + '[' + str(index) + ']'
+                if item is None:
+                    errors.append(Constants.SCHEMA_ERROR_INVALID_TYPE + item_path)
+                else:
+                    check_item(item, item_path, errors)
+        return check_list
+
+    elif isinstance(kind, Wrapped):
+        check_value = compile_kind(kind.kind)
+        model = kind.model
+        attribute = kind.attribute
+
+        def check_wrapped(value, path, errors):
+            check_value(getattr(value, attribute) if value.__class__ is model else value, path, errors)
+        return check_wrapped
+
+    elif isinstance(kind, Schema):
+        checks = tuple((field.key, compile_kind(field.kind)) for field in kind.fields)
+        attribute_checks = tuple((field.key, field.attribute, check) for field, (_, check) in zip(kind.fields, checks))
+        keys = frozenset(field.key for field in kind.fields)
+        model = kind.model
+
+        def check_object(value, path, errors):
+            if model is not None and value.__class__ is model:
+                for key, attribute, check in attribute_checks:
+                    entry = getattr(value, attribute)
+                    if entry is not None:
+                        check(entry, child_path(path, key), errors)
+                return
+            if value.__class__ is not dict:
+                errors.append(Constants.SCHEMA_ERROR_INVALID_TYPE + path)
+                return
+            for key, check in checks:
+                entry = value.get(key)
+                if entry is not None:
+                    check(entry, child_path(path, key), errors)
+            if not keys.issuperset(value):
+                for key in value:
+                    if key not in keys:
+                        errors.append(Constants.SCHEMA_ERROR_UNKNOWN_ATTRIBUTE + child_path(path, key))
+        return check_object
+
+    raise TypeError('Unsupported schema kind ' + kind.__class__.__name__)
+
+
+def compile_decoder(kind, mode):
+    """Builds a function that decodes a JSON value into model objects.
+
+    Values that do not have the expected shape are returned unchanged, so validation can report them. In strict mode
+    an object with unknown attributes is left as it is for the same reason, in lenient mode they are dropped.
+    """
+    if isinstance(kind, tuple):
+        return None
+
+    elif isinstance(kind, MapOf):
+        decode_value = compile_decoder(kind.values, mode)
+        if decode_value is None:
+            return None
+
+        def decode_map(value):
+            if value.__class__ is not dict:
+                return value
+            return {key: entry if entry is None else decode_value(entry) for key, entry in value.items()}
+        return decode_map
+
+    elif isinstance(kind, ListOf):
+        decode_item = compile_decoder(kind.items, mode)
+        if decode_item is None:
+            return None
+
+        def decode_list(value):
+            if value.__class__ is not list:
+                return value
+            return [item if item is None else decode_item(item) for item in value]
+        return decode_list
+
+    elif isinstance(kind, Wrapped):
+        model = kind.model
+        types = frozenset(kind.kind)
+
+        def decode_wrapped(value):
+            return model(value) if value.__class__ in types else value
+        return decode_wrapped
+
+    elif isinstance(kind, Schema):
+        model = kind.model
+        decoders = tuple((field.key, field.attribute, compile_decoder(field.kind, mode)) for field in kind.fields)
+        keys = frozenset(field.key for field in kind.fields)
+        strict = mode == Constants.DECODE_MODE_STRICT
+
+        def decode_object(value):
+            if value.__class__ is not dict or (strict and not keys.issuperset(value)):
+                return value
+            instance = model.__new__(model)
+            for key, attribute, decode in decoders:
+                entry = value.get(key)
+                setattr(instance, attribute, entry if decode is None or entry is None else decode(entry))
+            return instance
+        return decode_object
+
+    raise TypeError('Unsupported schema kind ' + kind.__class__.__name__)
+
+
+def not_serializable(value):
+    type_name = value.__class__.__name__
+    return TypeError(f"Object of type '{type_name}' is not JSON serializable")
+
+
+def compile_encoder(kind):
+    """Builds a function that encodes model objects into a JSON value, leaving out attributes that are None.
+
+    Scalars are returned as they are. A map that allows None values leaves them out and is left out itself when
+    nothing remains, like titles.
+    """
+    if isinstance(kind, tuple):
+        return None
+
+    elif isinstance(kind, MapOf):
+        encode_value = compile_encoder(kind.values)
+        if kind.nullable:
+            def encode_nullable_map(value):
+                if not isinstance(value, dict):
+                    raise not_serializable(value)
+                encoded = {key: entry if encode_value is None else encode_value(entry)
+                           for key, entry in value.items() if entry is not None}
+                return encoded if encoded else None
+            return encode_nullable_map
+
+        def encode_map(value):
+            if not isinstance(value, dict):
+                raise not_serializable(value)
+            if encode_value is None:
+                return dict(value)
+            return {key: encode_value(entry) for key, entry in value.items()}
+        return encode_map
+
+    elif isinstance(kind, ListOf):
+        encode_item = compile_encoder(kind.items)
+
+        def encode_list(value):
+            if encode_item is None:
+                return list(value)
+            return [encode_item(item) for item in value]
+        return encode_list
+
+    elif isinstance(kind, Wrapped):
+        model = kind.model
+        attribute = kind.attribute
+
+        def encode_wrapped(value):
+            if value.__class__ is not model and not isinstance(value, model):
+                raise not_serializable(value)
+            return getattr(value, attribute)
+        return encode_wrapped
+
+    elif isinstance(kind, Schema):
+        model = kind.model
+        encoders = tuple((field.key, field.attribute, compile_encoder(field.kind)) for field in kind.fields)
+        if all(encode is None for _, _, encode in encoders):
+            attributes = tuple((key, attribute) for key, attribute, _ in encoders)
+
+            def encode_flat_object(value):
+                if model is not None and value.__class__ is not model and not isinstance(value, model):
+                    raise not_serializable(value)
+                encoded = dict()
+                for key, attribute in attributes:
+                    entry = getattr(value, attribute)
+                    if entry is not None:
+                        encoded[key] = entry
+                return encoded
+            return encode_flat_object
+
+        def encode_object(value):
+            if model is not None and value.__class__ is not model and not isinstance(value, model):
+                raise not_serializable(value)
+            encoded = dict()
+            for key, attribute, encode in encoders:
+                entry = getattr(value, attribute)
+                if entry is not None and encode is not None:
+                    entry = encode(entry)
+                if entry is not None:
+                    encoded[key] = entry
+            return encoded
+        return encode_object
+
+    raise TypeError('Unsupported schema kind ' + kind.__class__.__name__)
+
+
+CREATOR_SCHEMA = Wrapped(Creator, 'identifier')
+
+FILE_METADATA_SCHEMA = Schema('FileMetadata', (
+    Field('filename', 'filename'),
+    Field('mimetype', 'mime_type'),
+    Field('checksum', 'checksum'),
+    Field('size', 'size', NUMBER_OR_STRING)
+), FileMetadata)
+
+METADATA_SCHEMA = Schema('Metadata', (
+    Field('creators', 'creators', ListOf(CREATOR_SCHEMA)),
+    Field('handle', 'handle'),
+    Field('license', 'license_identifier'),
+    Field('publicationYear', 'publication_year', NUMBER_OR_STRING),
+    Field('publisher', 'publisher'),
+    Field('titles', 'titles', MapOf(STRING, nullable=True)),
+    Field('type', 'resource_type')
+), Metadata)
+
+FILES_SCHEMA = MapOf(FILE_METADATA_SCHEMA)
+
+RESOURCE_SCHEMA = Schema('Resource', (
+    Field(Constants.DDB_FIELD_RESOURCE_IDENTIFIER),
+    Field(Constants.DDB_FIELD_MODIFIED_DATE, 'modified_date', aliases=('modified_date',)),
+    Field(Constants.DDB_FIELD_CREATED_DATE, 'created_date', aliases=('created_date',)),
+    Field(Constants.DDB_FIELD_METADATA, kind=METADATA_SCHEMA),
+    Field(Constants.DDB_FIELD_FILES, kind=FILES_SCHEMA),
+    Field(Constants.DDB_FIELD_OWNER),
+    Field(Constants.DDB_FIELD_STATUS),
+    Field(Constants.DDB_FIELD_PUBLISHED_DATE, 'published_date', aliases=('published_date',)),
+    Field(Constants.DDB_FIELD_INDEXED_DATE, 'indexed_date', aliases=('indexed_date',))
+))
@@ -1,30 +1,78 @@
 from common.constants import Constants
+from common.exceptions import ValidationError
+from common.schema import RESOURCE_SCHEMA
 
 
 def validate_resource(operation, resource):
-    if operation == Constants.OPERATION_MODIFY:
+    """Checks required attributes first, then validates the whole resource against its schema in one pass.
+
+    All problems are raised together as a ValidationError.
+    """
+    if operation in (Constants.OPERATION_MODIFY, Constants.OPERATION_INSERT):
+        errors = []
+        if operation == Constants.OPERATION_MODIFY and resource.resource_identifier is None:
+            errors.append('Resource has no identifier')
+        if operation == Constants.OPERATION_MODIFY and isinstance(resource.resource_identifier, str):
+            prefix = 'Resource with identifier ' + resource.resource_identifier
+        else:
+            prefix = 'Resource'
+        for name in (Constants.DDB_FIELD_METADATA, Constants.DDB_FIELD_FILES, Constants.DDB_FIELD_OWNER):
+            if getattr(resource, name) is None:
+                errors.append(prefix + ' has no ' + name)
+        values = {field.key: getattr(resource, field.attribute) for field in RESOURCE_SCHEMA.fields}
+        errors.extend(prefix + ' has ' + error for error in RESOURCE_SCHEMA.validate(values))
+        if len(errors) > 0:
+            raise ValidationError(errors)
+    elif operation in (Constants.OPERATION_GET, Constants.OPERATION_LIST_VERSIONS):
         if resource.resource_identifier is None:
             raise ValueError('Resource has no identifier')
-        elif resource.metadata is None:
-            raise ValueError('Resource with identifier ' + resource.resource_identifier + ' has no metadata')
-        elif resource.files is None:
-            raise ValueError('Resource with identifier ' + resource.resource_identifier + ' has no files')
-        elif resource.owner is None:
-            raise ValueError('Resource with identifier ' + resource.resource_identifier + ' has no owner')
-        elif not isinstance(resource.metadata, dict):
-            raise ValueError(
-                'Resource with identifier ' + resource.resource_identifier + ' has invalid attribute type for metadata')
-        elif not isinstance(resource.files, dict):
-            raise ValueError(
-                'Resource with identifier ' + resource.resource_identifier + ' has invalid attribute type for files')
-    elif operation == Constants.OPERATION_INSERT:
-        if resource.metadata is None:
-            raise ValueError('Resource has no metadata')
-        elif resource.files is None:
-            raise ValueError('Resource has no files')
-        elif resource.owner is None:
-            raise ValueError('Resource has no owner')
-        elif not isinstance(resource.metadata, dict):
-            raise ValueError('Resource has invalid attribute type for metadata')
-        elif not isinstance(resource.files, dict):
-            raise ValueError('Resource has invalid attribute type for files')
+
+
+def validate_fields(fields):
+    if fields is not None:
+        if not isinstance(fields, list) or len(fields) == 0:
+            raise ValueError('Invalid attribute type for ' + Constants.JSON_ATTRIBUTE_NAME_FIELDS)
+        for field in fields:
+            if not isinstance(field, str) or field == '' or '' in field.split('.'):
+                raise ValueError('Invalid field ' + str(field))
+
+
+def validate_page_size(page_size):
+    if isinstance(page_size, bool) or not isinstance(page_size, int) or not 0 < page_size <= Constants.MAX_PAGE_SIZE:
+        raise ValueError('Invalid ' + Constants.JSON_ATTRIBUTE_NAME_PAGE_SIZE + ', must be between 1 and ' +
+                         str(Constants.MAX_PAGE_SIZE))
+
+
+def validate_order(order):
+    if order not in (Constants.ORDER_ASCENDING, Constants.ORDER_DESCENDING):
+        raise ValueError('Invalid ' + Constants.JSON_ATTRIBUTE_NAME_ORDER + ', must be ' + Constants.ORDER_ASCENDING +
+                         ' or ' + Constants.ORDER_DESCENDING)
+
+
+def validate_date_range(modified_from, modified_to):
+    for name, value in ((Constants.JSON_ATTRIBUTE_NAME_MODIFIED_FROM, modified_from),
+                        (Constants.JSON_ATTRIBUTE_NAME_MODIFIED_TO, modified_to)):
+        if value is not None and not isinstance(value, str):
+            raise ValueError('Invalid attribute type for ' + name)
+    if modified_from is not None and modified_to is not None and modified_from > modified_to:
+        raise ValueError(Constants.JSON_ATTRIBUTE_NAME_MODIFIED_FROM + ' is after ' +
+                         Constants.JSON_ATTRIBUTE_NAME_MODIFIED_TO)
+
+
+def validate_owner(owner, status=None):
+    if not isinstance(owner, str) or owner == '':
+        raise ValueError('Invalid ' + Constants.JSON_ATTRIBUTE_NAME_OWNER)
+    if status is not None and not isinstance(status, str):
+        raise ValueError('Invalid attribute type for ' + Constants.JSON_ATTRIBUTE_NAME_STATUS)
+
+
+def validate_response_format(response_format):
+    if response_format not in Constants.RESPONSE_FORMATS:
+        raise ValueError('Invalid ' + Constants.JSON_ATTRIBUTE_NAME_RESPONSE_FORMAT + ', must be ' +
+                         ' or '.join(Constants.RESPONSE_FORMATS))
+
+
+def validate_idempotency_key(idempotency_key):
+    if not isinstance(idempotency_key, str) or not 0 < len(idempotency_key) <= Constants.MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise ValueError('Invalid ' + Constants.JSON_ATTRIBUTE_NAME_IDEMPOTENCY_KEY + ', must be a string of 1 to ' +
+                         str(Constants.MAX_IDEMPOTENCY_KEY_LENGTH) + ' characters')
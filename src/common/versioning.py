@@ -0,0 +1,89 @@
+from common.constants import Constants
+
+
+def is_snapshot(item):
+    return Constants.DDB_FIELD_DELTA not in item
+
+
+def version_number(item):
+    return int(item.get(Constants.DDB_FIELD_VERSION_NUMBER, 0))
+
+
+def compute_delta(previous, current):
+    delta = dict()
+    for field in Constants.DDB_DELTA_FIELDS:
+        previous_value = previous.get(field)
+        current_value = current.get(field)
+        if previous_value == current_value:
+            continue
+        elif isinstance(previous_value, dict) and isinstance(current_value, dict):
+            delta[field] = {
+                Constants.DELTA_SET: {key: value for key, value in current_value.items()
+                                      if key not in previous_value or previous_value[key] != value},
+                Constants.DELTA_REMOVE: [key for key in previous_value if key not in current_value]
+            }
+        else:
+            delta[field] = {Constants.DELTA_VALUE: current_value}
+    return delta
+
+
+def apply_delta(fields, delta):
+    fields = dict(fields)
+    for field, change in delta.items():
+        if Constants.DELTA_VALUE in change:
+            fields[field] = change[Constants.DELTA_VALUE]
+        else:
+            value = dict(fields.get(field) or {})
+            for key in change.get(Constants.DELTA_REMOVE, []):
+                value.pop(key, None)
+            value.update(change.get(Constants.DELTA_SET, {}))
+            fields[field] = value
+    return fields
+
+
+def to_storage_item(item, previous_item, snapshot_interval):
+    """Returns the item to store for a new version: a full snapshot or a delta against previous_item.
+
+    Versions are numbered from 0 and every snapshot_interval-th version is a snapshot, so a version can always
+    be rebuilt from at most snapshot_interval items.
+    """
+    number = 0 if previous_item is None else version_number(previous_item) + 1
+    storage_item = dict(item)
+    storage_item[Constants.DDB_FIELD_VERSION_NUMBER] = number
+    if previous_item is None or number % snapshot_interval == 0:
+        return storage_item
+    for field in Constants.DDB_DELTA_FIELDS:
+        storage_item.pop(field, None)
+    storage_item[Constants.DDB_FIELD_DELTA] = compute_delta(previous_item, item)
+    return storage_item
+
+
+def to_full_item(item):
+    full_item = dict(item)
+    full_item.pop(Constants.DDB_FIELD_DELTA, None)
+    return full_item
+
+
+def reconstruct(chain):
+    """Rebuilds the newest version in chain, which holds versions newest first and ends with a snapshot."""
+    for snapshot_index, item in enumerate(chain):
+        if is_snapshot(item):
+            break
+    else:
+        raise ValueError('Resource with identifier ' + chain[0][Constants.DDB_FIELD_RESOURCE_IDENTIFIER] +
+                         ' has no snapshot for version ' + chain[0][Constants.DDB_FIELD_MODIFIED_DATE])
+    fields = {field: chain[snapshot_index][field] for field in Constants.DDB_DELTA_FIELDS
+              if field in chain[snapshot_index]}
+    for item in reversed(chain[:snapshot_index]):
+        fields = apply_delta(fields, item[Constants.DDB_FIELD_DELTA])
+    full_item = to_full_item(chain[0])
+    for field in Constants.DDB_DELTA_FIELDS:
+        full_item.pop(field, None)
+    full_item.update({field: value for field, value in fields.items() if value is not None})
+    return full_item
+
+
+def follows(item, previous_item):
+    return previous_item is not None and \
+        previous_item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER] == item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER] and \
+        version_number(item) == version_number(previous_item) + 1
@@ -1,3 +1,5 @@
 class Creator:
+    __slots__ = ('identifier',)
+
     def __init__(self, identifier: str = None):
         self.identifier = identifier
@@ -2,6 +2,8 @@ from data.file_metadata import FileMetadata
 
 
 class File:
+    __slots__ = ('identifier', 'file_metadata')
+
     def __init__(self, identifier: str = None, file_metadata: FileMetadata = None):
         self.identifier = identifier
         self.file_metadata = file_metadata
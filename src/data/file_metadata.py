@@ -1,4 +1,6 @@
 class FileMetadata:
+    __slots__ = ('filename', 'mime_type', 'checksum', 'size')
+
     def __init__(self, filename: str = None, mime_type: str = None, checksum: str = None, size: str = None):
         self.filename = filename
         self.mime_type = mime_type
@@ -4,6 +4,9 @@ from data.creator import Creator
 
 
 class Metadata:
+    __slots__ = ('creators', 'handle', 'license_identifier', 'publication_year', 'publisher', 'titles',
+                 'resource_type')
+
     def __init__(self, creators: List[Creator] = None, handle: str = None, license_identifier: str = None,
                  publication_year: str = None, publisher: str = None, titles: dict = None, resource_type: str = None):
         self.creators = creators
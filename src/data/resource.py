@@ -1,7 +1,24 @@
+from common.constants import Constants
+from common.schema import RESOURCE_SCHEMA, compile_decoder
 from data.metadata import Metadata
 
 
+def field_decoders(mode):
+    """Maps every accepted key, including the stored camelCase date names, to its attribute and nested decoder."""
+    decoders = dict()
+    for field in RESOURCE_SCHEMA.fields:
+        decoder = (field.attribute, compile_decoder(field.kind, mode))
+        for key in (field.key,) + field.aliases:
+            decoders[key] = decoder
+    return decoders
+
+
+FIELD_DECODERS = {mode: field_decoders(mode) for mode in Constants.DECODE_MODES}
+
+
 class Resource:
+    __slots__ = ('resource_identifier', 'modified_date', 'created_date', 'metadata', 'files', 'owner', 'status',
+                 'indexed_date', 'published_date')
 
     def __init__(self, resource_identifier: str = None, modified_date: str = None, created_date: str = None,
                  metadata: Metadata = None, files: dict = None, owner: str = None, status: str = None,
@@ -17,5 +34,24 @@ class Resource:
         self.status = status
 
     @classmethod
-    def from_dict(cls, data):
-        return cls(**data)
+    def from_dict(cls, data, mode=Constants.DEFAULT_DECODE_MODE):
+        """Decodes a JSON resource and its nested metadata and files in one pass.
+
+        Unknown attributes are rejected in strict mode and dropped in lenient mode.
+        """
+        if mode not in FIELD_DECODERS:
+            raise ValueError('Unknown decode mode ' + str(mode))
+        if not isinstance(data, dict):
+            type_name = data.__class__.__name__
+            raise TypeError(f"Object of type '{type_name}' can not be decoded as resource")
+        decoders = FIELD_DECODERS[mode]
+        resource = cls()
+        for key, value in data.items():
+            decoder = decoders.get(key)
+            if decoder is None:
+                if mode == Constants.DECODE_MODE_STRICT:
+                    raise TypeError('Resource has ' + Constants.SCHEMA_ERROR_UNKNOWN_ATTRIBUTE + key)
+                continue
+            attribute, decode = decoder
+            setattr(resource, attribute, value if decode is None or value is None else decode(value))
+        return resource
@@ -1,4 +1,6 @@
 class Title:
+    __slots__ = ('language_code', 'title')
+
     def __init__(self, language_code: str = None, title: str = None):
         self.language_code = language_code
         self.title = title
@@ -0,0 +1,107 @@
+"""Adds the OwnerIndex to the table and gives the latest version of every resource its latestOwner.
+
+Versions written before the index existed have no latestOwner, so LIST_BY_OWNER does not find those resources.
+Run with the handler's environment (TABLE_NAME, REGION) from the src directory:
+
+    python -m tools.backfill_owner_index --create-index
+
+The latest version of a resource only gets latestOwner while it has not been superseded, in a conditional update, so
+the backfill can run while the handler is writing and can be interrupted and run again.
+"""
+import argparse
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from classes.ConnectionManager import ConnectionManager
+from common.constants import Constants
+from tools.migrate_versions import resource_identifiers
+
+OWNER_INDEX_ATTRIBUTE_DEFINITIONS = [
+    {'AttributeName': Constants.DDB_FIELD_LATEST_OWNER, 'AttributeType': 'S'},
+    {'AttributeName': Constants.DDB_FIELD_MODIFIED_DATE, 'AttributeType': 'S'}
+]
+OWNER_INDEX = {
+    'IndexName': Constants.DDB_INDEX_OWNER,
+    'KeySchema': [{'AttributeName': Constants.DDB_FIELD_LATEST_OWNER, 'KeyType': 'HASH'},
+                  {'AttributeName': Constants.DDB_FIELD_MODIFIED_DATE, 'KeyType': 'RANGE'}],
+    'Projection': {'ProjectionType': 'ALL'}
+}
+
+
+def create_owner_index(table):
+    """Adds OwnerIndex unless the table has it. Returns whether it was added.
+
+    A provisioned index gets the read and write capacity of the table.
+    """
+    description = table.meta.client.describe_table(TableName=table.name)['Table']
+    if any(index['IndexName'] == Constants.DDB_INDEX_OWNER for index in description.get('GlobalSecondaryIndexes', [])):
+        return False
+    index = dict(OWNER_INDEX)
+    if description.get('BillingModeSummary', {}).get('BillingMode') != 'PAY_PER_REQUEST':
+        throughput = description['ProvisionedThroughput']
+        index['ProvisionedThroughput'] = {'ReadCapacityUnits': throughput['ReadCapacityUnits'],
+                                          'WriteCapacityUnits': throughput['WriteCapacityUnits']}
+    table.meta.client.update_table(TableName=table.name, AttributeDefinitions=OWNER_INDEX_ATTRIBUTE_DEFINITIONS,
+                                   GlobalSecondaryIndexUpdates=[{'Create': index}])
+    return True
+
+
+def latest_item(table, resource_identifier):
+    items = table.query(KeyConditionExpression=Key(Constants.DDB_FIELD_RESOURCE_IDENTIFIER).eq(resource_identifier),
+                        ScanIndexForward=False, Limit=1, ConsistentRead=True)[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]
+    return items[0] if len(items) > 0 else None
+
+
+def set_latest_owner(table, item):
+    """Sets latestOwner on item unless it has been superseded since it was read. Returns whether it was set."""
+    try:
+        table.update_item(
+            Key={attribute: item[attribute] for attribute in Constants.DDB_KEY_ATTRIBUTES},
+            UpdateExpression='SET #latestOwner = :owner',
+            ConditionExpression='attribute_exists(#identifier) AND attribute_not_exists(#superseded)',
+            ExpressionAttributeNames={
+                '#identifier': Constants.DDB_FIELD_RESOURCE_IDENTIFIER,
+                '#superseded': Constants.DDB_FIELD_SUPERSEDED_DATE,
+                '#latestOwner': Constants.DDB_FIELD_LATEST_OWNER
+            },
+            ExpressionAttributeValues={':owner': item[Constants.DDB_FIELD_OWNER]}
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def backfill(table, dry_run=False):
+    statistics = {'resources': 0, 'backfilled': 0, 'skipped': 0}
+    for resource_identifier in resource_identifiers(table):
+        statistics['resources'] += 1
+        item = latest_item(table, resource_identifier)
+        if item is None or Constants.DDB_FIELD_LATEST_OWNER in item:
+            continue
+        if Constants.DDB_FIELD_SUPERSEDED_DATE in item or Constants.DDB_FIELD_OWNER not in item:
+            statistics['skipped'] += 1
+        elif dry_run or set_latest_owner(table, item):
+            statistics['backfilled'] += 1
+        else:
+            statistics['skipped'] += 1
+    return statistics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--create-index', action='store_true', help='add OwnerIndex to the table if it is missing')
+    parser.add_argument('--dry-run', action='store_true', help='count the versions to backfill without writing')
+    arguments = parser.parse_args()
+    table = ConnectionManager().get_table()
+    if arguments.create_index and not arguments.dry_run and create_owner_index(table):
+        print(Constants.DDB_INDEX_OWNER + ' is being created')
+    statistics = backfill(table, arguments.dry_run)
+    print('{resources} resources, {backfilled} latest versions backfilled, {skipped} skipped'.format(**statistics) +
+          (' (dry run)' if arguments.dry_run else ''))
+
+
+if __name__ == '__main__':
+    main()
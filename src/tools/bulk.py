@@ -0,0 +1,220 @@
+"""Exports the versions in the table to NDJSON files and imports them again.
+
+Run with the handler's environment (TABLE_NAME, REGION and, for offloaded attributes, BLOB_STORE_PATH) from the src
+directory, for example:
+
+    python -m tools.bulk export --output backup --segments 8 --checkpoint export.json
+    python -m tools.bulk import --input backup --checkpoint import.json --max-writes-per-second 500
+
+Every line is one version as GET returns it, so an export can be imported in any versioning, compression or offload
+mode, and with any STORAGE_ENGINE. Each scan segment is exported to its own file, with the versions of a resource next
+to each other, oldest first, and only one version history is held in memory per segment. Import writes the versions of
+a resource again, superseding all but the latest. A file whose items cannot all be written fails, and its checkpoint
+stays before them. With --checkpoint an interrupted or failed run resumes where it stopped.
+"""
+import argparse
+import os
+
+from classes.BoundedExecutor import BoundedExecutor
+from classes.Checkpoint import Checkpoint
+from classes.RateLimiter import RateLimiter
+from classes.RequestHandler import RequestHandler, build_item
+from common.constants import Constants
+from common.decoders import decode_resource
+from common.encoders import iterencode_resource
+from common.exceptions import UnprocessedItemsError
+from common.scan import scan_resources, storage_pages
+from common.validator import validate_resource
+from common.versioning import is_snapshot
+from tools.compaction import limited, version_key
+
+EXPORT_STATISTICS = ('resources', 'versions', 'bytes')
+IMPORT_STATISTICS = ('resources', 'versions', 'bytes')
+
+
+def segment_path(directory, segment):
+    return os.path.join(directory, 'segment-%04d.ndjson' % segment)
+
+
+def input_paths(path):
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.ndjson'))
+    return [path]
+
+
+def exported_versions(request_handler, versions, latest_only=False):
+    """Returns the full versions of a scanned history, oldest first, or only the latest one.
+
+    For the latest version alone only the items from its last snapshot on are decoded.
+    """
+    if latest_only:
+        snapshots = [index for index, item in enumerate(versions) if is_snapshot(item)]
+        versions = versions[snapshots[-1] if len(snapshots) > 0 else 0:]
+    full_versions = request_handler.reconstruct_items([request_handler.codec.decode_item(item) for item in versions])
+    return full_versions[-1:] if latest_only else full_versions
+
+
+def export_segment(request_handler, directory, segment, total_segments, latest_only=False, checkpoint=None,
+                   read_limiter=None, page_size=None):
+    if checkpoint is None:
+        checkpoint = Checkpoint()
+    if read_limiter is None:
+        read_limiter = RateLimiter(0)
+    state = checkpoint.segment(segment)
+    statistics = state.get('statistics') or dict.fromkeys(EXPORT_STATISTICS, 0)
+    if state.get('done'):
+        return statistics
+    last_key = state.get('last_key')
+    pages = limited(storage_pages(request_handler.storage, segment, total_segments, last_key, page_size),
+                    read_limiter)
+    with open(segment_path(directory, segment), 'r+b' if last_key is not None else 'wb') as export_file:
+        export_file.truncate(statistics['bytes'])
+        export_file.seek(statistics['bytes'])
+        for _, versions in scan_resources(pages):
+            for item in exported_versions(request_handler, versions, latest_only):
+                for chunk in iterencode_resource(decode_resource(item), request_handler.json_codec.dumps):
+                    export_file.write(chunk.encode('utf-8'))
+                export_file.write(b'\n')
+                statistics['versions'] += 1
+            statistics['resources'] += 1
+            last_key = version_key(versions[-1])
+            if statistics['resources'] % Constants.BULK_CHECKPOINT_INTERVAL == 0:
+                export_file.flush()
+                statistics['bytes'] = export_file.tell()
+                checkpoint.save(segment, last_key, False, statistics)
+        statistics['bytes'] = export_file.tell()
+    checkpoint.save(segment, last_key, True, statistics)
+    return statistics
+
+
+def export(request_handler, directory, segments=4, latest_only=False, checkpoint_path=None, max_reads_per_second=0):
+    """Exports all segments in parallel and returns the summed statistics. Rates are items per second, 0 is
+    unlimited."""
+    os.makedirs(directory, exist_ok=True)
+    checkpoint = Checkpoint(checkpoint_path)
+    read_limiter = RateLimiter(max_reads_per_second)
+    with BoundedExecutor(segments) as executor:
+        results = list(executor.map(lambda segment: export_segment(
+            request_handler, directory, segment, segments, latest_only, checkpoint, read_limiter),
+            range(segments)))
+    return {name: sum(result[name] for result in results) for name in EXPORT_STATISTICS}
+
+
+def read_histories(import_file, loads):
+    """Yields the versions of each resource in an NDJSON file, with the file position after the last of them.
+
+    The versions of a resource are expected next to each other, as export writes them.
+    """
+    resource_identifier = None
+    versions = []
+    position = import_file.tell()
+    for line in iter(import_file.readline, b''):
+        if line.strip():
+            resource = decode_resource(loads(line))
+            validate_resource(Constants.OPERATION_MODIFY, resource)
+            if resource.modified_date is None or resource.created_date is None:
+                raise ValueError('Resource with identifier ' + resource.resource_identifier + ' has no ' +
+                                 Constants.DDB_FIELD_MODIFIED_DATE + ' or ' + Constants.DDB_FIELD_CREATED_DATE)
+            if resource.resource_identifier != resource_identifier and len(versions) > 0:
+                yield resource_identifier, versions, position
+                versions = []
+            resource_identifier = resource.resource_identifier
+            versions.append(resource)
+        position = import_file.tell()
+    if len(versions) > 0:
+        yield resource_identifier, versions, position
+
+
+def imported_items(request_handler, versions):
+    """Returns the items to write for the versions of one resource: every version but the latest is superseded by the
+    next one and only the latest keeps latestOwner."""
+    versions = sorted(versions, key=lambda resource: resource.modified_date)
+    items = []
+    previous_item = None
+    for index, resource in enumerate(versions):
+        full_item = build_item(resource.resource_identifier, resource.modified_date, resource.created_date, resource)
+        if index < len(versions) - 1:
+            full_item.pop(Constants.DDB_FIELD_LATEST_OWNER)
+            full_item[Constants.DDB_FIELD_SUPERSEDED_DATE] = versions[index + 1].modified_date
+        item = request_handler.storage_item(full_item, previous_item)
+        if request_handler.delta_versioning:
+            previous_item = dict(full_item)
+            previous_item[Constants.DDB_FIELD_VERSION_NUMBER] = item[Constants.DDB_FIELD_VERSION_NUMBER]
+        items.append(item)
+    return items
+
+
+def import_file(request_handler, path, checkpoint=None, write_limiter=None):
+    if checkpoint is None:
+        checkpoint = Checkpoint()
+    if write_limiter is None:
+        write_limiter = RateLimiter(0)
+    name = os.path.basename(path)
+    state = checkpoint.segment(name)
+    statistics = state.get('statistics') or dict.fromkeys(IMPORT_STATISTICS, 0)
+    if state.get('done'):
+        return statistics
+    pending = []
+
+    def flush():
+        write_limiter.acquire(len(pending))
+        unprocessed = request_handler.write_items(pending)
+        if len(unprocessed) > 0:
+            raise UnprocessedItemsError(str(len(unprocessed)) + ' items of ' + name + ' were not written')
+        pending.clear()
+
+    with open(path, 'rb') as ndjson_file:
+        ndjson_file.seek(statistics['bytes'])
+        for _, versions, position in read_histories(ndjson_file, request_handler.json_codec.loads):
+            pending.extend(imported_items(request_handler, versions))
+            statistics['resources'] += 1
+            statistics['versions'] += len(versions)
+            statistics['bytes'] = position
+            if len(pending) >= Constants.DDB_BATCH_WRITE_MAX_ITEMS:
+                flush()
+                checkpoint.save(name, None, False, statistics)
+    if len(pending) > 0:
+        flush()
+    checkpoint.save(name, None, True, statistics)
+    return statistics
+
+
+def import_files(request_handler, path, workers=4, checkpoint_path=None, max_writes_per_second=0):
+    """Imports a file, or every .ndjson file in a directory with one worker per file, and returns the summed
+    statistics."""
+    checkpoint = Checkpoint(checkpoint_path)
+    write_limiter = RateLimiter(max_writes_per_second)
+    with BoundedExecutor(workers) as executor:
+        results = list(executor.map(lambda file_path: import_file(
+            request_handler, file_path, checkpoint, write_limiter), input_paths(path)))
+    return {name: sum(result[name] for result in results) for name in IMPORT_STATISTICS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help='write the table to NDJSON files')
+    export_parser.add_argument('--output', required=True, help='directory to write segment files to')
+    export_parser.add_argument('--segments', type=int, default=4, help='number of parallel scan segments')
+    export_parser.add_argument('--latest-only', action='store_true', help='export only the latest versions')
+    export_parser.add_argument('--max-reads-per-second', type=float, default=0, help='scanned items per second')
+    export_parser.add_argument('--checkpoint', default=None, help='JSON file to resume from and record progress in')
+    import_parser = commands.add_parser('import', help='write NDJSON files to the table')
+    import_parser.add_argument('--input', required=True, help='NDJSON file, or directory of .ndjson files')
+    import_parser.add_argument('--workers', type=int, default=4, help='number of files imported in parallel')
+    import_parser.add_argument('--max-writes-per-second', type=float, default=0, help='written items per second')
+    import_parser.add_argument('--checkpoint', default=None, help='JSON file to resume from and record progress in')
+    arguments = parser.parse_args()
+    request_handler = RequestHandler()
+    if arguments.command == 'export':
+        statistics = export(request_handler, arguments.output, arguments.segments, arguments.latest_only,
+                            arguments.checkpoint, arguments.max_reads_per_second)
+        print('{resources} resources, {versions} versions, {bytes} bytes exported'.format(**statistics))
+    else:
+        statistics = import_files(request_handler, arguments.input, arguments.workers, arguments.checkpoint,
+                                  arguments.max_writes_per_second)
+        print('{resources} resources, {versions} versions imported'.format(**statistics))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Deletes versions that fall outside the retention policy.
+
+Run with the handler's environment (TABLE_NAME, REGION) from the src directory, for example to keep the 20 newest
+versions and everything modified in the last 90 days:
+
+    python -m tools.compaction --keep-versions 20 --keep-days 90 --checkpoint compaction.json
+
+Published versions and the latest version of every resource are always kept. Segments are scanned in parallel and
+expired versions are deleted in batches. With --checkpoint an interrupted run resumes where it stopped.
+"""
+import argparse
+
+from classes.BoundedExecutor import BoundedExecutor
+from classes.Checkpoint import Checkpoint
+from classes.ConnectionManager import ConnectionManager
+from classes.RateLimiter import RateLimiter
+from classes.StorageCodec import item_size
+from common.batch import batch_write, delete_requests
+from common.constants import Constants
+from common.retention import expired_versions, retention_cutoff, validate_retention
+from common.scan import scan_pages, scan_resources
+
+STATISTICS = ('resources', 'versions', 'expired', 'reclaimed_bytes', 'unprocessed')
+
+
+def limited(pages, rate_limiter):
+    for items in pages:
+        rate_limiter.acquire(len(items))
+        yield items
+
+
+def version_key(item):
+    return {attribute: item[attribute] for attribute in Constants.DDB_KEY_ATTRIBUTES}
+
+
+def compact_segment(dynamodb, table_name, segment, total_segments, keep_versions=None, cutoff=None, dry_run=False,
+                    checkpoint=None, read_limiter=None, write_limiter=None, page_size=None):
+    if checkpoint is None:
+        checkpoint = Checkpoint()
+    if read_limiter is None:
+        read_limiter = RateLimiter(0)
+    if write_limiter is None:
+        write_limiter = RateLimiter(0)
+    state = checkpoint.segment(segment)
+    statistics = state.get('statistics') or dict.fromkeys(STATISTICS, 0)
+    if state.get('done'):
+        return statistics
+    pages = limited(scan_pages(dynamodb.Table(table_name), segment, total_segments, state.get('last_key'),
+                               page_size), read_limiter)
+    pending = []
+    last_key = state.get('last_key')
+
+    def flush():
+        write_limiter.acquire(len(pending))
+        statistics['unprocessed'] += len(batch_write(dynamodb, table_name, delete_requests(pending)))
+        pending.clear()
+        checkpoint.save(segment, last_key, False, statistics)
+
+    for _, versions in scan_resources(pages):
+        expired = expired_versions(versions, keep_versions, cutoff)
+        statistics['resources'] += 1
+        statistics['versions'] += len(versions)
+        statistics['expired'] += len(expired)
+        statistics['reclaimed_bytes'] += sum(item_size(item) for item in expired)
+        last_key = version_key(versions[-1])
+        if not dry_run:
+            pending.extend(version_key(item) for item in expired)
+            if len(pending) >= Constants.DDB_BATCH_WRITE_MAX_ITEMS:
+                flush()
+    if len(pending) > 0:
+        flush()
+    checkpoint.save(segment, last_key, True, statistics)
+    return statistics
+
+
+def compact(dynamodb, table_name, keep_versions=None, keep_days=None, segments=4, dry_run=False,
+            checkpoint_path=None, max_reads_per_second=0, max_deletes_per_second=0, now=None):
+    """Compacts all segments in parallel and returns the summed statistics.
+
+    A dry run deletes nothing and does not touch the checkpoint file. Rates are items per second, 0 is unlimited.
+    """
+    cutoff = None if keep_days is None else retention_cutoff(keep_days, now)
+    validate_retention(keep_versions, cutoff)
+    checkpoint = Checkpoint(None if dry_run else checkpoint_path)
+    read_limiter = RateLimiter(max_reads_per_second)
+    write_limiter = RateLimiter(max_deletes_per_second)
+    with BoundedExecutor(segments) as executor:
+        results = list(executor.map(lambda segment: compact_segment(
+            dynamodb, table_name, segment, segments, keep_versions, cutoff, dry_run, checkpoint, read_limiter,
+            write_limiter), range(segments)))
+    return {name: sum(result[name] for result in results) for name in STATISTICS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keep-versions', type=int, default=None, help='number of newest versions to keep')
+    parser.add_argument('--keep-days', type=float, default=None, help='keep versions modified in this many days')
+    parser.add_argument('--segments', type=int, default=4, help='number of parallel scan segments')
+    parser.add_argument('--max-reads-per-second', type=float, default=0, help='scanned items per second')
+    parser.add_argument('--max-deletes-per-second', type=float, default=0, help='deleted items per second')
+    parser.add_argument('--checkpoint', default=None, help='JSON file to resume from and record progress in')
+    parser.add_argument('--dry-run', action='store_true', help='report what would be deleted without deleting')
+    arguments = parser.parse_args()
+    if arguments.keep_versions is None and arguments.keep_days is None:
+        parser.error('at least one of --keep-versions and --keep-days is required')
+    connection = ConnectionManager()
+    statistics = compact(connection.get_resource(), connection.connection_key()[0], arguments.keep_versions,
+                         arguments.keep_days, arguments.segments, arguments.dry_run, arguments.checkpoint,
+                         arguments.max_reads_per_second, arguments.max_deletes_per_second)
+    print('{resources} resources, {versions} versions, {expired} expired ({reclaimed_bytes} bytes), '
+          '{unprocessed} unprocessed'.format(**statistics) + (' (dry run)' if arguments.dry_run else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Rewrites stored version histories to delta-encoded or full-copy form, and marks every version but the latest as
+superseded.
+
+Run with the handler's environment (TABLE_NAME, REGION, COMPRESSION_THRESHOLD_BYTES, OFFLOAD_THRESHOLD_BYTES,
+BLOB_STORE_PATH) from the src directory:
+
+    python -m tools.migrate_versions --mode delta --snapshot-interval 10
+
+Keys are left unchanged, so the migration can be interrupted and run again. Writes to a resource that happen
+while its history is rewritten may be lost, so pause writers or migrate during a quiet period.
+
+A MODIFY only supersedes a version without supersededDate, so histories written before supersededDate was recorded
+must be migrated before the handler that relies on it is deployed. Otherwise a MODIFY based on an older version of
+such a history is accepted and forks it.
+"""
+import argparse
+
+from classes.RequestHandler import RequestHandler
+from common.batch import batch_write, put_requests
+from common.constants import Constants
+from common.versioning import is_snapshot, reconstruct
+
+
+def resource_identifiers(table, page_size=Constants.DEFAULT_PAGE_SIZE):
+    """Yields each resource identifier once. A scan returns the versions of a resource next to each other."""
+    scan_arguments = {
+        'ProjectionExpression': '#identifier',
+        'ExpressionAttributeNames': {'#identifier': Constants.DDB_FIELD_RESOURCE_IDENTIFIER},
+        'Limit': page_size
+    }
+    previous_identifier = None
+    while True:
+        ddb_response = table.scan(**scan_arguments)
+        for item in ddb_response[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]:
+            if item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER] != previous_identifier:
+                previous_identifier = item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER]
+                yield previous_identifier
+        last_evaluated_key = ddb_response.get(Constants.DDB_RESPONSE_ATTRIBUTE_NAME_LAST_EVALUATED_KEY)
+        if last_evaluated_key is None:
+            return
+        scan_arguments['ExclusiveStartKey'] = last_evaluated_key
+
+
+def rewritten_versions(request_handler, resource_identifier):
+    """Yields each stored version of a resource, oldest first, with the item to write for it in the handler's mode."""
+    full_item = None
+    previous_item = None
+    exclusive_start_key = None
+    while True:
+        items, exclusive_start_key = request_handler.query_version_items(
+            resource_identifier, page_size=Constants.DEFAULT_PAGE_SIZE, exclusive_start_key=exclusive_start_key)
+        for item in items:
+            if is_snapshot(item):
+                full_item = item
+            elif full_item is None:
+                full_item = request_handler.read_version(resource_identifier, item[Constants.DDB_FIELD_MODIFIED_DATE])
+            else:
+                full_item = reconstruct([item, full_item])
+            if request_handler.delta_versioning:
+                migrated_item = request_handler.storage_item(full_item, previous_item)
+                previous_item = dict(full_item)
+                previous_item[Constants.DDB_FIELD_VERSION_NUMBER] = migrated_item[Constants.DDB_FIELD_VERSION_NUMBER]
+            else:
+                migrated_item = dict(full_item)
+                migrated_item.pop(Constants.DDB_FIELD_VERSION_NUMBER, None)
+            yield item, migrated_item
+        if exclusive_start_key is None:
+            return
+
+
+def migrated_items(request_handler, resource_identifier):
+    """Yields the stored versions of a resource, oldest first, that change when written in the handler's mode.
+
+    A version that is followed by another one but has no supersededDate gets the modifiedDate of the next version.
+    """
+    previous = None
+    for item, migrated_item in rewritten_versions(request_handler, resource_identifier):
+        if previous is not None:
+            previous_item, previous_migrated_item = previous
+            if Constants.DDB_FIELD_SUPERSEDED_DATE not in previous_migrated_item:
+                previous_migrated_item = dict(previous_migrated_item)
+                previous_migrated_item[Constants.DDB_FIELD_SUPERSEDED_DATE] = item[Constants.DDB_FIELD_MODIFIED_DATE]
+                previous_migrated_item.pop(Constants.DDB_FIELD_LATEST_OWNER, None)
+            if previous_migrated_item != previous_item:
+                yield previous_migrated_item
+        previous = item, migrated_item
+    if previous is not None and previous[1] != previous[0]:
+        yield previous[1]
+
+
+def migrate(request_handler, dry_run=False):
+    statistics = {'resources': 0, 'rewritten': 0, 'unprocessed': 0}
+    pending = []
+    for resource_identifier in resource_identifiers(request_handler.table):
+        statistics['resources'] += 1
+        for item in migrated_items(request_handler, resource_identifier):
+            statistics['rewritten'] += 1
+            if not dry_run:
+                pending.append(request_handler.codec.encode_item(item))
+        if len(pending) >= Constants.DDB_BATCH_WRITE_MAX_ITEMS:
+            statistics['unprocessed'] += len(batch_write(request_handler.dynamodb, request_handler.table.name,
+                                                         put_requests(pending)))
+            pending = []
+    if len(pending) > 0:
+        statistics['unprocessed'] += len(batch_write(request_handler.dynamodb, request_handler.table.name,
+                                                     put_requests(pending)))
+    return statistics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=Constants.VERSIONING_MODES, required=True)
+    parser.add_argument('--snapshot-interval', type=int, default=None)
+    parser.add_argument('--dry-run', action='store_true', help='count the versions to rewrite without writing')
+    arguments = parser.parse_args()
+    request_handler = RequestHandler(versioning_mode=arguments.mode, snapshot_interval=arguments.snapshot_interval)
+    statistics = migrate(request_handler, arguments.dry_run)
+    print('{resources} resources, {rewritten} versions rewritten, {unprocessed} unprocessed'.format(**statistics))
+
+
+if __name__ == '__main__':
+    main()
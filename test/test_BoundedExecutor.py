@@ -0,0 +1,101 @@
+import threading
+import time
+import unittest
+from concurrent.futures import TimeoutError
+
+from classes.BoundedExecutor import BoundedExecutor
+from common.batch import batch_write, put_requests
+
+
+class FlakyDynamoDB:
+    """Leaves the last request of every first attempt unprocessed."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.written = []
+        self.attempted = set()
+
+    def batch_write_item(self, RequestItems):
+        requests = RequestItems['table']
+        key = requests[0]['PutRequest']['Item']['id']
+        with self.lock:
+            retry = key in self.attempted
+            self.attempted.add(key)
+            accepted = requests if retry else requests[:-1]
+            self.written.extend(request['PutRequest']['Item']['id'] for request in accepted)
+        return {'UnprocessedItems': {} if retry else {'table': requests[-1:]}}
+
+
+class TestBoundedExecutorCase(unittest.TestCase):
+
+    def test_map_keeps_input_order(self):
+        with BoundedExecutor(4) as executor:
+            results = list(executor.map(lambda value: time.sleep((10 - value) / 1000) or value, range(10)))
+        self.assertEqual(results, list(range(10)), 'Results out of order')
+
+    def test_pending_calls_are_bounded(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'most': 0}
+
+        def call(value):
+            with lock:
+                state['running'] += 1
+                state['most'] = max(state['most'], state['running'])
+            time.sleep(0.005)
+            with lock:
+                state['running'] -= 1
+            return value
+
+        consumed = []
+        with BoundedExecutor(8, max_pending=3) as executor:
+            def items():
+                for value in range(20):
+                    consumed.append(value)
+                    yield value
+            for result in executor.map(call, items()):
+                self.assertLessEqual(len(consumed) - result, 4, 'Read too far ahead')
+        self.assertLessEqual(state['most'], 3, 'More calls running than pending slots')
+
+    def test_single_worker_runs_inline(self):
+        executor = BoundedExecutor(1)
+        threads = list(executor.map(lambda _: threading.current_thread(), range(3)))
+        self.assertEqual(threads, [threading.current_thread()] * 3, 'Calls left the calling thread')
+        self.assertIsNone(executor.pool, 'Pool created for inline executor')
+
+    def test_exception_is_raised_in_order(self):
+        def call(value):
+            if value == 2:
+                raise ValueError('failed ' + str(value))
+            return value
+
+        with BoundedExecutor(4) as executor:
+            results = []
+            with self.assertRaises(ValueError):
+                for result in executor.map(call, range(5)):
+                    results.append(result)
+        self.assertEqual(results, [0, 1], 'Results before the failure not returned')
+
+    def test_slow_call_times_out(self):
+        release = threading.Event()
+        with BoundedExecutor(2, timeout=0.05) as executor:
+            future, call = executor.submit_call(release.wait, (5,))
+            with self.assertRaises(TimeoutError):
+                executor.result(future, call)
+            release.set()
+            self.assertEqual(executor.result(*executor.submit_call(lambda: 'done', ())), 'done', 'Slot not returned')
+
+    def test_batch_write_with_executor_retries_every_chunk(self):
+        dynamodb = FlakyDynamoDB()
+        requests = put_requests([{'id': str(index)} for index in range(100)])
+        with BoundedExecutor(4) as executor:
+            unprocessed = batch_write(dynamodb, 'table', requests, sleep=lambda _: None, executor=executor)
+        self.assertEqual(unprocessed, [], 'Unprocessed items not retried')
+        self.assertEqual(sorted(dynamodb.written, key=int), [str(index) for index in range(100)], 'Items not written')
+
+    def test_batch_write_returns_unprocessed_in_request_order(self):
+        dynamodb = FlakyDynamoDB()
+        requests = put_requests([{'id': str(index)} for index in range(60)])
+        with BoundedExecutor(4) as executor:
+            unprocessed = batch_write(dynamodb, 'table', requests, max_attempts=1, executor=executor)
+        self.assertEqual([request['PutRequest']['Item']['id'] for request in unprocessed], ['24', '49', '59'],
+                         'Unprocessed items out of order')
@@ -0,0 +1,72 @@
+import os
+import unittest
+
+import boto3
+from moto import mock_dynamodb2
+
+from common.constants import Constants
+
+
+@mock_dynamodb2
+class TestConnectionManagerCase(unittest.TestCase):
+
+    def setUp(self):
+        """Mocked AWS Credentials for moto."""
+        os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+        os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+        os.environ['AWS_SECURITY_TOKEN'] = 'testing'
+        os.environ['AWS_SESSION_TOKEN'] = 'testing'
+        os.environ[Constants.ENV_VAR_TABLE_NAME] = 'testing'
+        os.environ[Constants.ENV_VAR_REGION] = 'eu-west-1'
+
+    def tearDown(self):
+        os.environ[Constants.ENV_VAR_TABLE_NAME] = 'testing'
+        os.environ[Constants.ENV_VAR_REGION] = 'eu-west-1'
+        os.environ.pop(Constants.ENV_VAR_DDB_MAX_POOL_CONNECTIONS, None)
+
+    def test_connection_is_reused(self):
+        from src.classes.ConnectionManager import ConnectionManager
+        connection = ConnectionManager()
+        table = connection.get_table()
+        dynamodb = connection.get_resource()
+        self.assertIs(connection.get_table(), table, 'Table not reused')
+        self.assertIs(connection.get_resource(), dynamodb, 'Resource not reused')
+        self.assertEqual(table.name, 'testing', 'Unexpected table name')
+
+    def test_connection_is_rebuilt_when_table_name_changes(self):
+        from src.classes.ConnectionManager import ConnectionManager
+        connection = ConnectionManager()
+        table = connection.get_table()
+        dynamodb = connection.get_resource()
+        os.environ[Constants.ENV_VAR_TABLE_NAME] = 'other'
+        self.assertIsNot(connection.get_table(), table, 'Table not rebuilt')
+        self.assertEqual(connection.get_table().name, 'other', 'Unexpected table name')
+        self.assertIs(connection.get_resource(), dynamodb, 'Resource rebuilt for same region')
+
+    def test_connection_is_rebuilt_when_region_changes(self):
+        from src.classes.ConnectionManager import ConnectionManager
+        connection = ConnectionManager()
+        dynamodb = connection.get_resource()
+        os.environ[Constants.ENV_VAR_REGION] = 'eu-north-1'
+        self.assertIsNot(connection.get_resource(), dynamodb, 'Resource not rebuilt')
+        self.assertEqual(connection.get_resource().meta.client.meta.region_name, 'eu-north-1',
+                         'Unexpected region')
+
+    def test_connection_uses_configured_pool_size(self):
+        from src.classes.ConnectionManager import ConnectionManager
+        os.environ[Constants.ENV_VAR_DDB_MAX_POOL_CONNECTIONS] = '25'
+        connection = ConnectionManager()
+        config = connection.get_resource().meta.client.meta.config
+        self.assertEqual(config.max_pool_connections, 25, 'Unexpected pool size')
+        self.assertTrue(config.tcp_keepalive, 'Keep-alive not enabled')
+
+    def test_injected_resource_is_kept(self):
+        from src.classes.ConnectionManager import ConnectionManager
+        dynamodb = boto3.resource('dynamodb', region_name='eu-west-1')
+        connection = ConnectionManager(dynamodb)
+        os.environ[Constants.ENV_VAR_REGION] = 'eu-north-1'
+        self.assertIs(connection.get_resource(), dynamodb, 'Injected resource replaced')
+
+
+if __name__ == '__main__':
+    unittest.main()
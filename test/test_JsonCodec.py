@@ -0,0 +1,38 @@
+import json
+import unittest
+from decimal import Decimal
+
+from classes.JsonCodec import JsonCodec, available_backends
+from common.constants import Constants
+
+
+class TestJsonCodecCase(unittest.TestCase):
+
+    def test_backends_round_trip(self):
+        value = {'resource_identifier': 'ebf20333', 'metadata': {'titles': {'no': 'En tittel på norsk'}},
+                 'files': {}, 'size': Decimal('12'), 'ratio': Decimal('0.5')}
+        for backend in available_backends():
+            json_codec = JsonCodec(backend)
+            encoded = json_codec.dumps(value)
+            self.assertIsInstance(encoded, str, 'Body not text for ' + backend)
+            self.assertEqual(json.loads(encoded), dict(value, size=12, ratio=0.5),
+                             'Unexpected encoding for ' + backend)
+            self.assertEqual(json_codec.loads(encoded), json.loads(encoded), 'Unexpected decoding for ' + backend)
+
+    def test_auto_backend(self):
+        self.assertEqual(JsonCodec().backend, available_backends()[0], 'Fastest backend not chosen')
+        self.assertEqual(JsonCodec(Constants.JSON_BACKEND_STDLIB).backend, Constants.JSON_BACKEND_STDLIB,
+                         'Standard library not chosen')
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            JsonCodec('simplejson')
+
+    def test_invalid_body(self):
+        for backend in available_backends():
+            with self.assertRaises(ValueError):
+                JsonCodec(backend).loads('{"operation": ')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import unittest
+
+from classes.Metrics import Metrics, DISABLED_REQUEST_METRICS
+from common.constants import Constants
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+class TestMetricsCase(unittest.TestCase):
+
+    def test_disabled(self):
+        lines = []
+        metrics = Metrics(False, emit=lines.append)
+        request_metrics = metrics.begin()
+        self.assertIs(request_metrics, DISABLED_REQUEST_METRICS, 'Metrics recorded while disabled')
+        request_metrics.label(Constants.OPERATION_GET)
+        request_metrics.mark(Constants.PHASE_PARSE)
+        metrics.end(request_metrics, 200)
+        self.assertEqual(lines, [], 'Metrics written while disabled')
+
+    def test_log_line(self):
+        lines = []
+        metrics = Metrics(True, clock=FakeClock(), wall_clock=lambda: 1571921822.655, emit=lines.append)
+        request_metrics = metrics.begin()
+        request_metrics.label(Constants.OPERATION_MODIFY)
+        request_metrics.mark(Constants.PHASE_PARSE)
+        request_metrics.mark(Constants.PHASE_STORAGE)
+        metrics.record_call(parsed={'ConsumedCapacity': [{'CapacityUnits': 2.0}, {'CapacityUnits': 1.0}],
+                                    'ResponseMetadata': {'RetryAttempts': 2}})
+        metrics.record_call(parsed={'ConsumedCapacity': {'CapacityUnits': 0.5},
+                                    'ResponseMetadata': {'RetryAttempts': 0}})
+        request_metrics.mark(Constants.PHASE_STORAGE)
+        metrics.end(request_metrics, 200)
+        metrics.record_call(parsed={'ConsumedCapacity': {'CapacityUnits': 8.0}})
+
+        self.assertEqual(len(lines), 1, 'Unexpected number of log lines')
+        line = json.loads(lines[0])
+        self.assertEqual(line['Operation'], Constants.OPERATION_MODIFY, 'Unexpected operation')
+        self.assertEqual(line['StatusCode'], 200, 'Unexpected status code')
+        self.assertAlmostEqual(line[Constants.PHASE_PARSE], 1.0, msg='Unexpected parse time')
+        self.assertAlmostEqual(line[Constants.PHASE_STORAGE], 2.0, msg='Storage phases not summed')
+        self.assertAlmostEqual(line['TotalTime'], 4.0, msg='Unexpected total time')
+        self.assertEqual(line['ConsumedCapacity'], 3.5, 'Unexpected consumed capacity')
+        self.assertEqual(line['RetryAttempts'], 2, 'Unexpected retry attempts')
+        self.assertEqual(line['StorageCalls'], 2, 'Unexpected storage calls')
+        self.assertEqual(line['_aws']['Timestamp'], 1571921822655, 'Unexpected timestamp')
+        names = {metric['Name'] for metric in line['_aws']['CloudWatchMetrics'][0]['Metrics']}
+        self.assertEqual(names, {Constants.PHASE_PARSE, Constants.PHASE_STORAGE, 'TotalTime', 'ConsumedCapacity',
+                                 'RetryAttempts', 'StorageCalls'}, 'Unexpected metric definitions')
+
+    def test_capacity_is_requested(self):
+        class Model:
+            def __init__(self, name):
+                self.name = name
+        params = {}
+        Metrics.request_capacity(params, Model('PutItem'))
+        self.assertEqual(params, {'ReturnConsumedCapacity': 'TOTAL'}, 'Consumed capacity not requested')
+        params = {}
+        Metrics.request_capacity(params, Model('DescribeTable'))
+        self.assertEqual(params, {}, 'Consumed capacity requested from an operation without it')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from classes.RateLimiter import RateLimiter
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiterCase(unittest.TestCase):
+
+    def test_burst_is_not_delayed(self):
+        clock = Clock()
+        rate_limiter = RateLimiter(10, clock=clock, sleep=clock.sleep)
+        for _ in range(10):
+            rate_limiter.acquire()
+        self.assertEqual(clock.sleeps, [], 'Burst delayed')
+
+    def test_rate_is_enforced(self):
+        clock = Clock()
+        rate_limiter = RateLimiter(10, burst=1, clock=clock, sleep=clock.sleep)
+        for _ in range(21):
+            rate_limiter.acquire()
+        self.assertAlmostEqual(clock.now, 2.0, msg='Rate not enforced')
+
+    def test_large_requests_are_paid_for_later(self):
+        clock = Clock()
+        rate_limiter = RateLimiter(10, burst=10, clock=clock, sleep=clock.sleep)
+        rate_limiter.acquire(30)
+        self.assertAlmostEqual(clock.now, 2.0, msg='Debt not waited for')
+        clock.now += 1.0
+        rate_limiter.acquire(10)
+        self.assertAlmostEqual(clock.now, 3.0, msg='Refilled tokens not used')
+
+    def test_disabled(self):
+        clock = Clock()
+        rate_limiter = RateLimiter(0, clock=clock, sleep=clock.sleep)
+        rate_limiter.acquire(1000)
+        self.assertFalse(rate_limiter.enabled, 'Rate limiter enabled')
+        self.assertEqual(clock.sleeps, [], 'Disabled rate limiter delayed')
+
+
+if __name__ == '__main__':
+    unittest.main()
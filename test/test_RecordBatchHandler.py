@@ -0,0 +1,229 @@
+import base64
+import http
+import json
+import os
+import unittest
+from unittest import mock
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from moto import mock_dynamodb2
+
+from common.constants import Constants
+from common.exceptions import ConcurrentModificationError
+
+EXISTING_RESOURCE_IDENTIFIER = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+CREATED_DATE = '2019-10-24T12:57:02.655994Z'
+
+
+def request_body(operation, resource, **parameters):
+    body = {Constants.JSON_ATTRIBUTE_NAME_OPERATION: operation, Constants.JSON_ATTRIBUTE_NAME_RESOURCE: resource}
+    body.update(parameters)
+    return json.dumps(body)
+
+
+def resource(title, resource_identifier=None, created_date=None):
+    resource_dict = {
+        'owner': 'owner@unit.no',
+        'files': {},
+        'metadata': {'titles': {'no': title}}
+    }
+    if resource_identifier is not None:
+        resource_dict['resource_identifier'] = resource_identifier
+    if created_date is not None:
+        resource_dict['createdDate'] = created_date
+    return resource_dict
+
+
+def generate_mock_sqs_event(bodies):
+    return {
+        'Records': [{
+            'messageId': 'message-' + str(index),
+            'receiptHandle': 'receipt-' + str(index),
+            'body': body,
+            'attributes': {'ApproximateReceiveCount': '1'},
+            'messageAttributes': {},
+            'eventSource': 'aws:sqs',
+            'eventSourceARN': 'arn:aws:sqs:eu-west-1:123456789012:harvest',
+            'awsRegion': 'eu-west-1'
+        } for index, body in enumerate(bodies)]
+    }
+
+
+def generate_mock_kinesis_event(bodies):
+    return {
+        'Records': [{
+            'kinesis': {
+                'kinesisSchemaVersion': '1.0',
+                'partitionKey': 'partition',
+                'sequenceNumber': '4959%020d' % index,
+                'data': base64.b64encode(body.encode('utf-8')).decode('ascii'),
+                'approximateArrivalTimestamp': 1571917022.655
+            },
+            'eventSource': 'aws:kinesis',
+            'eventID': 'shardId-000000000000:4959%020d' % index,
+            'eventSourceARN': 'arn:aws:kinesis:eu-west-1:123456789012:stream/harvest',
+            'awsRegion': 'eu-west-1'
+        } for index, body in enumerate(bodies)]
+    }
+
+
+@mock_dynamodb2
+class TestRecordBatchHandlerCase(unittest.TestCase):
+
+    def setUp(self):
+        os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+        os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+        os.environ['AWS_SECURITY_TOKEN'] = 'testing'
+        os.environ['AWS_SESSION_TOKEN'] = 'testing'
+        os.environ[Constants.ENV_VAR_TABLE_NAME] = 'testing'
+        os.environ[Constants.ENV_VAR_REGION] = 'eu-west-1'
+        self.dynamodb = boto3.resource('dynamodb', region_name=os.environ[Constants.ENV_VAR_REGION])
+        self.table = self.dynamodb.create_table(
+            TableName=os.environ[Constants.ENV_VAR_TABLE_NAME],
+            KeySchema=[{'AttributeName': 'resource_identifier', 'KeyType': 'HASH'},
+                       {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'resource_identifier', 'AttributeType': 'S'},
+                                  {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+            ProvisionedThroughput={'ReadCapacityUnits': 1, 'WriteCapacityUnits': 1})
+        self.table.put_item(Item={
+            'resource_identifier': EXISTING_RESOURCE_IDENTIFIER,
+            'modifiedDate': CREATED_DATE,
+            'createdDate': CREATED_DATE,
+            'metadata': {'titles': {'no': 'En tittel'}},
+            'files': {},
+            'owner': 'owner@unit.no'
+        })
+        self.logged = []
+
+    def tearDown(self):
+        self.table.delete()
+
+    def record_batch_handler(self):
+        from classes.RecordBatchHandler import RecordBatchHandler
+        from classes.RequestHandler import RequestHandler
+        return RecordBatchHandler(RequestHandler(self.dynamodb), emit=self.logged.append)
+
+    def versions(self, resource_identifier):
+        return self.table.query(
+            KeyConditionExpression=Key(Constants.DDB_FIELD_RESOURCE_IDENTIFIER).eq(resource_identifier)
+        )[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]
+
+    def test_sqs_inserts_are_written(self):
+        event = generate_mock_sqs_event([request_body(Constants.OPERATION_INSERT, resource('Første')),
+                                         request_body(Constants.OPERATION_INSERT, resource('Andre'))])
+        batch_response = self.record_batch_handler().handler(event, None)
+        self.assertEqual(batch_response, {'batchItemFailures': []}, 'Unexpected failures')
+        items = self.table.scan()[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]
+        self.assertEqual(sorted(item['metadata']['titles']['no'] for item in items), ['Andre', 'En tittel', 'Første'],
+                         'Records not persisted')
+
+    def test_kinesis_modifications_of_one_resource_are_applied_in_order(self):
+        event = generate_mock_kinesis_event([
+            request_body(Constants.OPERATION_MODIFY, resource('Andre', EXISTING_RESOURCE_IDENTIFIER)),
+            request_body(Constants.OPERATION_INSERT, resource('Ny')),
+            request_body(Constants.OPERATION_MODIFY, resource('Tredje', EXISTING_RESOURCE_IDENTIFIER))
+        ])
+        batch_response = self.record_batch_handler().handler(event, None)
+        self.assertEqual(batch_response, {'batchItemFailures': []}, 'Unexpected failures')
+        versions = self.versions(EXISTING_RESOURCE_IDENTIFIER)
+        self.assertEqual([version['metadata']['titles']['no'] for version in versions],
+                         ['En tittel', 'Andre', 'Tredje'], 'Versions not written in record order')
+        self.assertEqual(['supersededDate' in version for version in versions], [True, True, False],
+                         'Previous versions not superseded')
+
+    def test_coalesced_modifications_are_written_once(self):
+        from classes.RecordBatchHandler import RecordBatchHandler
+        from classes.RequestHandler import RequestHandler
+        record_batch_handler = RecordBatchHandler(RequestHandler(self.dynamodb,
+                                                                 coalesce_mode=Constants.COALESCE_MODE_LAST))
+        event = generate_mock_kinesis_event([
+            request_body(Constants.OPERATION_MODIFY, resource('Andre', EXISTING_RESOURCE_IDENTIFIER)),
+            request_body(Constants.OPERATION_MODIFY, resource('Tredje', EXISTING_RESOURCE_IDENTIFIER))
+        ])
+        batch_response = record_batch_handler.handler(event, None)
+        self.assertEqual(batch_response, {'batchItemFailures': []}, 'Unexpected failures')
+        self.assertEqual([version['metadata']['titles']['no'] for version in self.versions(
+            EXISTING_RESOURCE_IDENTIFIER)], ['En tittel', 'Tredje'], 'Modifications not coalesced')
+
+    def test_invalid_records_are_dropped(self):
+        event = generate_mock_sqs_event([
+            'not json',
+            request_body(Constants.OPERATION_GET, {'resource_identifier': EXISTING_RESOURCE_IDENTIFIER}),
+            request_body(Constants.OPERATION_INSERT, {'files': {}, 'metadata': {}}),
+            request_body(Constants.OPERATION_MODIFY, resource('Ukjent', 'xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx')),
+            request_body(Constants.OPERATION_INSERT, resource('Gyldig'))
+        ])
+        batch_response = self.record_batch_handler().handler(event, None)
+        self.assertEqual(batch_response, {'batchItemFailures': []}, 'Invalid records reported for retry')
+        logged = [json.loads(line) for line in self.logged]
+        self.assertEqual([line['itemIdentifier'] for line in logged],
+                         ['message-0', 'message-1', 'message-2', 'message-3'], 'Invalid records not logged')
+        self.assertEqual({line['statusCode'] for line in logged}, {http.HTTPStatus.BAD_REQUEST},
+                         'Unexpected status codes')
+        self.assertEqual(logged[1]['error'], Constants.ERROR_UNSUPPORTED_RECORD_OPERATION,
+                         'Did not get expected error message')
+        self.assertEqual(len(self.table.scan()[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]), 2,
+                         'Valid record not persisted')
+
+    def test_unprocessed_records_are_reported(self):
+        event = generate_mock_kinesis_event([
+            request_body(Constants.OPERATION_INSERT, resource('Første')),
+            request_body(Constants.OPERATION_INSERT, {'files': {}, 'metadata': {}}),
+            request_body(Constants.OPERATION_MODIFY, resource('Andre', EXISTING_RESOURCE_IDENTIFIER))
+        ])
+        with mock.patch('classes.DynamoDBStorage.batch_write', side_effect=lambda dynamodb, table_name, requests,
+                        **kwargs: requests), \
+                mock.patch('classes.DynamoDBStorage.DynamoDBStorage.modify',
+                           side_effect=ConcurrentModificationError('modified')):
+            batch_response = self.record_batch_handler().handler(event, None)
+        self.assertEqual(batch_response, {'batchItemFailures': [{'itemIdentifier': '4959%020d' % 0},
+                                                                {'itemIdentifier': '4959%020d' % 2}]},
+                         'Unprocessed records not reported')
+
+    def test_conditional_records_are_written_one_by_one(self):
+        event = generate_mock_sqs_event([
+            request_body(Constants.OPERATION_MODIFY, resource('Andre', EXISTING_RESOURCE_IDENTIFIER, CREATED_DATE),
+                         expectedModifiedDate=CREATED_DATE),
+            request_body(Constants.OPERATION_MODIFY, resource('Tredje', EXISTING_RESOURCE_IDENTIFIER, CREATED_DATE),
+                         expectedModifiedDate=CREATED_DATE)
+        ])
+        batch_response = self.record_batch_handler().handler(event, None)
+        self.assertEqual(batch_response, {'batchItemFailures': [{'itemIdentifier': 'message-1'}]},
+                         'Conflicting record not reported')
+        self.assertEqual([version['metadata']['titles']['no'] for version in self.versions(
+            EXISTING_RESOURCE_IDENTIFIER)], ['En tittel', 'Andre'], 'Unexpected versions')
+
+    def test_conditional_records_keep_record_order(self):
+        event = generate_mock_kinesis_event([
+            request_body(Constants.OPERATION_MODIFY, resource('Andre', EXISTING_RESOURCE_IDENTIFIER, CREATED_DATE),
+                         expectedModifiedDate=CREATED_DATE),
+            request_body(Constants.OPERATION_MODIFY, resource('Tredje', EXISTING_RESOURCE_IDENTIFIER))
+        ])
+        batch_response = self.record_batch_handler().handler(event, None)
+        self.assertEqual(batch_response, {'batchItemFailures': []}, 'Conditional record written out of order')
+        self.assertEqual([version['metadata']['titles']['no'] for version in self.versions(
+            EXISTING_RESOURCE_IDENTIFIER)], ['En tittel', 'Andre', 'Tredje'], 'Versions not written in record order')
+
+    def test_coalesced_modifications_do_not_pass_conditional_records(self):
+        from classes.RecordBatchHandler import RecordBatchHandler
+        from classes.RequestHandler import RequestHandler
+        record_batch_handler = RecordBatchHandler(RequestHandler(self.dynamodb,
+                                                                 coalesce_mode=Constants.COALESCE_MODE_LAST))
+        event = generate_mock_kinesis_event([
+            request_body(Constants.OPERATION_MODIFY, resource('Andre', EXISTING_RESOURCE_IDENTIFIER, CREATED_DATE),
+                         expectedModifiedDate=CREATED_DATE),
+            request_body(Constants.OPERATION_MODIFY, resource('Tredje', EXISTING_RESOURCE_IDENTIFIER)),
+            request_body(Constants.OPERATION_MODIFY, resource('Fjerde', EXISTING_RESOURCE_IDENTIFIER))
+        ])
+        batch_response = record_batch_handler.handler(event, None)
+        self.assertEqual(batch_response, {'batchItemFailures': []}, 'Conditional record written out of order')
+        self.assertEqual([version['metadata']['titles']['no'] for version in self.versions(
+            EXISTING_RESOURCE_IDENTIFIER)], ['En tittel', 'Andre', 'Fjerde'], 'Modifications not coalesced in order')
+
+    def test_app_batch_handler(self):
+        import app
+        with self.assertRaises(ValueError):
+            app.batch_handler(None, None)
+        with self.assertRaises(ValueError):
+            app.batch_handler({'body': '{}'}, None)
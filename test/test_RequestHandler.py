@@ -3,16 +3,22 @@ import json
 import os
 import random
 import string
+import threading
 import unittest
 import uuid
+from unittest import mock
+from datetime import datetime, timezone
 
 import boto3
-from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.types import Binary
 from moto import mock_dynamodb2
+from moto.dynamodb2.models import DynamoDBBackend
 
 from common.constants import Constants
+from common.decoders import decode_resource
 from common.encoders import encode_resource, encode_file_metadata, encode_files, encode_creator, encode_metadata
-from common.helpers import remove_none_values
+from common.helpers import remove_none_values, encode_continuation_token, utc_timestamp
 from data.creator import Creator
 from data.file import File
 from data.file_metadata import FileMetadata
@@ -30,6 +36,60 @@ def remove_mock_database(dynamodb):
     dynamodb.Table(os.environ[Constants.ENV_VAR_TABLE_NAME]).delete()
 
 
+def generate_mock_batch_event(operation, resources):
+    return {
+        'body': json.dumps({
+            Constants.JSON_ATTRIBUTE_NAME_OPERATION: operation,
+            Constants.JSON_ATTRIBUTE_NAME_RESOURCES: resources
+        })
+    }
+
+
+def generate_mock_conditional_event(resource, expected_modified_date):
+    resource_dict = encode_resource(resource)
+    resource_dict['created_date'] = resource_dict.pop('createdDate', None)
+    return {
+        'body': json.dumps({
+            Constants.JSON_ATTRIBUTE_NAME_OPERATION: Constants.OPERATION_MODIFY,
+            Constants.JSON_ATTRIBUTE_NAME_RESOURCE: resource_dict,
+            Constants.JSON_ATTRIBUTE_NAME_EXPECTED_MODIFIED_DATE: expected_modified_date
+        })
+    }
+
+
+def generate_mock_get_event(resource_identifier, fields=None, consistent_read=None):
+    return {
+        'body': json.dumps(remove_none_values({
+            Constants.JSON_ATTRIBUTE_NAME_OPERATION: Constants.OPERATION_GET,
+            Constants.JSON_ATTRIBUTE_NAME_RESOURCE: {'resource_identifier': resource_identifier},
+            Constants.JSON_ATTRIBUTE_NAME_FIELDS: fields,
+            Constants.JSON_ATTRIBUTE_NAME_CONSISTENT_READ: consistent_read
+        }))
+    }
+
+
+def generate_mock_list_versions_event(resource_identifier, parameters):
+    body = {
+        Constants.JSON_ATTRIBUTE_NAME_OPERATION: Constants.OPERATION_LIST_VERSIONS,
+        Constants.JSON_ATTRIBUTE_NAME_RESOURCE: {'resource_identifier': resource_identifier}
+    }
+    body.update(parameters)
+    return {
+        'body': json.dumps(remove_none_values(body))
+    }
+
+
+def generate_mock_list_by_owner_event(owner, parameters=None):
+    body = {
+        Constants.JSON_ATTRIBUTE_NAME_OPERATION: Constants.OPERATION_LIST_BY_OWNER,
+        Constants.JSON_ATTRIBUTE_NAME_OWNER: owner
+    }
+    body.update(parameters or {})
+    return {
+        'body': json.dumps(remove_none_values(body))
+    }
+
+
 def generate_mock_event(operation, resource):
     body = Body(operation, resource)
     body_value = json.dumps(body, default=encode_body)
@@ -38,6 +98,20 @@ def generate_mock_event(operation, resource):
     }
 
 
+def generate_mock_idempotent_event(operation, resource, idempotency_key):
+    body = json.loads(generate_mock_event(operation, resource)['body'])
+    body[Constants.JSON_ATTRIBUTE_NAME_IDEMPOTENCY_KEY] = idempotency_key
+    body[Constants.JSON_ATTRIBUTE_NAME_RESPONSE_FORMAT] = Constants.RESPONSE_FORMAT_SLIM
+    return {'body': json.dumps(body)}
+
+
+def create_idempotency_table(dynamodb):
+    return dynamodb.create_table(TableName='idempotency',
+                                 KeySchema=[{'AttributeName': 'idempotencyKey', 'KeyType': 'HASH'}],
+                                 AttributeDefinitions=[{'AttributeName': 'idempotencyKey', 'AttributeType': 'S'}],
+                                 ProvisionedThroughput={'ReadCapacityUnits': 1, 'WriteCapacityUnits': 1})
+
+
 @mock_dynamodb2
 class TestHandlerCase(unittest.TestCase):
     EXISTING_RESOURCE_IDENTIFIER = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
@@ -62,7 +136,15 @@ class TestHandlerCase(unittest.TestCase):
                                                             {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
                                                  AttributeDefinitions=[
                                                      {'AttributeName': 'resource_identifier', 'AttributeType': 'S'},
-                                                     {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+                                                     {'AttributeName': 'modifiedDate', 'AttributeType': 'S'},
+                                                     {'AttributeName': 'latestOwner', 'AttributeType': 'S'}],
+                                                 GlobalSecondaryIndexes=[
+                                                     {'IndexName': 'OwnerIndex',
+                                                      'KeySchema': [{'AttributeName': 'latestOwner', 'KeyType': 'HASH'},
+                                                                    {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                                                      'Projection': {'ProjectionType': 'ALL'},
+                                                      'ProvisionedThroughput': {'ReadCapacityUnits': 1,
+                                                                                'WriteCapacityUnits': 1}}],
                                                  ProvisionedThroughput={'ReadCapacityUnits': 1,
                                                                         'WriteCapacityUnits': 1})
         table_connection.put_item(
@@ -112,6 +194,24 @@ class TestHandlerCase(unittest.TestCase):
             'owner': 'owner@unit.no'
         }
 
+    def insert_versions(self, table_connection, count):
+        for counter in range(count):
+            table_connection.put_item(
+                Item={
+                    'resource_identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                    'modifiedDate': '2019-10-25T12:57:02.%06dZ' % counter,
+                    'createdDate': '2019-10-24T12:57:02.655994Z',
+                    'metadata': {
+                        'titles': {
+                            'no': 'En tittel ' + str(counter)
+                        }
+                    },
+                    'files': {},
+                    'owner': 'owner@unit.no',
+                    'supersededDate': '2019-10-25T12:57:02.%06dZ' % (counter + 1)
+                }
+            )
+
     def random_word(self, length):
         letters = string.ascii_lowercase
         return ''.join(random.choice(letters) for i in range(length))
@@ -147,6 +247,223 @@ class TestHandlerCase(unittest.TestCase):
                          'HTTP Status code not 201')
         remove_mock_database(dynamodb)
 
+    def idempotent_request_handler(self, dynamodb):
+        from src.classes.RequestHandler import RequestHandler
+        request_handler = RequestHandler(dynamodb)
+        idempotency_table = create_idempotency_table(dynamodb)
+        self.addCleanup(idempotency_table.delete)
+        request_handler.idempotency.table_name = idempotency_table.name
+        return request_handler
+
+    def test_handler_idempotent_insert(self):
+        dynamodb = self.setup_mock_database()
+        request_handler = self.idempotent_request_handler(dynamodb)
+        resource = self.generate_mock_resource()
+        event = generate_mock_idempotent_event(Constants.OPERATION_INSERT, resource, 'insert-1')
+        first_response = request_handler.handler(event, None)
+        self.assertEqual(first_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.CREATED,
+                         'HTTP Status code not 201')
+        request_handler.cache.clear()
+        repeated_response = request_handler.handler(event, None)
+        self.assertEqual(repeated_response, first_response, 'Repeated request not answered with the first response')
+        resource_identifier = json.loads(first_response[Constants.RESPONSE_BODY])['resource_identifier']
+        self.assertEqual(len(request_handler.query_versions(resource_identifier)[0]), 1, 'Resource written twice')
+        self.assertEqual(dynamodb.Table(os.environ[Constants.ENV_VAR_TABLE_NAME]).scan()['Count'], 3,
+                         'Unexpected number of resources')
+
+        resource.owner = 'other@unit.no'
+        reused_response = request_handler.handler(
+            generate_mock_idempotent_event(Constants.OPERATION_INSERT, resource, 'insert-1'), None)
+        self.assertEqual(reused_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.BAD_REQUEST,
+                         'Reused key not rejected')
+        self.assertEqual(reused_response[Constants.RESPONSE_BODY], Constants.ERROR_IDEMPOTENCY_KEY_REUSED,
+                         'Unexpected error')
+        invalid_response = request_handler.handler(
+            generate_mock_idempotent_event(Constants.OPERATION_INSERT, resource, ''), None)
+        self.assertEqual(invalid_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.BAD_REQUEST,
+                         'Empty key not rejected')
+        remove_mock_database(dynamodb)
+
+    def test_handler_idempotent_insert_full_response(self):
+        dynamodb = self.setup_mock_database()
+        request_handler = self.idempotent_request_handler(dynamodb)
+        event = generate_mock_idempotent_event(Constants.OPERATION_INSERT, self.generate_mock_resource(), 'insert-1')
+        body = json.loads(event['body'])
+        body[Constants.JSON_ATTRIBUTE_NAME_RESPONSE_FORMAT] = Constants.RESPONSE_FORMAT_FULL
+        event = {'body': json.dumps(body)}
+        first_response = request_handler.handler(event, None)
+        self.assertEqual(first_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.CREATED,
+                         'HTTP Status code not 201')
+        self.assertIn('ResponseMetadata', json.loads(first_response[Constants.RESPONSE_BODY]),
+                      'Full response without the DynamoDB response')
+        request_handler.cache.clear()
+        repeated_response = request_handler.handler(event, None)
+        self.assertEqual(repeated_response, first_response, 'Repeated request not answered with the first response')
+
+        body[Constants.JSON_ATTRIBUTE_NAME_RESPONSE_FORMAT] = Constants.RESPONSE_FORMAT_SLIM
+        slim_response = request_handler.handler({'body': json.dumps(body)}, None)
+        self.assertEqual(slim_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.CREATED,
+                         'HTTP Status code not 201')
+        self.assertEqual(json.loads(slim_response[Constants.RESPONSE_BODY])['resource_identifier'],
+                         json.loads(first_response[Constants.RESPONSE_BODY])['resource_identifier'],
+                         'Slim repeat not answered for the first write')
+        remove_mock_database(dynamodb)
+
+    def test_handler_idempotent_insert_expires(self):
+        dynamodb = self.setup_mock_database()
+        request_handler = self.idempotent_request_handler(dynamodb)
+        now = [1571921822.0]
+        request_handler.idempotency.clock = lambda: now[0]
+        event = generate_mock_idempotent_event(Constants.OPERATION_INSERT, self.generate_mock_resource(), 'insert-1')
+        first_response = request_handler.handler(event, None)
+        now[0] += Constants.DEFAULT_IDEMPOTENCY_TTL_SECONDS
+        second_response = request_handler.handler(event, None)
+        self.assertNotEqual(json.loads(second_response[Constants.RESPONSE_BODY])['resource_identifier'],
+                            json.loads(first_response[Constants.RESPONSE_BODY])['resource_identifier'],
+                            'Expired key replayed')
+        remove_mock_database(dynamodb)
+
+    def test_handler_idempotency_disabled(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        event = generate_mock_idempotent_event(Constants.OPERATION_INSERT, self.generate_mock_resource(), 'insert-1')
+        handler_response = request_handler.handler(event, None)
+        self.assertEqual(handler_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        self.assertEqual(handler_response[Constants.RESPONSE_BODY], Constants.ERROR_IDEMPOTENCY_DISABLED,
+                         'Unexpected error')
+        remove_mock_database(dynamodb)
+
+    def test_handler_idempotent_modify(self):
+        dynamodb = self.setup_mock_database()
+        request_handler = self.idempotent_request_handler(dynamodb)
+        resource = self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER)
+        event = generate_mock_idempotent_event(Constants.OPERATION_MODIFY, resource, 'modify-1')
+        first_response = request_handler.handler(event, None)
+        self.assertEqual(first_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK, 'HTTP Status code not 200')
+        repeated_response = request_handler.handler(event, None)
+        self.assertEqual(repeated_response, first_response, 'Repeated request not answered with the first response')
+        self.assertEqual(len(request_handler.query_versions(self.EXISTING_RESOURCE_IDENTIFIER)[0]), 2,
+                         'Modification written twice')
+        remove_mock_database(dynamodb)
+
+    def test_handler_concurrent_duplicate_requests(self):
+        dynamodb = self.setup_mock_database()
+        request_handler = self.idempotent_request_handler(dynamodb)
+        resource = self.generate_mock_resource()
+        event = generate_mock_idempotent_event(Constants.OPERATION_INSERT, resource, 'insert-1')
+        first_response = request_handler.handler(event, None)
+
+        # A duplicate that looked the key up before the first request was committed
+        stale_handler = request_handler.__class__(dynamodb)
+        stale_handler.idempotency.table_name = request_handler.idempotency.table_name
+        lookups = []
+        get = stale_handler.idempotency.get
+
+        def stale_get(idempotency_key):
+            lookups.append(idempotency_key)
+            return None if len(lookups) == 1 else get(idempotency_key)
+        stale_handler.idempotency.get = stale_get
+        self.assertEqual(stale_handler.handler(event, None), first_response, 'Duplicate not answered with first response')
+        self.assertEqual(len(lookups), 2, 'Recorded outcome not read after the cancelled write')
+
+        modify_event = generate_mock_idempotent_event(
+            Constants.OPERATION_MODIFY, self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER),
+            'modify-1')
+        responses = []
+        barrier = threading.Barrier(4)
+        # DynamoDB isolates transactions from each other, moto does not
+        transaction_lock = threading.Lock()
+        transact_write_items = DynamoDBBackend.transact_write_items
+
+        def isolated_transact_write_items(backend, *args, **kwargs):
+            with transaction_lock:
+                return transact_write_items(backend, *args, **kwargs)
+        patcher = mock.patch.object(DynamoDBBackend, 'transact_write_items', isolated_transact_write_items)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        def submit(event):
+            handler = request_handler.__class__(dynamodb)
+            handler.idempotency.table_name = request_handler.idempotency.table_name
+            barrier.wait()
+            responses.append(handler.handler(event, None))
+
+        threads = [threading.Thread(target=submit, args=(modify_event,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(request_handler.query_versions(self.EXISTING_RESOURCE_IDENTIFIER)[0]), 2,
+                         'Concurrent duplicates written more than once')
+        successful = [handler_response for handler_response in responses
+                      if handler_response[Constants.RESPONSE_STATUS_CODE] == http.HTTPStatus.OK]
+        self.assertGreaterEqual(len(successful), 1, 'No duplicate succeeded')
+        self.assertEqual(len({handler_response[Constants.RESPONSE_BODY] for handler_response in successful}), 1,
+                         'Duplicates answered with different responses')
+        for handler_response in responses:
+            self.assertIn(handler_response[Constants.RESPONSE_STATUS_CODE], (http.HTTPStatus.OK, http.HTTPStatus.CONFLICT),
+                          'Unexpected status code')
+        remove_mock_database(dynamodb)
+
+    def test_handler_metrics(self):
+        from src.classes.RequestHandler import RequestHandler
+        from src.classes.Metrics import Metrics
+        dynamodb = self.setup_mock_database()
+        lines = []
+        request_handler = RequestHandler(dynamodb, metrics=Metrics(True, emit=lines.append))
+        event = generate_mock_event(Constants.OPERATION_INSERT, self.generate_mock_resource())
+        self.assertEqual(request_handler.handler(event, None)[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.CREATED,
+                         'HTTP Status code not 201')
+        request_handler.handler({'body': '{"operation": "UNKNOWN_OPERATION", "resource": {}}'}, None)
+        self.assertEqual(len(lines), 2, 'Not one log line per request')
+        line = json.loads(lines[0])
+        self.assertEqual(line['Operation'], Constants.OPERATION_INSERT, 'Unexpected operation')
+        self.assertEqual(line['StatusCode'], http.HTTPStatus.CREATED, 'Unexpected status code')
+        for phase in (Constants.PHASE_PARSE, Constants.PHASE_DECODE, Constants.PHASE_VALIDATE,
+                      Constants.PHASE_STORAGE, Constants.PHASE_SERIALIZE):
+            self.assertGreaterEqual(line[phase], 0, 'Phase ' + phase + ' not timed')
+        self.assertGreaterEqual(line['StorageCalls'], 1, 'Storage calls not counted')
+        self.assertEqual(line['RetryAttempts'], 0, 'Unexpected retry attempts')
+        self.assertEqual(json.loads(lines[1])['StatusCode'], http.HTTPStatus.BAD_REQUEST, 'Unexpected status code')
+        remove_mock_database(dynamodb)
+
+    def test_handler_batch_metrics_count_worker_calls(self):
+        from src.classes.BoundedExecutor import BoundedExecutor
+        from src.classes.RequestHandler import RequestHandler
+        from src.classes.Metrics import Metrics
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        resources = []
+        for counter in range(6):
+            insert_event = generate_mock_event(Constants.OPERATION_INSERT, self.generate_mock_resource())
+            resource_identifier = json.loads(request_handler.handler(insert_event, None)[Constants.RESPONSE_BODY])[
+                'resource_identifier']
+            resources.append(encode_resource(self.generate_mock_resource(None, None, resource_identifier)))
+        storage_calls = dict()
+        for workers in (1, 8):
+            lines = []
+            # Every handler gets its own client, as instrument() hooks into a client only once
+            worker_handler = RequestHandler(boto3.resource('dynamodb', region_name=os.environ[Constants.ENV_VAR_REGION]),
+                                            metrics=Metrics(True, emit=lines.append), executor=BoundedExecutor(workers))
+            event = generate_mock_batch_event(Constants.OPERATION_BATCH_MODIFY, resources)
+            # moto's transactions are not thread-safe, the workers still make them on their own threads
+            lock = threading.Lock()
+            modify = worker_handler.storage.modify
+
+            def serialized_modify(*args, **kwargs):
+                with lock:
+                    return modify(*args, **kwargs)
+            with mock.patch.object(worker_handler.storage, 'modify', side_effect=serialized_modify):
+                self.assertEqual(worker_handler.handler(event, None)[Constants.RESPONSE_STATUS_CODE],
+                                 http.HTTPStatus.OK, 'HTTP Status code not 200')
+            worker_handler.executor.shutdown()
+            storage_calls[workers] = json.loads(lines[0])['StorageCalls']
+        self.assertGreaterEqual(storage_calls[1], 2 * len(resources), 'Storage calls not counted')
+        self.assertEqual(storage_calls[8], storage_calls[1], 'Storage calls on workers not counted')
+        remove_mock_database(dynamodb)
+
     def test_handler_insert_resource_missing_resource_metadata(self):
         from src.classes.RequestHandler import RequestHandler
         dynamodb = self.setup_mock_database()
@@ -220,6 +537,38 @@ class TestHandlerCase(unittest.TestCase):
                          'HTTP Status code not 200')
         remove_mock_database(dynamodb)
 
+    def test_handler_slim_response_format(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb, response_format=Constants.RESPONSE_FORMAT_SLIM)
+        resource = self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER)
+        handler_modify_response = request_handler.handler(generate_mock_event(Constants.OPERATION_MODIFY, resource),
+                                                          None)
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        body = json.loads(handler_modify_response[Constants.RESPONSE_BODY])
+        self.assertEqual(sorted(body), ['createdDate', 'modifiedDate', 'resource_identifier'],
+                         'Unexpected slim response')
+        self.assertEqual(body['createdDate'], '2019-10-24T12:57:02.655994Z', 'Unexpected createdDate')
+
+        event = generate_mock_event(Constants.OPERATION_INSERT, resource)
+        for response_format, expected_keys in ((Constants.RESPONSE_FORMAT_FULL, 'ResponseMetadata'),
+                                               (Constants.RESPONSE_FORMAT_SLIM, 'modifiedDate')):
+            body = json.loads(event['body'])
+            body[Constants.JSON_ATTRIBUTE_NAME_RESPONSE_FORMAT] = response_format
+            handler_insert_response = request_handler.handler({'body': json.dumps(body)}, None)
+            self.assertEqual(handler_insert_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.CREATED,
+                             'HTTP Status code not 201')
+            body = json.loads(handler_insert_response[Constants.RESPONSE_BODY])
+            self.assertIn(expected_keys, body, 'Response format not applied')
+            self.assertIn('resource_identifier', body, 'Identifier not returned')
+
+        body = json.loads(event['body'])
+        body[Constants.JSON_ATTRIBUTE_NAME_RESPONSE_FORMAT] = 'tiny'
+        self.assertEqual(request_handler.handler({'body': json.dumps(body)}, None)[Constants.RESPONSE_STATUS_CODE],
+                         http.HTTPStatus.BAD_REQUEST, 'HTTP Status code not 400')
+        remove_mock_database(dynamodb)
+
     def test_handler_modify_resource_missing_resource_identifier(self):
         from src.classes.RequestHandler import RequestHandler
         dynamodb = self.setup_mock_database()
@@ -312,6 +661,27 @@ class TestHandlerCase(unittest.TestCase):
                          'HTTP Status code not 400')
         remove_mock_database(dynamodb)
 
+    def test_handler_modify_resource_invalid_nested_attributes_in_event_body(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        table_connection = request_handler.get_table_connection()
+        table_connection.query = None
+        event = {
+            "body": "{\"operation\": \"MODIFY\",\"resource\": {\"resource_identifier\": "
+                    "\"ebf20333-35a5-4a06-9c58-68ea688a9a8b\", \"owner\": \"owner@unit.no\", \"files\": "
+                    "{\"FILE_IDENTIFIER_1\": {\"size\": []}}, \"metadata\": {\"titles\": [\"En tittel\"]}}}"
+        }
+        handler_modify_response = request_handler.handler(event, None)
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_BODY],
+                         'Resource with identifier ebf20333-35a5-4a06-9c58-68ea688a9a8b has invalid attribute type '
+                         'for metadata.titles; Resource with identifier ebf20333-35a5-4a06-9c58-68ea688a9a8b has '
+                         'invalid attribute type for files.FILE_IDENTIFIER_1.size',
+                         'Did not get expected error message')
+        remove_mock_database(dynamodb)
+
     def test_handler_modify_resource_invalid_resource_identifier_field_json_in_event_body(self):
         from src.classes.RequestHandler import RequestHandler
         dynamodb = self.setup_mock_database()
@@ -436,7 +806,7 @@ class TestHandlerCase(unittest.TestCase):
         self.assertEqual(inserted_resource[Constants.DDB_FIELD_MODIFIED_DATE],
                          inserted_resource[Constants.DDB_FIELD_CREATED_DATE],
                          'Value not persisted as expected')
-        self.assertEqual(inserted_resource[Constants.DDB_FIELD_METADATA], resource_inserted.metadata,
+        self.assertEqual(inserted_resource[Constants.DDB_FIELD_METADATA], encode_metadata(resource_inserted.metadata),
                          'Value not persisted as expected')
         remove_mock_database(dynamodb)
 
@@ -507,6 +877,696 @@ class TestHandlerCase(unittest.TestCase):
                             'Value not persisted as expected')
         remove_mock_database(dynamodb)
 
+    def test_get_latest_version(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        table_connection = request_handler.get_table_connection()
+        for counter in range(50):
+            table_connection.put_item(
+                Item={
+                    'resource_identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                    'modifiedDate': '2019-10-25T12:57:02.%06dZ' % counter,
+                    'createdDate': '2019-10-24T12:57:02.655994Z',
+                    'metadata': {
+                        'titles': {
+                            'no': 'En tittel ' + str(counter)
+                        }
+                    },
+                    'files': {},
+                    'owner': 'owner@unit.no'
+                }
+            )
+
+        latest_version = request_handler.get_latest_version(self.EXISTING_RESOURCE_IDENTIFIER,
+                                                            Constants.DDB_LATEST_VERSION_ATTRIBUTES)
+        self.assertEqual(latest_version[Constants.DDB_FIELD_MODIFIED_DATE], '2019-10-25T12:57:02.000049Z',
+                         'Latest version not returned')
+        self.assertEqual(latest_version[Constants.DDB_FIELD_CREATED_DATE], '2019-10-24T12:57:02.655994Z',
+                         'Latest version not returned')
+        self.assertNotIn(Constants.DDB_FIELD_METADATA, latest_version, 'Attribute not projected away')
+        self.assertIsNone(request_handler.get_latest_version('xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx'),
+                          'Unknown resource returned')
+
+        resource = self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER)
+        event = generate_mock_event(Constants.OPERATION_MODIFY, resource)
+        handler_modify_response = request_handler.handler(event, None)
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        latest_version = request_handler.get_latest_version(self.EXISTING_RESOURCE_IDENTIFIER)
+        self.assertEqual(latest_version[Constants.DDB_FIELD_CREATED_DATE], '2019-10-24T12:57:02.655994Z',
+                         'Value not persisted as expected')
+        remove_mock_database(dynamodb)
+
+    def test_handler_modify_resource_with_expected_modified_date(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource('2019-10-24T12:57:02.655994Z', None,
+                                               self.EXISTING_RESOURCE_IDENTIFIER)
+        event = generate_mock_conditional_event(resource, '2019-10-24T12:57:02.655994Z')
+        handler_modify_response = request_handler.handler(event, None)
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+
+        handler_modify_response = request_handler.handler(event, None)
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.CONFLICT,
+                         'HTTP Status code not 409')
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_BODY],
+                         'Resource with identifier ebf20333-35a5-4a06-9c58-68ea688a9a8b has been modified since '
+                         '2019-10-24T12:57:02.655994Z',
+                         'Did not get expected error message')
+
+        query_results = request_handler.get_table_connection().query(
+            KeyConditionExpression=Key(Constants.DDB_FIELD_RESOURCE_IDENTIFIER).eq(self.EXISTING_RESOURCE_IDENTIFIER)
+        )
+        items = query_results[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]
+        self.assertEqual(len(items), 2, 'Value not persisted as expected')
+        self.assertEqual(items[0][Constants.DDB_FIELD_SUPERSEDED_DATE], items[1][Constants.DDB_FIELD_MODIFIED_DATE],
+                         'Previous version not marked as superseded')
+        self.assertEqual(items[1][Constants.DDB_FIELD_CREATED_DATE], '2019-10-24T12:57:02.655994Z',
+                         'Value not persisted as expected')
+
+        event = generate_mock_conditional_event(resource, items[1][Constants.DDB_FIELD_MODIFIED_DATE])
+        handler_modify_response = request_handler.handler(event, None)
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        remove_mock_database(dynamodb)
+
+    def test_handler_modify_resource_with_expected_modified_date_after_unconditional_modify(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource('2019-10-24T12:57:02.655994Z', None,
+                                               self.EXISTING_RESOURCE_IDENTIFIER)
+        handler_modify_response = request_handler.handler(
+            generate_mock_event(Constants.OPERATION_MODIFY, self.generate_mock_resource(
+                None, None, self.EXISTING_RESOURCE_IDENTIFIER)), None)
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        event = generate_mock_conditional_event(resource, '2019-10-24T12:57:02.655994Z')
+        handler_modify_response = request_handler.handler(event, None)
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.CONFLICT,
+                         'HTTP Status code not 409')
+        remove_mock_database(dynamodb)
+
+    def test_handler_modify_resource_with_expected_modified_date_missing_created_date(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER)
+        event = generate_mock_conditional_event(resource, '2019-10-24T12:57:02.655994Z')
+        handler_modify_response = request_handler.handler(event, None)
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_BODY],
+                         'Resource with identifier ebf20333-35a5-4a06-9c58-68ea688a9a8b has no createdDate',
+                         'Did not get expected error message')
+        remove_mock_database(dynamodb)
+
+    def test_handler_get_resource(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource(None, None, None)
+        event = generate_mock_event(Constants.OPERATION_INSERT, resource)
+        handler_insert_response = request_handler.handler(event, None)
+        resource_identifier = json.loads(handler_insert_response[Constants.RESPONSE_BODY]).get('resource_identifier')
+
+        event = generate_mock_get_event(resource_identifier, consistent_read=True)
+        handler_get_response = request_handler.handler(event, None)
+        self.assertEqual(handler_get_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        resource_from_get = json.loads(handler_get_response[Constants.RESPONSE_BODY])
+        expected_resource = encode_resource(resource)
+        self.assertEqual(resource_from_get['resource_identifier'], resource_identifier, 'Unexpected identifier')
+        self.assertEqual(resource_from_get['metadata'], expected_resource['metadata'], 'Unexpected metadata')
+        self.assertEqual(resource_from_get['files'], expected_resource['files'], 'Unexpected files')
+        self.assertEqual(resource_from_get['owner'], expected_resource['owner'], 'Unexpected owner')
+        self.assertEqual(resource_from_get['createdDate'], resource_from_get['modifiedDate'], 'Unexpected dates')
+        remove_mock_database(dynamodb)
+
+    def test_handler_get_resource_with_fields(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        event = generate_mock_get_event(self.EXISTING_RESOURCE_IDENTIFIER, ['metadata.titles', 'owner'])
+        handler_get_response = request_handler.handler(event, None)
+        self.assertEqual(handler_get_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        self.assertEqual(json.loads(handler_get_response[Constants.RESPONSE_BODY]), {
+            'resource_identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+            'modifiedDate': '2019-10-24T12:57:02.655994Z',
+            'metadata': {
+                'titles': {
+                    'no': 'En tittel'
+                }
+            },
+            'owner': 'owner@unit.no'
+        }, 'Unexpected projection')
+        remove_mock_database(dynamodb)
+
+    def test_handler_get_resource_invalid_fields(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        event = generate_mock_get_event(self.EXISTING_RESOURCE_IDENTIFIER, ['metadata..titles'])
+        handler_get_response = request_handler.handler(event, None)
+        self.assertEqual(handler_get_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        event = generate_mock_get_event(self.EXISTING_RESOURCE_IDENTIFIER, 'metadata')
+        handler_get_response = request_handler.handler(event, None)
+        self.assertEqual(handler_get_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        remove_mock_database(dynamodb)
+
+    def test_handler_get_resource_unknown_resource_identifier(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        event = generate_mock_get_event('xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx')
+        handler_get_response = request_handler.handler(event, None)
+        self.assertEqual(handler_get_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.NOT_FOUND,
+                         'HTTP Status code not 404')
+        event = generate_mock_get_event(None)
+        handler_get_response = request_handler.handler(event, None)
+        self.assertEqual(handler_get_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        remove_mock_database(dynamodb)
+
+    def test_handler_get_resource_from_cache(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        event = generate_mock_get_event(self.EXISTING_RESOURCE_IDENTIFIER)
+        first_response = request_handler.handler(event, None)
+        request_handler.get_table_connection().delete_item(Key={
+            'resource_identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+            'modifiedDate': '2019-10-24T12:57:02.655994Z'
+        })
+        second_response = request_handler.handler(event, None)
+        self.assertEqual(second_response, first_response, 'Resource not served from cache')
+        event = generate_mock_get_event(self.EXISTING_RESOURCE_IDENTIFIER, ['metadata.titles'])
+        self.assertEqual(json.loads(request_handler.handler(event, None)[Constants.RESPONSE_BODY])['metadata'],
+                         {'titles': {'no': 'En tittel'}}, 'Projection not applied to cached resource')
+        self.assertEqual(request_handler.cache.statistics()['hits'], 2, 'Cache hits not counted')
+
+        event = generate_mock_get_event(self.EXISTING_RESOURCE_IDENTIFIER, consistent_read=True)
+        self.assertEqual(request_handler.handler(event, None)[Constants.RESPONSE_STATUS_CODE],
+                         http.HTTPStatus.NOT_FOUND, 'Consistent read served from cache')
+        remove_mock_database(dynamodb)
+
+    def test_handler_modify_resource_refreshes_cache(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        for counter in range(2):
+            resource = self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER)
+            event = generate_mock_event(Constants.OPERATION_MODIFY, resource)
+            handler_modify_response = request_handler.handler(event, None)
+            self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                             'HTTP Status code not 200')
+        self.assertEqual(request_handler.cache.statistics()['hits'], 1, 'Second modify not served from cache')
+
+        event = generate_mock_get_event(self.EXISTING_RESOURCE_IDENTIFIER)
+        resource_from_get = json.loads(request_handler.handler(event, None)[Constants.RESPONSE_BODY])
+        self.assertEqual(resource_from_get['metadata'], encode_resource(resource)['metadata'],
+                         'Cache not refreshed by modify')
+        remove_mock_database(dynamodb)
+
+    def test_handler_modify_resource_with_stale_cache(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        request_handler.handler(generate_mock_get_event(self.EXISTING_RESOURCE_IDENTIFIER), None)
+        other_request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER)
+        event = generate_mock_event(Constants.OPERATION_MODIFY, resource)
+        self.assertEqual(other_request_handler.handler(event, None)[Constants.RESPONSE_STATUS_CODE],
+                         http.HTTPStatus.OK, 'HTTP Status code not 200')
+        handler_modify_response = request_handler.handler(event, None)
+        self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'Stale cache entry not refreshed')
+        remove_mock_database(dynamodb)
+
+    def test_handler_list_versions(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        self.insert_versions(request_handler.get_table_connection(), 7)
+
+        versions = []
+        continuation_token = None
+        pages = 0
+        while True:
+            event = generate_mock_list_versions_event(self.EXISTING_RESOURCE_IDENTIFIER, {
+                Constants.JSON_ATTRIBUTE_NAME_PAGE_SIZE: 3,
+                Constants.JSON_ATTRIBUTE_NAME_ORDER: Constants.ORDER_DESCENDING,
+                Constants.JSON_ATTRIBUTE_NAME_MODIFIED_FROM: '2019-10-25T12:57:02.000001Z',
+                Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN: continuation_token
+            })
+            handler_list_response = request_handler.handler(event, None)
+            self.assertEqual(handler_list_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                             'HTTP Status code not 200')
+            page = json.loads(handler_list_response[Constants.RESPONSE_BODY])
+            self.assertLessEqual(len(page[Constants.JSON_ATTRIBUTE_NAME_VERSIONS]), 3, 'Page too large')
+            versions.extend(page[Constants.JSON_ATTRIBUTE_NAME_VERSIONS])
+            pages += 1
+            continuation_token = page.get(Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN)
+            if continuation_token is None:
+                break
+
+        self.assertEqual([version['modifiedDate'] for version in versions],
+                         ['2019-10-25T12:57:02.%06dZ' % counter for counter in range(6, 0, -1)],
+                         'Unexpected versions')
+        self.assertNotIn(Constants.DDB_FIELD_SUPERSEDED_DATE, versions[0], 'Internal attribute returned')
+        self.assertGreaterEqual(pages, 2, 'Versions not paginated')
+        remove_mock_database(dynamodb)
+
+    def test_handler_list_versions_invalid_parameters(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        other_token = encode_continuation_token({'resource_identifier': 'other', 'modifiedDate': 'x'})
+        for parameters in ({Constants.JSON_ATTRIBUTE_NAME_PAGE_SIZE: 0},
+                           {Constants.JSON_ATTRIBUTE_NAME_PAGE_SIZE: '10'},
+                           {Constants.JSON_ATTRIBUTE_NAME_ORDER: 'SIDEWAYS'},
+                           {Constants.JSON_ATTRIBUTE_NAME_MODIFIED_FROM: 2019},
+                           {Constants.JSON_ATTRIBUTE_NAME_MODIFIED_FROM: '2020', Constants.JSON_ATTRIBUTE_NAME_MODIFIED_TO: '2019'},
+                           {Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN: 'not a token'},
+                           {Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN: other_token},
+                           {Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN: encode_continuation_token(
+                               {'resource_identifier': self.EXISTING_RESOURCE_IDENTIFIER, 'modifiedDate': 1})},
+                           {Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN: encode_continuation_token(
+                               {'resource_identifier': self.EXISTING_RESOURCE_IDENTIFIER, 'modifiedDate': 'x',
+                                'owner': 'owner@unit.no'})},
+                           {Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN: encode_continuation_token(
+                               {'resource_identifier': self.EXISTING_RESOURCE_IDENTIFIER})}):
+            event = generate_mock_list_versions_event(self.EXISTING_RESOURCE_IDENTIFIER, parameters)
+            self.assertEqual(request_handler.handler(event, None)[Constants.RESPONSE_STATUS_CODE],
+                             http.HTTPStatus.BAD_REQUEST, 'HTTP Status code not 400 for ' + str(parameters))
+        remove_mock_database(dynamodb)
+
+    def test_iterate_versions(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        self.insert_versions(request_handler.get_table_connection(), 10)
+        versions = request_handler.iterate_versions(self.EXISTING_RESOURCE_IDENTIFIER,
+                                                    modified_to='2019-10-25T12:57:02.000004Z', page_size=2)
+        self.assertEqual([version['modifiedDate'] for version in versions],
+                         ['2019-10-24T12:57:02.655994Z'] +
+                         ['2019-10-25T12:57:02.%06dZ' % counter for counter in range(5)],
+                         'Unexpected versions')
+        remove_mock_database(dynamodb)
+
+    def test_handler_list_by_owner(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource(None, None, None)
+        for counter in range(50):
+            resource.owner = 'other' + str(counter % 10) + '@unit.no'
+            request_handler.handler(generate_mock_event(Constants.OPERATION_INSERT, resource), None)
+
+        resource_identifiers = []
+        for counter in range(3):
+            resource = self.generate_mock_resource(None, None, None)
+            resource.owner = 'me@unit.no'
+            handler_insert_response = request_handler.handler(
+                generate_mock_event(Constants.OPERATION_INSERT, resource), None)
+            resource.resource_identifier = json.loads(handler_insert_response[Constants.RESPONSE_BODY]).get(
+                'resource_identifier')
+            resource_identifiers.append(resource.resource_identifier)
+            resource.status = 'published' if counter == 1 else 'draft'
+            for modification in range(2):
+                handler_modify_response = request_handler.handler(
+                    generate_mock_event(Constants.OPERATION_MODIFY, resource), None)
+                self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                                 'HTTP Status code not 200')
+
+        table_connection = request_handler.get_table_connection()
+        indexed_items = table_connection.scan(FilterExpression=Attr(Constants.DDB_FIELD_LATEST_OWNER).exists())
+        self.assertEqual(indexed_items['Count'], 53, 'Owner index not sparse')
+
+        query = table_connection.query
+        read_counts = []
+
+        def recording_query(**kwargs):
+            ddb_response = query(**kwargs)
+            read_counts.append(ddb_response['Count'])
+            return ddb_response
+
+        table_connection.query = recording_query
+
+        event = generate_mock_list_by_owner_event('me@unit.no')
+        handler_list_response = request_handler.handler(event, None)
+        self.assertEqual(handler_list_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        resources = json.loads(handler_list_response[Constants.RESPONSE_BODY])[Constants.JSON_ATTRIBUTE_NAME_RESOURCES]
+        self.assertEqual(sorted(resource['resource_identifier'] for resource in resources),
+                         sorted(resource_identifiers), 'Unexpected resources')
+        self.assertTrue(all(resource['modifiedDate'] != resource['createdDate'] for resource in resources),
+                        'Resources are not the latest versions')
+        self.assertEqual(read_counts, [3], 'Query cost not proportional to the result set')
+
+        event = generate_mock_list_by_owner_event('me@unit.no', {Constants.JSON_ATTRIBUTE_NAME_STATUS: 'published'})
+        resources = json.loads(request_handler.handler(event, None)[Constants.RESPONSE_BODY])[
+            Constants.JSON_ATTRIBUTE_NAME_RESOURCES]
+        self.assertEqual([resource['resource_identifier'] for resource in resources], resource_identifiers[1:2],
+                         'Status filter not applied')
+
+        listed = []
+        continuation_token = None
+        while True:
+            event = generate_mock_list_by_owner_event('me@unit.no', {
+                Constants.JSON_ATTRIBUTE_NAME_PAGE_SIZE: 2,
+                Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN: continuation_token
+            })
+            page = json.loads(request_handler.handler(event, None)[Constants.RESPONSE_BODY])
+            listed.extend(resource['resource_identifier'] for resource in page[Constants.JSON_ATTRIBUTE_NAME_RESOURCES])
+            continuation_token = page.get(Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN)
+            if continuation_token is None:
+                break
+        self.assertEqual(sorted(listed), sorted(resource_identifiers), 'Unexpected resources')
+        remove_mock_database(dynamodb)
+
+    def test_handler_list_by_owner_missing_owner(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        event = generate_mock_list_by_owner_event(None)
+        self.assertEqual(request_handler.handler(event, None)[Constants.RESPONSE_STATUS_CODE],
+                         http.HTTPStatus.BAD_REQUEST, 'HTTP Status code not 400')
+        for exclusive_start_key in ({'resource_identifier': 'a', 'modifiedDate': 'x'},
+                                    {'resource_identifier': 'a', 'modifiedDate': 'x', 'latestOwner': 'me@unit.no',
+                                     'owner': 'me@unit.no'},
+                                    {'resource_identifier': 'a', 'modifiedDate': ['x'], 'latestOwner': 'me@unit.no'}):
+            event = generate_mock_list_by_owner_event('me@unit.no', {
+                Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN: encode_continuation_token(exclusive_start_key)})
+            self.assertEqual(request_handler.handler(event, None)[Constants.RESPONSE_STATUS_CODE],
+                             http.HTTPStatus.BAD_REQUEST, 'Crafted token accepted: ' + str(exclusive_start_key))
+        remove_mock_database(dynamodb)
+
+    def test_handler_compressed_resource(self):
+        from src.classes.RequestHandler import RequestHandler
+        from src.classes.StorageCodec import StorageCodec
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb, codec=StorageCodec(64))
+        resource = self.generate_mock_resource(None, None, None)
+        event = generate_mock_event(Constants.OPERATION_INSERT, resource)
+        handler_insert_response = request_handler.handler(event, None)
+        resource_identifier = json.loads(handler_insert_response[Constants.RESPONSE_BODY]).get('resource_identifier')
+        resource.resource_identifier = resource_identifier
+        request_handler.handler(generate_mock_event(Constants.OPERATION_MODIFY, resource), None)
+
+        query_results = request_handler.get_table_connection().query(
+            KeyConditionExpression=Key(Constants.DDB_FIELD_RESOURCE_IDENTIFIER).eq(resource_identifier)
+        )
+        for item in query_results[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]:
+            self.assertIsInstance(item[Constants.DDB_FIELD_METADATA], Binary, 'Metadata not compressed')
+            self.assertIsInstance(item[Constants.DDB_FIELD_FILES], Binary, 'Files not compressed')
+
+        other_request_handler = RequestHandler(dynamodb, codec=StorageCodec(64))
+        for fields in (None, ['metadata.titles']):
+            handler_get_response = other_request_handler.handler(
+                generate_mock_get_event(resource_identifier, fields), None)
+            resource_from_get = json.loads(handler_get_response[Constants.RESPONSE_BODY])
+            self.assertEqual(resource_from_get['metadata']['titles'], encode_resource(resource)['metadata']['titles'],
+                             'Metadata not decoded')
+        self.assertNotIn('files', resource_from_get, 'Projection not applied')
+
+        event = generate_mock_list_versions_event(resource_identifier, {})
+        versions = json.loads(other_request_handler.handler(event, None)[Constants.RESPONSE_BODY])[
+            Constants.JSON_ATTRIBUTE_NAME_VERSIONS]
+        self.assertEqual(versions[1]['files'], encode_resource(resource)['files'], 'Files not decoded')
+        remove_mock_database(dynamodb)
+
+    def test_handler_delta_versioning(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb, versioning_mode=Constants.VERSIONING_MODE_DELTA,
+                                         snapshot_interval=3)
+        resource = self.generate_mock_resource(None, None, None)
+        handler_insert_response = request_handler.handler(generate_mock_event(Constants.OPERATION_INSERT, resource),
+                                                          None)
+        resource.resource_identifier = json.loads(handler_insert_response[Constants.RESPONSE_BODY]).get(
+            'resource_identifier')
+        titles = [resource.metadata.titles['no']]
+        for counter in range(6):
+            resource.metadata.titles['no'] = 'En tittel ' + str(counter)
+            if counter == 4:
+                resource.files.pop('FILE_IDENTIFIER_2')
+            titles.append(resource.metadata.titles['no'])
+            handler_modify_response = request_handler.handler(generate_mock_event(Constants.OPERATION_MODIFY, resource),
+                                                              None)
+            self.assertEqual(handler_modify_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                             'HTTP Status code not 200')
+
+        table_connection = request_handler.get_table_connection()
+        items = table_connection.query(
+            KeyConditionExpression=Key(Constants.DDB_FIELD_RESOURCE_IDENTIFIER).eq(resource.resource_identifier)
+        )[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]
+        self.assertEqual([Constants.DDB_FIELD_DELTA in item for item in items],
+                         [False, True, True, False, True, True, False], 'Snapshots not written every 3 versions')
+        self.assertNotIn(Constants.DDB_FIELD_METADATA, items[1], 'Delta stores a full copy')
+        self.assertEqual(items[1][Constants.DDB_FIELD_DELTA][Constants.DDB_FIELD_METADATA][Constants.DELTA_SET],
+                         {'titles': {'no': titles[1], 'en': resource.metadata.titles['en']}}, 'Unexpected delta')
+
+        other_request_handler = RequestHandler(dynamodb, versioning_mode=Constants.VERSIONING_MODE_DELTA,
+                                               snapshot_interval=3)
+        other_table_connection = other_request_handler.get_table_connection()
+        query = other_table_connection.query
+        read_counts = []
+
+        def recording_query(**kwargs):
+            ddb_response = query(**kwargs)
+            read_counts.append(ddb_response['Count'])
+            return ddb_response
+
+        other_table_connection.query = recording_query
+        other_request_handler.handler(generate_mock_event(Constants.OPERATION_MODIFY, resource), None)
+        self.assertLessEqual(sum(read_counts), 3, 'Reconstruction read more than snapshot interval items')
+        titles.append(resource.metadata.titles['no'])
+
+        event = generate_mock_get_event(resource.resource_identifier)
+        resource_from_get = json.loads(other_request_handler.handler(event, None)[Constants.RESPONSE_BODY])
+        self.assertEqual(resource_from_get['metadata'], encode_resource(resource)['metadata'],
+                         'Latest version not reconstructed')
+        self.assertEqual(resource_from_get['files'], encode_resource(resource)['files'],
+                         'Latest version not reconstructed')
+
+        versions = []
+        continuation_token = None
+        while True:
+            event = generate_mock_list_versions_event(resource.resource_identifier, {
+                Constants.JSON_ATTRIBUTE_NAME_PAGE_SIZE: 2,
+                Constants.JSON_ATTRIBUTE_NAME_ORDER: Constants.ORDER_DESCENDING,
+                Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN: continuation_token
+            })
+            page = json.loads(RequestHandler(dynamodb).handler(event, None)[Constants.RESPONSE_BODY])
+            versions.extend(page[Constants.JSON_ATTRIBUTE_NAME_VERSIONS])
+            continuation_token = page.get(Constants.JSON_ATTRIBUTE_NAME_CONTINUATION_TOKEN)
+            if continuation_token is None:
+                break
+        self.assertEqual([version['metadata']['titles']['no'] for version in versions], titles[::-1],
+                         'Versions not reconstructed')
+        self.assertEqual([len(version['files']) for version in versions], [1, 1, 1, 2, 2, 2, 2, 2],
+                         'Files not reconstructed')
+
+        resource.created_date = versions[0]['createdDate']
+        event = generate_mock_conditional_event(resource, versions[1]['modifiedDate'])
+        self.assertEqual(other_request_handler.handler(event, None)[Constants.RESPONSE_STATUS_CODE],
+                         http.HTTPStatus.CONFLICT, 'HTTP Status code not 409')
+        event = generate_mock_conditional_event(resource, versions[0]['modifiedDate'])
+        self.assertEqual(RequestHandler(dynamodb, versioning_mode=Constants.VERSIONING_MODE_DELTA).handler(
+            event, None)[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK, 'HTTP Status code not 200')
+        self.assertEqual(other_request_handler.read_version(resource.resource_identifier)[Constants.DDB_FIELD_FILES],
+                         encode_resource(resource)['files'], 'Conditional modification not stored as delta')
+
+        resource.metadata.titles['no'] = 'En batch tittel'
+        resource.created_date = None
+        event = generate_mock_batch_event(Constants.OPERATION_BATCH_MODIFY, [encode_resource(resource)])
+        results = json.loads(other_request_handler.handler(event, None)[Constants.RESPONSE_BODY])[
+            Constants.JSON_ATTRIBUTE_NAME_RESULTS]
+        self.assertEqual(results[0][Constants.JSON_ATTRIBUTE_NAME_STATUS_CODE], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        latest_version = RequestHandler(dynamodb).get_latest_version(resource.resource_identifier)
+        self.assertEqual(latest_version[Constants.DDB_FIELD_METADATA]['titles']['no'], 'En batch tittel',
+                         'Batch modification not reconstructed')
+        self.assertEqual(latest_version[Constants.DDB_FIELD_VERSION_NUMBER], 9, 'Unexpected version number')
+        remove_mock_database(dynamodb)
+
+    def test_handler_batch_insert_resources(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource(None, None, None)
+        resources = [encode_resource(resource) for counter in range(30)]
+        resources[3].pop('owner')
+        event = generate_mock_batch_event(Constants.OPERATION_BATCH_INSERT, resources)
+        handler_batch_response = request_handler.handler(event, None)
+        self.assertEqual(handler_batch_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        results = json.loads(handler_batch_response[Constants.RESPONSE_BODY])[Constants.JSON_ATTRIBUTE_NAME_RESULTS]
+        self.assertEqual(len(results), 30, 'Unexpected number of results')
+        self.assertEqual([result[Constants.JSON_ATTRIBUTE_NAME_INDEX] for result in results], list(range(30)),
+                         'Results not in request order')
+        self.assertEqual(results[3][Constants.JSON_ATTRIBUTE_NAME_STATUS_CODE], http.HTTPStatus.BAD_REQUEST,
+                         'Invalid resource not rejected')
+        self.assertEqual(results[3][Constants.JSON_ATTRIBUTE_NAME_ERROR], 'Resource has no owner',
+                         'Did not get expected error message')
+        for result in results[:3] + results[4:]:
+            self.assertEqual(result[Constants.JSON_ATTRIBUTE_NAME_STATUS_CODE], http.HTTPStatus.CREATED,
+                             'HTTP Status code not 201')
+            self.assertIsNotNone(request_handler.get_latest_version(result['resource_identifier']),
+                                 'Value not persisted as expected')
+        remove_mock_database(dynamodb)
+
+    def test_handler_batch_modify_resources(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        resources = [encode_resource(self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER)),
+                     encode_resource(self.generate_mock_resource(None, None, 'xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx')),
+                     encode_resource(self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER))]
+        event = generate_mock_batch_event(Constants.OPERATION_BATCH_MODIFY, resources)
+        handler_batch_response = request_handler.handler(event, None)
+        self.assertEqual(handler_batch_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        results = json.loads(handler_batch_response[Constants.RESPONSE_BODY])[Constants.JSON_ATTRIBUTE_NAME_RESULTS]
+        self.assertEqual([result[Constants.JSON_ATTRIBUTE_NAME_STATUS_CODE] for result in results],
+                         [http.HTTPStatus.OK, http.HTTPStatus.BAD_REQUEST, http.HTTPStatus.BAD_REQUEST],
+                         'Unexpected status codes')
+        self.assertEqual(results[1][Constants.JSON_ATTRIBUTE_NAME_ERROR],
+                         'Resource with identifier xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx not found',
+                         'Did not get expected error message')
+
+        query_results = request_handler.get_table_connection().query(
+            KeyConditionExpression=Key(Constants.DDB_FIELD_RESOURCE_IDENTIFIER).eq(self.EXISTING_RESOURCE_IDENTIFIER)
+        )
+        self.assertEqual(len(query_results[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]), 2,
+                         'Value not persisted as expected')
+        self.assertEqual(query_results[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS][1][Constants.DDB_FIELD_METADATA],
+                         resources[0][Constants.DDB_FIELD_METADATA], 'Value not persisted as expected')
+        self.assertIn(Constants.DDB_FIELD_SUPERSEDED_DATE, query_results[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS][0],
+                      'Previous version not marked as superseded')
+        remove_mock_database(dynamodb)
+
+    def test_handler_batch_modify_coalesces_last_writer_wins(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb, coalesce_mode=Constants.COALESCE_MODE_LAST)
+        resources = []
+        for title in ('Første', 'Andre', 'Tredje'):
+            resource = encode_resource(self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER))
+            resource[Constants.DDB_FIELD_METADATA]['titles'] = {'no': title}
+            resources.append(resource)
+        resources.insert(1, {'resource_identifier': self.EXISTING_RESOURCE_IDENTIFIER})
+        event = generate_mock_batch_event(Constants.OPERATION_BATCH_MODIFY, resources)
+        handler_batch_response = request_handler.handler(event, None)
+        results = json.loads(handler_batch_response[Constants.RESPONSE_BODY])[Constants.JSON_ATTRIBUTE_NAME_RESULTS]
+        self.assertEqual([result[Constants.JSON_ATTRIBUTE_NAME_STATUS_CODE] for result in results],
+                         [http.HTTPStatus.OK, http.HTTPStatus.BAD_REQUEST, http.HTTPStatus.OK, http.HTTPStatus.OK],
+                         'Unexpected status codes')
+        self.assertEqual([result.get(Constants.JSON_ATTRIBUTE_NAME_COALESCED) for result in results],
+                         [True, None, True, True], 'Coalesced modifications not acknowledged')
+
+        items = request_handler.get_table_connection().query(
+            KeyConditionExpression=Key(Constants.DDB_FIELD_RESOURCE_IDENTIFIER).eq(self.EXISTING_RESOURCE_IDENTIFIER)
+        )[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]
+        self.assertEqual(len(items), 2, 'Modifications not written as one version')
+        self.assertEqual(items[1][Constants.DDB_FIELD_METADATA]['titles'], {'no': 'Tredje'}, 'Last writer did not win')
+        remove_mock_database(dynamodb)
+
+    def test_handler_batch_modify_coalesces_by_merging(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb, coalesce_mode=Constants.COALESCE_MODE_MERGE)
+        first = encode_resource(self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER))
+        first[Constants.DDB_FIELD_METADATA]['titles'] = {'no': 'En tittel'}
+        first[Constants.DDB_FIELD_FILES] = {'file-1': {'filename': 'a.pdf'}}
+        second = encode_resource(self.generate_mock_resource(None, None, self.EXISTING_RESOURCE_IDENTIFIER))
+        second[Constants.DDB_FIELD_METADATA] = {'titles': {'en': 'A title'}}
+        second[Constants.DDB_FIELD_FILES] = {'file-2': {'filename': 'b.pdf'}}
+        event = generate_mock_batch_event(Constants.OPERATION_BATCH_MODIFY, [first, second])
+        handler_batch_response = request_handler.handler(event, None)
+        results = json.loads(handler_batch_response[Constants.RESPONSE_BODY])[Constants.JSON_ATTRIBUTE_NAME_RESULTS]
+        self.assertEqual([result[Constants.JSON_ATTRIBUTE_NAME_STATUS_CODE] for result in results],
+                         [http.HTTPStatus.OK, http.HTTPStatus.OK], 'Unexpected status codes')
+
+        latest = request_handler.get_latest_version(self.EXISTING_RESOURCE_IDENTIFIER)
+        self.assertEqual(latest[Constants.DDB_FIELD_METADATA]['titles'], {'no': 'En tittel', 'en': 'A title'},
+                         'Metadata not merged')
+        self.assertEqual(sorted(latest[Constants.DDB_FIELD_FILES]), ['file-1', 'file-2'], 'Files not merged')
+        self.assertEqual(latest[Constants.DDB_FIELD_METADATA]['handle'], first[Constants.DDB_FIELD_METADATA]['handle'],
+                         'Earlier attribute lost')
+        remove_mock_database(dynamodb)
+
+    def test_merge_resources(self):
+        from src.common.coalesce import merge_resources
+        merged = merge_resources([{'owner': 'a', 'metadata': {'titles': {'no': 'Tittel'}, 'handle': 'h'}},
+                                  {'metadata': {'titles': {'en': 'Title'}, 'handle': None}},
+                                  {'owner': 'b', 'files': {}}])
+        self.assertEqual(merged, {'owner': 'b', 'files': {},
+                                  'metadata': {'titles': {'no': 'Tittel', 'en': 'Title'}, 'handle': None}},
+                         'Unexpected merge')
+
+    def test_handler_batch_missing_resources_in_event_body(self):
+        from src.classes.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database()
+        request_handler = RequestHandler(dynamodb)
+        event = generate_mock_batch_event(Constants.OPERATION_BATCH_INSERT, [])
+        handler_batch_response = request_handler.handler(event, None)
+        self.assertEqual(handler_batch_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        remove_mock_database(dynamodb)
+
+    def test_batch_write_retries_unprocessed_items(self):
+        from src.common.batch import batch_write
+
+        class ThrottlingDynamoDB:
+            def __init__(self):
+                self.calls = []
+
+            def batch_write_item(self, RequestItems):
+                requests = RequestItems['testing']
+                self.calls.append(len(requests))
+                if len(self.calls) in (1, 3):
+                    return {Constants.DDB_RESPONSE_ATTRIBUTE_NAME_UNPROCESSED_ITEMS: {'testing': requests[1:]}}
+                return {Constants.DDB_RESPONSE_ATTRIBUTE_NAME_UNPROCESSED_ITEMS: {}}
+
+        dynamodb = ThrottlingDynamoDB()
+        delays = []
+        requests = [{'PutRequest': {'Item': {'resource_identifier': str(counter)}}} for counter in range(30)]
+        unprocessed = batch_write(dynamodb, 'testing', requests, sleep=delays.append)
+        self.assertEqual(unprocessed, [], 'Unprocessed items not retried')
+        self.assertEqual(dynamodb.calls, [25, 24, 5, 4], 'Unexpected batch sizes')
+        self.assertEqual(len(delays), 2, 'Unexpected number of retries')
+
+        dynamodb.calls = [1, 2]
+        unprocessed = batch_write(dynamodb, 'testing', requests[:3], max_attempts=1, sleep=delays.append)
+        self.assertEqual(unprocessed, requests[1:3], 'Unprocessed items not returned')
+
+    def test_decoders(self):
+        resource = self.generate_mock_resource('2019-10-24T12:57:02.655994Z', '2019-10-25T12:57:02.655994Z',
+                                               self.EXISTING_RESOURCE_IDENTIFIER)
+        encoded_resource = encode_resource(resource)
+        self.assertEqual(encode_resource(decode_resource(encoded_resource)), encoded_resource, 'Unexpected resource')
+        stored_item = dict(encoded_resource)
+        stored_item[Constants.DDB_FIELD_SUPERSEDED_DATE] = '2019-10-26T12:57:02.655994Z'
+        self.assertEqual(encode_resource(decode_resource(stored_item)), encoded_resource,
+                         'Bookkeeping attributes not dropped')
+        self.assertIsNone(decode_resource(None), 'Missing resource decoded')
+        self.assertRaises(TypeError, decode_resource, '')
+
+    def test_utc_timestamp(self):
+        self.assertEqual(utc_timestamp(datetime(2019, 10, 24, 12, 57, 2, 655994, timezone.utc)),
+                         '2019-10-24T12:57:02.655994Z', 'Unexpected timestamp')
+        self.assertEqual(utc_timestamp(datetime(2019, 10, 24, 12, 57, 2, 0, timezone.utc)),
+                         '2019-10-24T12:57:02.000000Z', 'Microseconds not kept')
+        self.assertRegex(utc_timestamp(), r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{6}Z$', 'Unexpected timestamp')
+
     def test_encoders(self):
         self.assertRaises(TypeError, encode_file_metadata, '')
         self.assertRaises(TypeError, encode_files, '')
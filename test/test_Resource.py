@@ -0,0 +1,95 @@
+import unittest
+
+from common.constants import Constants
+from common.encoders import encode_resource
+from common.exceptions import ValidationError
+from common.validator import validate_resource
+from data.creator import Creator
+from data.file_metadata import FileMetadata
+from data.metadata import Metadata
+from data.resource import Resource
+
+RESOURCE = {
+    'resource_identifier': 'ebf20333',
+    'modifiedDate': '2019-10-24T12:57:02.655994Z',
+    'created_date': '2019-10-24T12:57:02.655994Z',
+    'metadata': {
+        'creators': ['AUTHORITY_IDENTIFIER_1'],
+        'license': 'LICENSE_IDENTIFIER_1',
+        'publicationYear': '2019',
+        'titles': {'no': 'En tittel', 'en': None},
+        'type': 'text'
+    },
+    'files': {
+        'FILE_IDENTIFIER_1': {'filename': 'fil.pdf', 'mimetype': 'application/pdf', 'checksum': 'abc', 'size': '123'}
+    },
+    'owner': 'owner@unit.no',
+    'status': 'draft'
+}
+
+
+class TestResourceCase(unittest.TestCase):
+
+    def test_nested_decoding(self):
+        resource = Resource.from_dict(RESOURCE)
+        self.assertEqual(resource.modified_date, RESOURCE['modifiedDate'], 'camelCase date not decoded')
+        self.assertEqual(resource.created_date, RESOURCE['created_date'], 'snake_case date not decoded')
+        self.assertIsInstance(resource.metadata, Metadata, 'Metadata not decoded')
+        self.assertEqual(resource.metadata.license_identifier, 'LICENSE_IDENTIFIER_1', 'Unexpected license')
+        self.assertEqual(resource.metadata.publication_year, '2019', 'Unexpected publication year')
+        self.assertIsNone(resource.metadata.handle, 'Missing attribute not None')
+        self.assertIsInstance(resource.metadata.creators[0], Creator, 'Creator not decoded')
+        self.assertEqual(resource.metadata.titles, RESOURCE['metadata']['titles'], 'Unexpected titles')
+        file_metadata = resource.files['FILE_IDENTIFIER_1']
+        self.assertIsInstance(file_metadata, FileMetadata, 'File metadata not decoded')
+        self.assertEqual(file_metadata.mime_type, 'application/pdf', 'Unexpected mime type')
+        validate_resource(Constants.OPERATION_MODIFY, resource)
+        encoded = encode_resource(resource)
+        self.assertEqual(encoded['files'], RESOURCE['files'], 'Files not encoded back')
+        self.assertEqual(encoded['metadata']['titles'], {'no': 'En tittel'}, 'Titles not encoded back')
+
+    def test_slots(self):
+        resource = Resource.from_dict(RESOURCE)
+        for instance in (resource, resource.metadata, resource.metadata.creators[0],
+                         resource.files['FILE_IDENTIFIER_1']):
+            self.assertFalse(hasattr(instance, '__dict__'), instance.__class__.__name__ + ' has a __dict__')
+        with self.assertRaises(AttributeError):
+            resource.colour = 'blue'
+
+    def test_strict_mode(self):
+        with self.assertRaises(TypeError):
+            Resource.from_dict(dict(RESOURCE, colour='blue'))
+        with self.assertRaises(TypeError):
+            Resource.from_dict(None)
+        resource = Resource.from_dict(dict(RESOURCE, metadata=dict(RESOURCE['metadata'], colour='blue'),
+                                           files={'FILE_IDENTIFIER_1': {'filename': 1, 'colour': 'blue'}}))
+        with self.assertRaises(ValidationError) as context:
+            validate_resource(Constants.OPERATION_MODIFY, resource)
+        self.assertEqual(context.exception.errors, [
+            'Resource with identifier ebf20333 has unknown attribute metadata.colour',
+            'Resource with identifier ebf20333 has invalid attribute type for files.FILE_IDENTIFIER_1.filename',
+            'Resource with identifier ebf20333 has unknown attribute files.FILE_IDENTIFIER_1.colour'
+        ], 'Unexpected errors')
+
+    def test_lenient_mode(self):
+        resource = Resource.from_dict(dict(RESOURCE, colour='blue', metadata=dict(RESOURCE['metadata'], colour='blue')),
+                                      Constants.DECODE_MODE_LENIENT)
+        self.assertIsInstance(resource.metadata, Metadata, 'Metadata with unknown attribute not decoded')
+        validate_resource(Constants.OPERATION_MODIFY, resource)
+        with self.assertRaises(ValueError):
+            Resource.from_dict(RESOURCE, 'sloppy')
+
+    def test_wrong_types_are_kept_for_validation(self):
+        resource = Resource.from_dict(dict(RESOURCE, metadata=dict(RESOURCE['metadata'], creators=['A', 2]),
+                                           files='fil.pdf'))
+        self.assertEqual(resource.metadata.creators[1], 2, 'Invalid creator changed')
+        with self.assertRaises(ValidationError) as context:
+            validate_resource(Constants.OPERATION_MODIFY, resource)
+        self.assertEqual(context.exception.errors, [
+            'Resource with identifier ebf20333 has invalid attribute type for metadata.creators[1]',
+            'Resource with identifier ebf20333 has invalid attribute type for files'
+        ], 'Unexpected errors')
+
+
+if __name__ == '__main__':
+    unittest.main()
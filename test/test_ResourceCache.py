@@ -0,0 +1,67 @@
+import unittest
+
+from classes.ResourceCache import ResourceCache
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResourceCacheCase(unittest.TestCase):
+
+    def test_cache_hit_and_miss(self):
+        cache = ResourceCache(2, 10.0, Clock())
+        self.assertIsNone(cache.get('a'), 'Unexpected cache entry')
+        cache.put('a', {'resource_identifier': 'a'})
+        self.assertEqual(cache.get('a'), {'resource_identifier': 'a'}, 'Cache entry not returned')
+        self.assertEqual(cache.statistics(), {'size': 1, 'hits': 1, 'misses': 1, 'evictions': 0},
+                         'Unexpected statistics')
+
+    def test_cache_returns_copies(self):
+        cache = ResourceCache(2, 10.0, Clock())
+        cache.put('a', {'resource_identifier': 'a'})
+        cache.get('a')['supersededDate'] = 'now'
+        self.assertEqual(cache.get('a'), {'resource_identifier': 'a'}, 'Cache entry modified by caller')
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = ResourceCache(2, 10.0, Clock())
+        cache.put('a', {})
+        cache.put('b', {})
+        cache.get('a')
+        cache.put('c', {})
+        self.assertIsNotNone(cache.get('a'), 'Recently used entry evicted')
+        self.assertIsNone(cache.get('b'), 'Least recently used entry not evicted')
+        self.assertEqual(cache.statistics()['evictions'], 1, 'Eviction not counted')
+
+    def test_cache_entries_expire(self):
+        clock = Clock()
+        cache = ResourceCache(2, 10.0, clock)
+        cache.put('a', {})
+        clock.now = 9.9
+        self.assertIsNotNone(cache.get('a'), 'Entry expired too early')
+        clock.now = 10.0
+        self.assertIsNone(cache.get('a'), 'Entry not expired')
+        self.assertEqual(cache.statistics()['size'], 0, 'Expired entry not removed')
+
+    def test_cache_invalidate(self):
+        cache = ResourceCache(2, 10.0, Clock())
+        cache.put('a', {})
+        cache.invalidate('a')
+        cache.invalidate('b')
+        self.assertIsNone(cache.get('a'), 'Entry not invalidated')
+
+    def test_disabled_cache(self):
+        cache = ResourceCache(0, 10.0, Clock())
+        cache.put('a', {})
+        self.assertIsNone(cache.get('a'), 'Disabled cache returned entry')
+        self.assertEqual(cache.statistics(), {'size': 0, 'hits': 0, 'misses': 0, 'evictions': 0},
+                         'Unexpected statistics')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,308 @@
+import http
+import json
+import time
+import unittest
+from decimal import Decimal
+
+from classes.IdempotencyStore import IdempotencyWrite
+from classes.MemoryStorage import MemoryStorage
+from classes.SqliteStorage import SqliteStorage
+from common.constants import Constants
+from common.exceptions import ConcurrentModificationError, DuplicateRequestError
+
+RESOURCE_IDENTIFIER = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+OTHER_RESOURCE_IDENTIFIER = 'acf20333-35a5-4a06-9c58-68ea688a9a9c'
+OWNER = 'owner@unit.no'
+
+
+def version(resource_identifier, modified_date, created_date='2019-10-24T12:57:02.655994Z', owner=OWNER,
+            status=None):
+    item = {
+        Constants.DDB_FIELD_RESOURCE_IDENTIFIER: resource_identifier,
+        Constants.DDB_FIELD_MODIFIED_DATE: modified_date,
+        Constants.DDB_FIELD_CREATED_DATE: created_date,
+        Constants.DDB_FIELD_METADATA: {'titles': {'no': 'Tittel ' + modified_date}, 'count': 1},
+        Constants.DDB_FIELD_OWNER: owner,
+        Constants.DDB_FIELD_LATEST_OWNER: owner
+    }
+    if status is not None:
+        item[Constants.DDB_FIELD_STATUS] = status
+    return item
+
+
+def idempotency_write(idempotency_key, now, expires_at):
+    return IdempotencyWrite('idempotency', {
+        Constants.DDB_FIELD_IDEMPOTENCY_KEY: idempotency_key,
+        Constants.DDB_FIELD_EXPIRES_AT: expires_at
+    }, now)
+
+
+def modified_dates(items):
+    return [item[Constants.DDB_FIELD_MODIFIED_DATE] for item in items]
+
+
+class StorageBehaviour:
+    """Checks an engine against the behaviour of the DynamoDB table, for every engine but DynamoDBStorage."""
+
+    def create_storage(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.storage = self.create_storage()
+
+    def put_chain(self, resource_identifier, count):
+        dates = ['2019-10-%02dT00:00:00.000000Z' % day for day in range(1, count + 1)]
+        self.storage.put(version(resource_identifier, dates[0], dates[0]))
+        for expected_date, modified_date in zip(dates, dates[1:]):
+            self.storage.modify(version(resource_identifier, modified_date, dates[0]), expected_date)
+        return dates
+
+    def test_put_returns_dynamodb_types(self):
+        self.storage.put(version(RESOURCE_IDENTIFIER, '2019-10-01'))
+        items, last_key = self.storage.query(RESOURCE_IDENTIFIER)
+        self.assertEqual(len(items), 1, 'Version not stored')
+        self.assertIsNone(last_key, 'Unexpected last key')
+        self.assertIsInstance(items[0][Constants.DDB_FIELD_METADATA]['count'], Decimal, 'Number not a Decimal')
+        items[0][Constants.DDB_FIELD_METADATA]['count'] = 2
+        self.assertEqual(self.storage.query(RESOURCE_IDENTIFIER)[0][0][Constants.DDB_FIELD_METADATA]['count'], 1,
+                         'Stored version changed through a read')
+
+    def test_modify_supersedes_expected_version(self):
+        dates = self.put_chain(RESOURCE_IDENTIFIER, 3)
+        items, _ = self.storage.query(RESOURCE_IDENTIFIER)
+        self.assertEqual(modified_dates(items), dates, 'Unexpected versions')
+        self.assertEqual([item.get(Constants.DDB_FIELD_SUPERSEDED_DATE) for item in items], dates[1:] + [None],
+                         'Versions not superseded')
+        self.assertEqual([Constants.DDB_FIELD_LATEST_OWNER in item for item in items], [False, False, True],
+                         'latestOwner not moved to the latest version')
+
+    def test_modify_conflicts(self):
+        dates = self.put_chain(RESOURCE_IDENTIFIER, 2)
+        with self.assertRaises(ConcurrentModificationError):
+            self.storage.modify(version(RESOURCE_IDENTIFIER, '2019-10-05T00:00:00.000000Z', dates[0]), dates[0])
+        with self.assertRaises(ConcurrentModificationError):
+            self.storage.modify(version(RESOURCE_IDENTIFIER, '2019-10-05T00:00:00.000000Z', 'other'), dates[1])
+        with self.assertRaises(ConcurrentModificationError):
+            self.storage.modify(version(OTHER_RESOURCE_IDENTIFIER, '2019-10-05T00:00:00.000000Z', dates[0]),
+                                dates[1])
+        self.assertEqual(modified_dates(self.storage.query(RESOURCE_IDENTIFIER)[0]), dates,
+                         'Conflicting modification written')
+
+    def test_idempotency_records(self):
+        self.storage.put(version(RESOURCE_IDENTIFIER, '2019-10-01', '2019-10-01'), idempotency_write('key-1', 100, 200))
+        with self.assertRaises(DuplicateRequestError):
+            self.storage.put(version(OTHER_RESOURCE_IDENTIFIER, '2019-10-01'), idempotency_write('key-1', 150, 250))
+        self.assertEqual(self.storage.query(OTHER_RESOURCE_IDENTIFIER)[0], [], 'Duplicate request written')
+        with self.assertRaises(DuplicateRequestError):
+            self.storage.modify(version(RESOURCE_IDENTIFIER, '2019-10-02', '2019-10-01'), '2019-10-01',
+                                idempotency_write('key-1', 150, 250))
+        self.assertEqual(len(self.storage.query(RESOURCE_IDENTIFIER)[0]), 1, 'Duplicate modification written')
+        self.assertEqual(self.storage.get_record('idempotency', 'key-1')[Constants.DDB_FIELD_EXPIRES_AT], 200,
+                         'Record not stored')
+        self.storage.put(version(OTHER_RESOURCE_IDENTIFIER, '2019-10-01'), idempotency_write('key-1', 200, 300))
+        self.assertEqual(self.storage.get_record('idempotency', 'key-1')[Constants.DDB_FIELD_EXPIRES_AT], 300,
+                         'Expired record not replaced')
+        self.assertIsNone(self.storage.get_record('idempotency', 'key-2'), 'Unexpected record')
+
+    def test_query_pages_and_ranges(self):
+        dates = self.put_chain(RESOURCE_IDENTIFIER, 5)
+        self.put_chain(OTHER_RESOURCE_IDENTIFIER, 2)
+        for ascending in (True, False):
+            expected = dates if ascending else dates[::-1]
+            pages = []
+            last_key = None
+            while True:
+                items, last_key = self.storage.query(RESOURCE_IDENTIFIER, ascending=ascending, limit=2,
+                                                     exclusive_start_key=last_key)
+                pages.append(modified_dates(items))
+                if last_key is None:
+                    break
+            self.assertEqual(pages, [expected[0:2], expected[2:4], expected[4:]], 'Unexpected pages')
+        items, last_key = self.storage.query(RESOURCE_IDENTIFIER, limit=5)
+        self.assertIsNone(last_key, 'Last key returned for a complete page')
+        items, _ = self.storage.query(RESOURCE_IDENTIFIER, modified_from=dates[1], modified_to=dates[3])
+        self.assertEqual(modified_dates(items), dates[1:4], 'Range not inclusive')
+        items, _ = self.storage.query(RESOURCE_IDENTIFIER, ascending=False, limit=1,
+                                      attributes=[Constants.DDB_FIELD_MODIFIED_DATE, 'metadata.titles'])
+        self.assertEqual(items, [{Constants.DDB_FIELD_MODIFIED_DATE: dates[-1],
+                                  Constants.DDB_FIELD_METADATA: {'titles': {'no': 'Tittel ' + dates[-1]}}}],
+                         'Attributes not projected')
+        self.assertEqual(self.storage.query('unknown'), ([], None), 'Unexpected versions of unknown resource')
+
+    def test_query_owner(self):
+        self.storage.write_items([
+            version('resource-%d' % index, '2019-10-%02d' % (index % 3 + 1),
+                    status='PUBLISHED' if index % 2 else 'NEW') for index in range(5)
+        ] + [version('resource-other', '2019-10-01', owner='other@unit.no')])
+        self.put_chain(RESOURCE_IDENTIFIER, 2)
+        keys = []
+        last_key = None
+        while True:
+            items, last_key = self.storage.query_owner(OWNER, limit=2, exclusive_start_key=last_key)
+            keys.extend((item[Constants.DDB_FIELD_MODIFIED_DATE], item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER])
+                        for item in items)
+            if last_key is None:
+                break
+        self.assertEqual(keys, sorted(keys, reverse=True), 'Owner versions not newest first')
+        self.assertEqual(sorted(key[1] for key in keys), sorted(['resource-%d' % index for index in range(5)] +
+                                                                [RESOURCE_IDENTIFIER]),
+                         'Not every latest version found')
+        items, last_key = self.storage.query_owner(OWNER, 'PUBLISHED', limit=3)
+        self.assertIsNotNone(last_key, 'Filter not applied after limit')
+        self.assertTrue(all(item[Constants.DDB_FIELD_STATUS] == 'PUBLISHED' for item in items), 'Status not filtered')
+
+    def test_scan_segments_and_pages(self):
+        self.storage.write_items([version('resource-%d' % index, '2019-10-01') for index in range(6)])
+        dates = self.put_chain(RESOURCE_IDENTIFIER, 3)
+        keys = []
+        for segment in range(3):
+            last_key = None
+            while True:
+                items, last_key = self.storage.scan(segment, 3, limit=2, exclusive_start_key=last_key)
+                keys.extend((item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER], item[Constants.DDB_FIELD_MODIFIED_DATE])
+                            for item in items)
+                if last_key is None:
+                    break
+        self.assertEqual(sorted(keys), sorted([('resource-%d' % index, '2019-10-01') for index in range(6)] +
+                                              [(RESOURCE_IDENTIFIER, modified_date) for modified_date in dates]),
+                         'Not every version scanned once')
+        versions = [key for key in keys if key[0] == RESOURCE_IDENTIFIER]
+        self.assertEqual(keys[keys.index(versions[0]):keys.index(versions[0]) + 3], versions,
+                         'Versions of a resource not next to each other')
+        items, last_key = self.storage.scan()
+        self.assertEqual((len(items), last_key), (9, None), 'Unsegmented scan not complete')
+
+    def test_write_items_replaces_versions(self):
+        self.assertEqual(self.storage.write_items([version(RESOURCE_IDENTIFIER, '2019-10-01', owner='a@unit.no')]),
+                         [], 'Unprocessed items')
+        self.storage.write_items([version(RESOURCE_IDENTIFIER, '2019-10-01', owner='b@unit.no')])
+        self.assertEqual(self.storage.query_owner('a@unit.no'), ([], None), 'Replaced version still owned')
+        self.assertEqual(len(self.storage.query_owner('b@unit.no')[0]), 1, 'Replacing version not owned')
+
+
+class TestMemoryStorageCase(StorageBehaviour, unittest.TestCase):
+
+    def create_storage(self):
+        return MemoryStorage()
+
+
+class TestSqliteStorageCase(StorageBehaviour, unittest.TestCase):
+
+    def create_storage(self):
+        storage = SqliteStorage()
+        self.addCleanup(storage.close)
+        return storage
+
+
+class TestRequestHandlerStorageCase(unittest.TestCase):
+
+    def request_handler(self, storage):
+        from classes.RequestHandler import RequestHandler
+        request_handler = RequestHandler(storage=storage)
+        request_handler.idempotency.table_name = 'idempotency'
+        return request_handler
+
+    def handle(self, request_handler, operation, **body):
+        body[Constants.JSON_ATTRIBUTE_NAME_OPERATION] = operation
+        handler_response = request_handler.handler({'body': json.dumps(body)}, None)
+        return handler_response[Constants.RESPONSE_STATUS_CODE], handler_response[Constants.RESPONSE_BODY]
+
+    def test_handler_on_local_engines(self):
+        for storage in (MemoryStorage(), SqliteStorage()):
+            request_handler = self.request_handler(storage)
+            resource = {'owner': OWNER, 'files': {}, 'metadata': {'titles': {'no': 'Første'}}}
+            status_code, body = self.handle(request_handler, Constants.OPERATION_INSERT, resource=resource,
+                                            idempotencyKey='insert-1')
+            self.assertEqual(status_code, http.HTTPStatus.CREATED, 'Resource not inserted')
+            resource_identifier = json.loads(body)['resource_identifier']
+            self.assertEqual(self.handle(request_handler, Constants.OPERATION_INSERT, resource=resource,
+                                         idempotencyKey='insert-1'), (status_code, body), 'Request not replayed')
+
+            resource['resource_identifier'] = resource_identifier
+            resource['metadata'] = {'titles': {'no': 'Andre'}}
+            status_code, _ = self.handle(request_handler, Constants.OPERATION_MODIFY, resource=resource)
+            self.assertEqual(status_code, http.HTTPStatus.OK, 'Resource not modified')
+            status_code, body = self.handle(request_handler, Constants.OPERATION_GET,
+                                            resource={'resource_identifier': resource_identifier})
+            self.assertEqual(json.loads(body)['metadata']['titles']['no'], 'Andre', 'Latest version not read')
+            status_code, body = self.handle(request_handler, Constants.OPERATION_LIST_VERSIONS,
+                                            resource={'resource_identifier': resource_identifier})
+            self.assertEqual(status_code, http.HTTPStatus.OK, 'Versions not listed')
+            self.assertEqual(len(json.loads(body)[Constants.JSON_ATTRIBUTE_NAME_VERSIONS]), 2, 'Unexpected versions')
+
+            status_code, body = self.handle(request_handler, Constants.OPERATION_BATCH_INSERT, resources=[
+                {'owner': OWNER, 'files': {}, 'metadata': {'titles': {'no': 'Batch'}}}])
+            self.assertEqual(status_code, http.HTTPStatus.OK, 'Batch not written')
+            status_code, body = self.handle(request_handler, Constants.OPERATION_LIST_BY_OWNER, owner=OWNER)
+            self.assertEqual(status_code, http.HTTPStatus.OK, 'Resources not listed')
+            self.assertEqual(len(json.loads(body)[Constants.JSON_ATTRIBUTE_NAME_RESOURCES]), 2,
+                             'Unexpected latest versions')
+
+    def test_batch_modify_conflict_keeps_current_version(self):
+        storage = MemoryStorage()
+        request_handler = self.request_handler(storage)
+        other_request_handler = self.request_handler(storage)
+        _, body = self.handle(request_handler, Constants.OPERATION_INSERT,
+                              resource={'owner': OWNER, 'files': {}, 'metadata': {'titles': {'no': 'Første'}}})
+        resource = {'resource_identifier': json.loads(body)['resource_identifier'], 'owner': OWNER, 'files': {},
+                    'metadata': {'titles': {'no': 'Andre'}}}
+        modify = storage.modify
+
+        def racing_modify(item, expected_modified_date, idempotency=None):
+            storage.modify = modify
+            self.handle(other_request_handler, Constants.OPERATION_MODIFY, resource=dict(resource, metadata={
+                'titles': {'no': 'Samtidig'}}))
+            return modify(item, expected_modified_date, idempotency)
+
+        storage.modify = racing_modify
+        status_code, body = self.handle(request_handler, Constants.OPERATION_BATCH_MODIFY, resources=[resource])
+        self.assertEqual(status_code, http.HTTPStatus.OK, 'Batch not answered')
+        self.assertEqual(json.loads(body)[Constants.JSON_ATTRIBUTE_NAME_RESULTS][0][
+            Constants.JSON_ATTRIBUTE_NAME_STATUS_CODE], http.HTTPStatus.CONFLICT, 'Conflict not reported')
+        versions, _ = storage.query(resource['resource_identifier'])
+        self.assertEqual([Constants.DDB_FIELD_SUPERSEDED_DATE in item for item in versions], [True, False],
+                         'Current version superseded by a failed modification')
+        self.assertEqual(len(storage.query_owner(OWNER)[0]), 1, 'Resource not listed by owner')
+
+    def test_batch_modify_partial_failure(self):
+        from botocore.exceptions import ClientError
+        from classes.BoundedExecutor import BoundedExecutor
+        from classes.RequestHandler import RequestHandler
+        storage = MemoryStorage()
+        executor = BoundedExecutor(4, timeout=0.05)
+        self.addCleanup(executor.shutdown)
+        request_handler = RequestHandler(storage=storage, executor=executor)
+        resources = []
+        for title in ('Første', 'Andre', 'Tredje'):
+            _, body = self.handle(request_handler, Constants.OPERATION_INSERT,
+                                  resource={'owner': OWNER, 'files': {}, 'metadata': {'titles': {'no': title}}})
+            resources.append({'resource_identifier': json.loads(body)['resource_identifier'], 'owner': OWNER,
+                              'files': {}, 'metadata': {'titles': {'no': title + ' endret'}}})
+        modify = storage.modify
+
+        def failing_modify(item, expected_modified_date, idempotency=None):
+            if item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER] == resources[1]['resource_identifier']:
+                raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}},
+                                  'TransactWriteItems')
+            if item[Constants.DDB_FIELD_RESOURCE_IDENTIFIER] == resources[2]['resource_identifier']:
+                time.sleep(0.2)
+            return modify(item, expected_modified_date, idempotency)
+
+        storage.modify = failing_modify
+        status_code, body = self.handle(request_handler, Constants.OPERATION_BATCH_MODIFY, resources=resources)
+        self.assertEqual(status_code, http.HTTPStatus.OK, 'Batch not answered')
+        self.assertEqual([result[Constants.JSON_ATTRIBUTE_NAME_STATUS_CODE] for result in json.loads(body)[
+            Constants.JSON_ATTRIBUTE_NAME_RESULTS]], [http.HTTPStatus.OK, http.HTTPStatus.SERVICE_UNAVAILABLE,
+                                                      http.HTTPStatus.SERVICE_UNAVAILABLE],
+                         'Failures not reported per modification')
+        self.assertEqual(len(storage.query(resources[0]['resource_identifier'])[0]), 2, 'Modification not written')
+        self.assertEqual(len(storage.query(resources[1]['resource_identifier'])[0]), 1, 'Failed modification written')
+
+    def test_unknown_storage_engine(self):
+        from classes.RequestHandler import create_storage
+        with self.assertRaises(ValueError):
+            create_storage('unknown', None, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import http
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+from decimal import Decimal
+
+from boto3.dynamodb.types import Binary
+
+from classes.FileBlobStore import FileBlobStore
+from classes.StorageCodec import StorageCodec, item_size
+from common.constants import Constants
+from common.exceptions import BlobError
+
+METADATA = {
+    'titles': {
+        'no': 'En tittel',
+        'en': 'A title'
+    },
+    'creators': ['AUTHORITY_IDENTIFIER_' + str(counter) for counter in range(50)],
+    'publicationYear': '2019'
+}
+
+
+class TestStorageCodecCase(unittest.TestCase):
+
+    def test_encode_item_above_threshold(self):
+        codec = StorageCodec(64)
+        item = {'resource_identifier': 'a', 'metadata': METADATA, 'files': {}, 'owner': 'owner@unit.no'}
+        encoded_item = codec.encode_item(item)
+        self.assertIsInstance(encoded_item['metadata'], Binary, 'Metadata not compressed')
+        self.assertTrue(encoded_item['metadata'].value.startswith(Constants.COMPRESSION_FORMAT_MARKER),
+                        'Format marker missing')
+        self.assertEqual(encoded_item['files'], {}, 'Small attribute compressed')
+        self.assertEqual(item['metadata'], METADATA, 'Original item modified')
+        self.assertLess(item_size(encoded_item), item_size(item), 'Item not smaller')
+        self.assertEqual(codec.decode_item(encoded_item), item, 'Item not restored')
+
+    def test_encode_item_disabled(self):
+        codec = StorageCodec(0)
+        item = {'resource_identifier': 'a', 'metadata': METADATA}
+        self.assertIs(codec.encode_item(item), item, 'Item encoded with compression disabled')
+        encoded_item = StorageCodec(64).encode_item(item)
+        self.assertEqual(codec.decode_item(encoded_item), item, 'Compressed item not decoded')
+
+    def test_decode_restores_numbers_as_decimal(self):
+        codec = StorageCodec(1)
+        encoded_item = codec.encode_item({'metadata': {'count': Decimal('3'), 'ratio': Decimal('0.5')}})
+        self.assertEqual(codec.decode_item(encoded_item), {'metadata': {'count': Decimal('3'),
+                                                                        'ratio': Decimal('0.5')}},
+                         'Numbers not restored')
+
+    def test_decode_leaves_unmarked_binary(self):
+        codec = StorageCodec(1)
+        value = Binary(zlib.compress(b'{}'))
+        self.assertEqual(codec.decode_item({'metadata': value}), {'metadata': value}, 'Unmarked binary decoded')
+
+    def test_storage_paths(self):
+        codec = StorageCodec(1)
+        self.assertEqual(codec.storage_paths(['resource_identifier', 'metadata.titles', 'metadata.handle', 'owner']),
+                         ['resource_identifier', 'metadata', 'owner'], 'Unexpected storage paths')
+
+
+
+class TestOffloadCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.blob_store = FileBlobStore(self.root)
+
+    def blob_paths(self):
+        return [os.path.join(directory, name) for directory, _, names in os.walk(self.root) for name in names]
+
+    def test_offload_above_threshold(self):
+        codec = StorageCodec(64, blob_store=self.blob_store, offload_threshold=256)
+        item = {'resource_identifier': 'a', 'metadata': METADATA, 'files': {'a': {'name': 'file.pdf'}}}
+        encoded_item = codec.encode_item(item)
+        self.assertTrue(encoded_item['metadata'].value.startswith(Constants.OFFLOAD_FORMAT_MARKER),
+                        'Metadata not offloaded')
+        self.assertEqual(encoded_item['files'], item['files'], 'Small attribute offloaded')
+        self.assertLess(item_size(encoded_item), 128, 'Pointer item not small')
+        self.assertEqual(len(self.blob_paths()), 1, 'Unexpected blobs')
+        self.assertEqual(codec.decode_item(encoded_item), item, 'Item not restored')
+
+    def test_unchanged_values_share_a_blob(self):
+        codec = StorageCodec(blob_store=self.blob_store, offload_threshold=1)
+        first_item = codec.encode_item({'metadata': METADATA})
+        reordered = dict(reversed(list(METADATA.items())))
+        self.assertEqual(codec.encode_item({'metadata': reordered}), first_item, 'Equal values not shared')
+        codec.encode_item({'metadata': {'titles': {}}})
+        self.assertEqual(len(self.blob_paths()), 2, 'Unexpected blobs')
+
+    def test_blob_errors(self):
+        codec = StorageCodec(blob_store=self.blob_store, offload_threshold=1)
+        encoded_item = codec.encode_item({'metadata': METADATA})
+        with self.assertRaises(BlobError):
+            StorageCodec().decode_item(encoded_item)
+        blob_path = self.blob_paths()[0]
+        with open(blob_path, 'wb') as blob_file:
+            blob_file.write(zlib.compress(json.dumps({'titles': {}}).encode('utf-8')))
+        with self.assertRaises(BlobError):
+            codec.decode_item(encoded_item)
+        os.unlink(blob_path)
+        with self.assertRaises(BlobError):
+            codec.decode_item(encoded_item)
+        with self.assertRaises(ValueError):
+            StorageCodec(offload_threshold=1)
+
+    def test_projection_does_not_read_blobs(self):
+        from classes.MemoryStorage import MemoryStorage
+        from classes.RequestHandler import RequestHandler
+        request_handler = RequestHandler(storage=MemoryStorage(), codec=StorageCodec(
+            blob_store=self.blob_store, offload_threshold=64))
+        insert_response = request_handler.handler({'body': json.dumps({
+            Constants.JSON_ATTRIBUTE_NAME_OPERATION: Constants.OPERATION_INSERT,
+            Constants.JSON_ATTRIBUTE_NAME_RESOURCE: {'owner': 'owner@unit.no', 'files': {}, 'metadata': METADATA}
+        })}, None)
+        resource_identifier = json.loads(insert_response[Constants.RESPONSE_BODY])['resource_identifier']
+        request_handler.cache.clear()
+        get_response = request_handler.handler({'body': json.dumps({
+            Constants.JSON_ATTRIBUTE_NAME_OPERATION: Constants.OPERATION_GET,
+            Constants.JSON_ATTRIBUTE_NAME_RESOURCE: {'resource_identifier': resource_identifier}
+        })}, None)
+        self.assertEqual(json.loads(get_response[Constants.RESPONSE_BODY])['metadata']['creators'],
+                         METADATA['creators'], 'Metadata not rehydrated')
+        shutil.rmtree(self.root)
+        os.makedirs(self.root)
+        request_handler.cache.clear()
+        get_response = request_handler.handler({'body': json.dumps({
+            Constants.JSON_ATTRIBUTE_NAME_OPERATION: Constants.OPERATION_GET,
+            Constants.JSON_ATTRIBUTE_NAME_RESOURCE: {'resource_identifier': resource_identifier},
+            Constants.JSON_ATTRIBUTE_NAME_FIELDS: ['owner']
+        })}, None)
+        self.assertEqual(get_response[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.OK,
+                         'Blob read for an unrequested attribute')
+        with self.assertRaises(BlobError):
+            request_handler.get_resource(resource_identifier)
+
+
+if __name__ == '__main__':
+    unittest.main()
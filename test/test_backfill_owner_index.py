@@ -0,0 +1,70 @@
+import os
+import unittest
+
+import boto3
+from moto import mock_dynamodb2
+
+from classes.RequestHandler import RequestHandler
+from common.constants import Constants
+from tools.backfill_owner_index import backfill, create_owner_index
+
+OWNER = 'owner@unit.no'
+
+
+@mock_dynamodb2
+class TestBackfillOwnerIndex(unittest.TestCase):
+
+    def setUp(self):
+        os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+        os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+        os.environ['AWS_SECURITY_TOKEN'] = 'testing'
+        os.environ['AWS_SESSION_TOKEN'] = 'testing'
+        os.environ[Constants.ENV_VAR_TABLE_NAME] = 'testing'
+        os.environ[Constants.ENV_VAR_REGION] = 'eu-west-1'
+        self.dynamodb = boto3.resource('dynamodb', region_name=os.environ[Constants.ENV_VAR_REGION])
+        self.table = self.dynamodb.create_table(
+            TableName=os.environ[Constants.ENV_VAR_TABLE_NAME],
+            KeySchema=[{'AttributeName': 'resource_identifier', 'KeyType': 'HASH'},
+                       {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'resource_identifier', 'AttributeType': 'S'},
+                                  {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+            ProvisionedThroughput={'ReadCapacityUnits': 1, 'WriteCapacityUnits': 1})
+        for resource in range(3):
+            for version in range(resource + 1):
+                item = {
+                    'resource_identifier': 'resource-' + str(resource),
+                    'modifiedDate': '2019-10-25T12:57:02.%06dZ' % version,
+                    'createdDate': '2019-10-25T12:57:02.000000Z',
+                    'metadata': {'titles': {'no': 'En tittel ' + str(version)}},
+                    'files': {},
+                    'owner': OWNER
+                }
+                if version < resource:
+                    item['supersededDate'] = '2019-10-25T12:57:02.%06dZ' % (version + 1)
+                self.table.put_item(Item=item)
+
+    def tearDown(self):
+        self.table.delete()
+
+    def test_backfill(self):
+        self.assertTrue(create_owner_index(self.table), 'Index not created')
+        self.assertFalse(create_owner_index(self.table), 'Index created twice')
+        request_handler = RequestHandler(self.dynamodb)
+        self.assertEqual(request_handler.query_by_owner(OWNER, page_size=10)[0], [], 'Resources listed before backfill')
+
+        self.assertEqual(backfill(self.table, dry_run=True), {'resources': 3, 'backfilled': 3, 'skipped': 0},
+                         'Unexpected statistics')
+        self.assertEqual(backfill(self.table), {'resources': 3, 'backfilled': 3, 'skipped': 0},
+                         'Unexpected statistics')
+        items = self.table.scan()[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]
+        self.assertEqual(sorted(item['modifiedDate'] for item in items if Constants.DDB_FIELD_LATEST_OWNER in item),
+                         sorted(item['modifiedDate'] for item in items if 'supersededDate' not in item),
+                         'Superseded versions backfilled')
+        owned, _ = request_handler.query_by_owner(OWNER, page_size=10)
+        self.assertEqual(sorted(item['resource_identifier'] for item in owned),
+                         ['resource-0', 'resource-1', 'resource-2'], 'Backfilled resources not listed')
+        self.assertEqual(backfill(self.table)['backfilled'], 0, 'Backfill not idempotent')
+
+
+if __name__ == '__main__':
+    unittest.main()
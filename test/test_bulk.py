@@ -0,0 +1,184 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import boto3
+from moto import mock_dynamodb2
+
+from common.constants import Constants
+
+OWNER = 'owner@unit.no'
+
+
+def request_body(operation, resource):
+    return {'body': json.dumps({Constants.JSON_ATTRIBUTE_NAME_OPERATION: operation,
+                                Constants.JSON_ATTRIBUTE_NAME_RESOURCE: resource})}
+
+
+def read_lines(directory):
+    from tools.bulk import input_paths
+    lines = []
+    for path in input_paths(directory):
+        with open(path, encoding='utf-8') as export_file:
+            lines.extend(json.loads(line) for line in export_file)
+    return lines
+
+
+def version_order(line):
+    return line['resource_identifier'], line['modifiedDate']
+
+
+@mock_dynamodb2
+class TestBulk(unittest.TestCase):
+
+    def setUp(self):
+        os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+        os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+        os.environ['AWS_SECURITY_TOKEN'] = 'testing'
+        os.environ['AWS_SESSION_TOKEN'] = 'testing'
+        os.environ[Constants.ENV_VAR_TABLE_NAME] = 'testing'
+        os.environ[Constants.ENV_VAR_REGION] = 'eu-west-1'
+        self.dynamodb = boto3.resource('dynamodb', region_name=os.environ[Constants.ENV_VAR_REGION])
+        self.table = self.dynamodb.create_table(
+            TableName=os.environ[Constants.ENV_VAR_TABLE_NAME],
+            KeySchema=[{'AttributeName': 'resource_identifier', 'KeyType': 'HASH'},
+                       {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'resource_identifier', 'AttributeType': 'S'},
+                                  {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+            ProvisionedThroughput={'ReadCapacityUnits': 1, 'WriteCapacityUnits': 1})
+        self.addCleanup(self.table.delete)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        from classes.RequestHandler import RequestHandler
+        self.request_handler = RequestHandler(self.dynamodb, versioning_mode=Constants.VERSIONING_MODE_DELTA,
+                                              snapshot_interval=2)
+        self.resource_identifiers = []
+        for counter in range(5):
+            resource = {'owner': OWNER, 'files': {}, 'metadata': {'titles': {'no': 'Tittel ' + str(counter)}}}
+            insert_response = self.request_handler.handler(request_body(Constants.OPERATION_INSERT, resource), None)
+            resource['resource_identifier'] = json.loads(insert_response[Constants.RESPONSE_BODY])[
+                'resource_identifier']
+            for version in range(counter):
+                resource['metadata'] = {'titles': {'no': 'Tittel ' + str(counter)}, 'handle': str(version)}
+                self.request_handler.handler(request_body(Constants.OPERATION_MODIFY, resource), None)
+            self.resource_identifiers.append(resource['resource_identifier'])
+
+    def export_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_export_and_import(self):
+        from classes.MemoryStorage import MemoryStorage
+        from classes.SqliteStorage import SqliteStorage
+        from classes.RequestHandler import RequestHandler
+        from tools.bulk import export, import_files
+        # moto ignores Segment and TotalSegments, so every segment would scan the whole table
+        statistics = export(self.request_handler, self.export_path('all'), segments=1)
+        self.assertEqual(statistics['resources'], 5, 'Unexpected number of resources')
+        self.assertEqual(statistics['versions'], 15, 'Unexpected number of versions')
+        lines = read_lines(self.export_path('all'))
+        self.assertEqual(len(lines), 15, 'Unexpected number of lines')
+        self.assertTrue(all(Constants.DDB_FIELD_DELTA not in line and 'supersededDate' not in line for line in lines),
+                        'Storage attributes exported')
+        self.assertEqual(lines[-1]['metadata'], self.request_handler.get_resource(lines[-1]['resource_identifier'])[
+            'metadata'], 'Delta not rebuilt')
+
+        export(self.request_handler, self.export_path('latest'), segments=1, latest_only=True)
+        latest_lines = read_lines(self.export_path('latest'))
+        self.assertEqual(sorted(line['resource_identifier'] for line in latest_lines),
+                         sorted(self.resource_identifiers), 'Not every resource exported')
+        self.assertEqual({line['resource_identifier']: line['metadata'] for line in latest_lines},
+                         {resource_identifier: self.request_handler.get_resource(resource_identifier)['metadata']
+                          for resource_identifier in self.resource_identifiers}, 'Latest versions not exported')
+
+        imported_handler = RequestHandler(storage=MemoryStorage())
+        statistics = import_files(imported_handler, self.export_path('all'), max_writes_per_second=1000)
+        self.assertEqual(statistics['versions'], 15, 'Versions not imported')
+        for resource_identifier in self.resource_identifiers:
+            imported_versions = imported_handler.query_versions(resource_identifier)[0]
+            original_versions = self.request_handler.query_versions(resource_identifier)[0]
+            self.assertEqual([item['metadata'] for item in imported_versions],
+                             [item['metadata'] for item in original_versions], 'Versions not restored')
+            self.assertEqual(['supersededDate' in item for item in imported_versions],
+                             [True] * (len(imported_versions) - 1) + [False], 'Versions not superseded')
+        owned, _ = imported_handler.query_by_owner(OWNER, page_size=10)
+        self.assertEqual(len(owned), 5, 'Latest versions not owned')
+
+        for storage in (imported_handler.storage, SqliteStorage()):
+            storage_handler = RequestHandler(storage=storage)
+            if storage is not imported_handler.storage:
+                import_files(storage_handler, self.export_path('all'))
+            directory = self.export_path(storage.__class__.__name__)
+            statistics = export(storage_handler, directory, segments=3)
+            self.assertEqual((statistics['resources'], statistics['versions']), (5, 15),
+                             'Unexpected statistics of ' + storage.__class__.__name__)
+            self.assertEqual(sorted(read_lines(directory), key=version_order),
+                             sorted(lines, key=version_order), 'Export of ' + storage.__class__.__name__ + ' differs')
+
+    def test_interrupted_runs_resume(self):
+        from classes.MemoryStorage import MemoryStorage
+        from classes.RequestHandler import RequestHandler
+        from tools import bulk
+        checkpoint_path = self.export_path('export.json')
+        exported_versions = bulk.exported_versions
+        calls = []
+
+        def interrupted(*arguments):
+            calls.append(arguments)
+            if len(calls) == 4:
+                raise KeyboardInterrupt
+            return exported_versions(*arguments)
+
+        with mock.patch.object(Constants, 'BULK_CHECKPOINT_INTERVAL', 2):
+            with mock.patch('tools.bulk.exported_versions', side_effect=interrupted):
+                with self.assertRaises(KeyboardInterrupt):
+                    bulk.export(self.request_handler, self.export_path('resumed'), segments=1,
+                                checkpoint_path=checkpoint_path)
+            statistics = bulk.export(self.request_handler, self.export_path('resumed'), segments=1,
+                                     checkpoint_path=checkpoint_path)
+        self.assertEqual(statistics['resources'], 5, 'Resources exported twice or skipped')
+        bulk.export(self.request_handler, self.export_path('complete'), segments=1)
+        self.assertEqual(read_lines(self.export_path('resumed')), read_lines(self.export_path('complete')),
+                         'Resumed export differs')
+
+        import_checkpoint_path = self.export_path('import.json')
+        imported_handler = RequestHandler(storage=MemoryStorage())
+        statistics = bulk.import_files(imported_handler, self.export_path('complete'),
+                                       checkpoint_path=import_checkpoint_path)
+        with mock.patch.object(imported_handler, 'write_items') as write_items:
+            self.assertEqual(bulk.import_files(imported_handler, self.export_path('complete'),
+                                               checkpoint_path=import_checkpoint_path), statistics,
+                             'Completed file imported again')
+        write_items.assert_not_called()
+
+    def test_unprocessed_items_fail_the_file(self):
+        from classes.MemoryStorage import MemoryStorage
+        from classes.RequestHandler import RequestHandler
+        from common.exceptions import UnprocessedItemsError
+        from tools.bulk import export, import_files
+        export(self.request_handler, self.export_path('all'), segments=1)
+        checkpoint_path = self.export_path('import.json')
+        imported_handler = RequestHandler(storage=MemoryStorage())
+        with mock.patch.object(imported_handler.storage, 'write_items', side_effect=lambda items: items[:1]):
+            with self.assertRaises(UnprocessedItemsError):
+                import_files(imported_handler, self.export_path('all'), checkpoint_path=checkpoint_path)
+        statistics = import_files(imported_handler, self.export_path('all'), checkpoint_path=checkpoint_path)
+        self.assertEqual(statistics['versions'], 15, 'Unprocessed versions not imported again')
+        for resource_identifier in self.resource_identifiers:
+            self.assertEqual(imported_handler.get_resource(resource_identifier)['metadata'],
+                             self.request_handler.get_resource(resource_identifier)['metadata'],
+                             'Unprocessed versions lost')
+
+    def test_invalid_lines_are_rejected(self):
+        from tools.bulk import import_files
+        path = self.export_path('invalid.ndjson')
+        with open(path, 'w', encoding='utf-8') as ndjson_file:
+            ndjson_file.write(json.dumps({'resource_identifier': 'a', 'owner': OWNER, 'files': {}}) + '\n')
+        with self.assertRaises(ValueError):
+            import_files(self.request_handler, path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from moto import mock_dynamodb2
+
+from common.constants import Constants
+from common.retention import expired_versions
+from tools.compaction import compact
+
+NOW = datetime(2020, 1, 1, tzinfo=timezone.utc)
+PUBLISHED_RESOURCE_IDENTIFIER = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+DELTA_RESOURCE_IDENTIFIER = 'acf20333-35a5-4a06-9c58-68ea688a9a9c'
+
+
+def version(modified_date, status=None, delta=False, resource_identifier=PUBLISHED_RESOURCE_IDENTIFIER):
+    item = {
+        'resource_identifier': resource_identifier,
+        'modifiedDate': modified_date,
+        'createdDate': '2019-01-01T00:00:00.000000Z',
+        'owner': 'owner@unit.no'
+    }
+    if status is not None:
+        item['status'] = status
+    if delta:
+        item['delta'] = {'metadata': {'set': {'handle': modified_date}, 'remove': []}}
+    else:
+        item['metadata'] = {'titles': {'no': 'En tittel'}, 'handle': modified_date}
+        item['files'] = {}
+    return item
+
+
+@mock_dynamodb2
+class TestCompaction(unittest.TestCase):
+
+    def setUp(self):
+        os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+        os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+        os.environ['AWS_SECURITY_TOKEN'] = 'testing'
+        os.environ['AWS_SESSION_TOKEN'] = 'testing'
+        os.environ[Constants.ENV_VAR_TABLE_NAME] = 'testing'
+        os.environ[Constants.ENV_VAR_REGION] = 'eu-west-1'
+        self.dynamodb = boto3.resource('dynamodb', region_name=os.environ[Constants.ENV_VAR_REGION])
+        self.table = self.dynamodb.create_table(
+            TableName=os.environ[Constants.ENV_VAR_TABLE_NAME],
+            KeySchema=[{'AttributeName': 'resource_identifier', 'KeyType': 'HASH'},
+                       {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'resource_identifier', 'AttributeType': 'S'},
+                                  {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+            ProvisionedThroughput={'ReadCapacityUnits': 1, 'WriteCapacityUnits': 1})
+        with self.table.batch_writer() as batch:
+            for month in range(1, 13):
+                batch.put_item(Item=version('2019-%02d-01T00:00:00.000000Z' % month,
+                                            'published' if month == 2 else 'draft'))
+            for month in range(1, 13):
+                batch.put_item(Item=version('2019-%02d-01T00:00:00.000000Z' % month, delta=month % 4 != 1,
+                                            resource_identifier=DELTA_RESOURCE_IDENTIFIER))
+            for counter in range(30):
+                batch.put_item(Item=version('2019-06-01T00:00:00.000000Z',
+                                            resource_identifier='resource-' + str(counter)))
+
+    def tearDown(self):
+        self.table.delete()
+
+    def modified_dates(self, resource_identifier):
+        items = self.table.query(
+            KeyConditionExpression=Key(Constants.DDB_FIELD_RESOURCE_IDENTIFIER).eq(resource_identifier)
+        )[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]
+        return [int(item[Constants.DDB_FIELD_MODIFIED_DATE][5:7]) for item in items]
+
+    def test_expired_versions(self):
+        versions = [version('2019-%02d-01T00:00:00.000000Z' % month, delta=month % 4 != 1) for month in range(1, 13)]
+        self.assertEqual([int(item['modifiedDate'][5:7]) for item in expired_versions(versions, keep_versions=2)],
+                         [1, 2, 3, 4, 5, 6, 7, 8], 'Delta chain of kept versions not kept')
+        self.assertEqual(len(expired_versions(versions, cutoff='2019-06-15T00:00:00.000000Z')), 4,
+                         'Versions newer than cutoff not kept')
+        self.assertEqual(expired_versions(versions[:1], keep_versions=1), [], 'Latest version expired')
+        with self.assertRaises(ValueError):
+            expired_versions(versions)
+
+    def test_compaction(self):
+        # moto ignores Segment and TotalSegments, so every segment would scan the whole table
+        table_name = os.environ[Constants.ENV_VAR_TABLE_NAME]
+        statistics = compact(self.dynamodb, table_name, keep_versions=3, segments=1, dry_run=True, now=NOW)
+        self.assertEqual(statistics['resources'], 32, 'Unexpected number of resources')
+        self.assertEqual(statistics['versions'], 54, 'Unexpected number of versions')
+        self.assertEqual(statistics['expired'], 8 + 8, 'Unexpected number of expired versions')
+        self.assertGreater(statistics['reclaimed_bytes'], 0, 'Reclaimed bytes not reported')
+        self.assertEqual(len(self.modified_dates(PUBLISHED_RESOURCE_IDENTIFIER)), 12, 'Dry run deleted versions')
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint_path = os.path.join(directory, 'checkpoint.json')
+            statistics = compact(self.dynamodb, table_name, keep_versions=3, keep_days=200, segments=1,
+                                 checkpoint_path=checkpoint_path, max_deletes_per_second=1000, now=NOW)
+            self.assertEqual(statistics['unprocessed'], 0, 'Deletes not processed')
+            self.assertEqual(self.modified_dates(PUBLISHED_RESOURCE_IDENTIFIER), [2, 7, 8, 9, 10, 11, 12],
+                             'Unexpected versions kept')
+            self.assertEqual(self.modified_dates(DELTA_RESOURCE_IDENTIFIER), [5, 6, 7, 8, 9, 10, 11, 12],
+                             'Unexpected versions kept')
+            with open(checkpoint_path, encoding='utf-8') as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+            self.assertTrue(all(segment['done'] for segment in checkpoint.values()), 'Segments not completed')
+
+            self.table.put_item(Item=version('2018-01-01T00:00:00.000000Z'))
+            resumed_statistics = compact(self.dynamodb, table_name, keep_versions=3, segments=1,
+                                         checkpoint_path=checkpoint_path, now=NOW)
+            self.assertEqual(resumed_statistics, statistics, 'Completed segments scanned again')
+            self.assertIn(2018, [int(item['modifiedDate'][:4]) for item in self.table.scan()['Items']],
+                          'Completed segments compacted again')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import unittest
+
+from common.encoders import encode_resource, encode_metadata, encode_files, iterencode_resource
+from data.creator import Creator
+from data.file_metadata import FileMetadata
+from data.metadata import Metadata
+from data.resource import Resource
+
+
+def generate_resource(file_count):
+    files = {'FILE_IDENTIFIER_' + str(counter): FileMetadata('fil.pdf', 'application/pdf', None, str(counter))
+             for counter in range(file_count)}
+    metadata = Metadata([Creator('AUTHORITY_IDENTIFIER_1')], None, 'LICENSE_IDENTIFIER_1', 2019, None,
+                        {'no': 'En tittel', 'en': None}, 'text')
+    return Resource('ebf20333', '2019-10-25T12:57:02.655994Z', '2019-10-24T12:57:02.655994Z', metadata, files,
+                    'owner@unit.no', 'draft')
+
+
+class TestEncodersCase(unittest.TestCase):
+
+    def test_encode_resource(self):
+        self.assertEqual(encode_resource(generate_resource(1)), {
+            'resource_identifier': 'ebf20333',
+            'modifiedDate': '2019-10-25T12:57:02.655994Z',
+            'createdDate': '2019-10-24T12:57:02.655994Z',
+            'metadata': {
+                'creators': ['AUTHORITY_IDENTIFIER_1'],
+                'license': 'LICENSE_IDENTIFIER_1',
+                'publicationYear': 2019,
+                'titles': {'no': 'En tittel'},
+                'type': 'text'
+            },
+            'files': {'FILE_IDENTIFIER_0': {'filename': 'fil.pdf', 'mimetype': 'application/pdf', 'size': '0'}},
+            'owner': 'owner@unit.no',
+            'status': 'draft'
+        }, 'Unexpected encoding')
+
+    def test_none_values(self):
+        self.assertIsNone(encode_resource(None), 'None not encoded as None')
+        self.assertIsNone(encode_files(None), 'None not encoded as None')
+        self.assertEqual(encode_metadata(Metadata(titles={'en': None})), {}, 'Empty titles not left out')
+        self.assertEqual(encode_resource(Resource()), {}, 'Empty resource not encoded as empty object')
+        with self.assertRaises(TypeError):
+            encode_files({'FILE_IDENTIFIER_1': None})
+        with self.assertRaises(TypeError):
+            encode_metadata(Metadata(creators=['AUTHORITY_IDENTIFIER_1']))
+
+    def test_iterencode_resource(self):
+        for file_count in (0, 1, 3, 7):
+            resource = generate_resource(file_count)
+            chunks = list(iterencode_resource(resource, chunk_size=2))
+            self.assertEqual(json.loads(''.join(chunks)), encode_resource(resource), 'Unexpected streamed JSON')
+        self.assertEqual(json.loads(''.join(iterencode_resource(Resource(files={})))), {'files': {}},
+                         'Unexpected streamed JSON')
+        self.assertEqual(json.loads(''.join(iterencode_resource(Resource('ebf20333')))),
+                         {'resource_identifier': 'ebf20333'}, 'Unexpected streamed JSON')
+        with self.assertRaises(TypeError):
+            list(iterencode_resource(Resource(files='fil.pdf')))
+
+
+if __name__ == '__main__':
+    unittest.main()
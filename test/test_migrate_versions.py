@@ -0,0 +1,116 @@
+import http
+import json
+import os
+import unittest
+
+import boto3
+from moto import mock_dynamodb2
+
+from classes.RequestHandler import RequestHandler
+from common.constants import Constants
+from tools.migrate_versions import migrate
+
+RESOURCE_IDENTIFIER = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+
+
+def stored_items(request_handler):
+    return request_handler.get_table_connection().scan()[Constants.DDB_RESPONSE_ATTRIBUTE_NAME_ITEMS]
+
+
+def history(request_handler):
+    return [(version[Constants.DDB_FIELD_MODIFIED_DATE], version[Constants.DDB_FIELD_METADATA],
+             version[Constants.DDB_FIELD_FILES])
+            for version in request_handler.iterate_versions(RESOURCE_IDENTIFIER, page_size=3)]
+
+
+@mock_dynamodb2
+class TestMigrateVersions(unittest.TestCase):
+
+    def setUp(self):
+        os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+        os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+        os.environ['AWS_SECURITY_TOKEN'] = 'testing'
+        os.environ['AWS_SESSION_TOKEN'] = 'testing'
+        os.environ[Constants.ENV_VAR_TABLE_NAME] = 'testing'
+        os.environ[Constants.ENV_VAR_REGION] = 'eu-west-1'
+        self.dynamodb = boto3.resource('dynamodb', region_name=os.environ[Constants.ENV_VAR_REGION])
+        table_connection = self.dynamodb.create_table(
+            TableName=os.environ[Constants.ENV_VAR_TABLE_NAME],
+            KeySchema=[{'AttributeName': 'resource_identifier', 'KeyType': 'HASH'},
+                       {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'resource_identifier', 'AttributeType': 'S'},
+                                  {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+            ProvisionedThroughput={'ReadCapacityUnits': 1, 'WriteCapacityUnits': 1})
+        for counter in range(7):
+            table_connection.put_item(
+                Item={
+                    'resource_identifier': RESOURCE_IDENTIFIER,
+                    'modifiedDate': '2019-10-25T12:57:02.%06dZ' % counter,
+                    'createdDate': '2019-10-25T12:57:02.000000Z',
+                    'metadata': {
+                        'titles': {
+                            'no': 'En tittel ' + str(counter // 2)
+                        },
+                        'publisher': 'Unit'
+                    },
+                    'files': {'FILE_IDENTIFIER_' + str(file_counter): {'filename': 'fil.pdf'}
+                              for file_counter in range(counter % 3)},
+                    'owner': 'owner@unit.no'
+                }
+            )
+
+    def tearDown(self):
+        self.dynamodb.Table(os.environ[Constants.ENV_VAR_TABLE_NAME]).delete()
+
+    def test_migrate_to_delta_and_back(self):
+        request_handler = RequestHandler(self.dynamodb, versioning_mode=Constants.VERSIONING_MODE_DELTA,
+                                         snapshot_interval=3)
+        full_history = history(request_handler)
+
+        statistics = migrate(request_handler, dry_run=True)
+        self.assertEqual(statistics['rewritten'], 7, 'Unexpected number of versions to rewrite')
+        self.assertTrue(all(Constants.DDB_FIELD_DELTA not in item for item in stored_items(request_handler)),
+                        'Dry run wrote versions')
+
+        statistics = migrate(request_handler)
+        self.assertEqual(statistics, {'resources': 1, 'rewritten': 7, 'unprocessed': 0}, 'Unexpected statistics')
+        items = stored_items(request_handler)
+        self.assertEqual([Constants.DDB_FIELD_DELTA in item for item in items],
+                         [False, True, True, False, True, True, False], 'History not delta-encoded')
+        self.assertEqual(history(request_handler), full_history, 'History changed by migration')
+        self.assertEqual(migrate(request_handler)['rewritten'], 0, 'Migration not idempotent')
+
+        request_handler = RequestHandler(self.dynamodb, versioning_mode=Constants.VERSIONING_MODE_FULL)
+        self.assertEqual(migrate(request_handler)['rewritten'], 7, 'Unexpected number of versions to rewrite')
+        items = stored_items(request_handler)
+        self.assertTrue(all(Constants.DDB_FIELD_DELTA not in item and Constants.DDB_FIELD_VERSION_NUMBER not in item
+                            for item in items), 'History not rewritten to full copies')
+        self.assertEqual(history(request_handler), full_history, 'History changed by migration')
+
+    def test_legacy_versions_are_superseded(self):
+        request_handler = RequestHandler(self.dynamodb, versioning_mode=Constants.VERSIONING_MODE_FULL)
+        self.assertEqual(migrate(request_handler)['rewritten'], 6, 'Unexpected number of versions to rewrite')
+        items = stored_items(request_handler)
+        self.assertEqual([item.get(Constants.DDB_FIELD_SUPERSEDED_DATE) for item in items],
+                         [item[Constants.DDB_FIELD_MODIFIED_DATE] for item in items[1:]] + [None],
+                         'Legacy versions not superseded')
+        self.assertEqual(migrate(request_handler)['rewritten'], 0, 'Migration not idempotent')
+
+        event = {'body': json.dumps({
+            Constants.JSON_ATTRIBUTE_NAME_OPERATION: Constants.OPERATION_MODIFY,
+            Constants.JSON_ATTRIBUTE_NAME_EXPECTED_MODIFIED_DATE: items[-2][Constants.DDB_FIELD_MODIFIED_DATE],
+            Constants.JSON_ATTRIBUTE_NAME_RESOURCE: {
+                'resource_identifier': RESOURCE_IDENTIFIER,
+                'createdDate': items[0][Constants.DDB_FIELD_CREATED_DATE],
+                'metadata': {'titles': {'no': 'Utdatert'}},
+                'files': {},
+                'owner': 'owner@unit.no'
+            }
+        })}
+        self.assertEqual(request_handler.handler(event, None)[Constants.RESPONSE_STATUS_CODE], http.HTTPStatus.CONFLICT,
+                         'Modification of an older version accepted')
+        self.assertEqual(len(stored_items(request_handler)), 7, 'History forked')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from common.constants import Constants
+from common.exceptions import ValidationError
+from common.schema import METADATA_SCHEMA, Schema
+from common.validator import validate_resource
+from data.resource import Resource
+
+METADATA = {
+    'creators': ['AUTHORITY_IDENTIFIER_1', 'AUTHORITY_IDENTIFIER_2'],
+    'handle': 'https://hdl.handle.net/11250.1/1',
+    'license': 'LICENSE_IDENTIFIER_1',
+    'publicationYear': '2019',
+    'publisher': 'Unit',
+    'titles': {'no': 'En tittel', 'en': None},
+    'type': 'text'
+}
+
+FILES = {
+    'FILE_IDENTIFIER_1': {'filename': 'fil.pdf', 'mimetype': 'application/pdf', 'checksum': 'abc', 'size': '123'},
+    'FILE_IDENTIFIER_2': {'filename': 'fil.txt', 'size': 456}
+}
+
+
+class TestValidatorCase(unittest.TestCase):
+
+    def test_valid_resource(self):
+        resource = Resource('ebf20333', metadata=METADATA, files=FILES, owner='owner@unit.no', status='draft')
+        validate_resource(Constants.OPERATION_MODIFY, resource)
+        validate_resource(Constants.OPERATION_INSERT, resource)
+
+    def test_errors_are_collected(self):
+        metadata = dict(METADATA, creators=['AUTHORITY_IDENTIFIER_1', 2], titles='En tittel', colour='blue')
+        files = dict(FILES, FILE_IDENTIFIER_3={'filename': ['fil.pdf'], 'size': True}, FILE_IDENTIFIER_4=None)
+        resource = Resource('ebf20333', metadata=metadata, files=files, status=3)
+        with self.assertRaises(ValidationError) as context:
+            validate_resource(Constants.OPERATION_MODIFY, resource)
+        self.assertEqual(context.exception.errors, [
+            'Resource with identifier ebf20333 has no owner',
+            'Resource with identifier ebf20333 has invalid attribute type for metadata.creators[1]',
+            'Resource with identifier ebf20333 has invalid attribute type for metadata.titles',
+            'Resource with identifier ebf20333 has unknown attribute metadata.colour',
+            'Resource with identifier ebf20333 has invalid attribute type for files.FILE_IDENTIFIER_3.filename',
+            'Resource with identifier ebf20333 has invalid attribute type for files.FILE_IDENTIFIER_3.size',
+            'Resource with identifier ebf20333 has invalid attribute type for files.FILE_IDENTIFIER_4',
+            'Resource with identifier ebf20333 has invalid attribute type for status'
+        ], 'Unexpected errors')
+        self.assertIsInstance(context.exception, ValueError, 'Validation error not a ValueError')
+        self.assertEqual(context.exception.args[0], '; '.join(context.exception.errors), 'Unexpected message')
+
+    def test_existing_messages_come_first(self):
+        resource = Resource(metadata='invalid type', files={})
+        with self.assertRaises(ValidationError) as context:
+            validate_resource(Constants.OPERATION_INSERT, resource)
+        self.assertEqual(context.exception.errors, ['Resource has no owner',
+                                                    'Resource has invalid attribute type for metadata'],
+                         'Unexpected errors')
+
+    def test_schemas(self):
+        self.assertEqual(METADATA_SCHEMA.validate(METADATA), [], 'Valid metadata rejected')
+        self.assertEqual(Schema('Files', ()).validate({}), [], 'Empty object rejected')
+        self.assertEqual(METADATA_SCHEMA.validate([], 'metadata'), ['invalid attribute type for metadata'],
+                         'Wrong type accepted')
+
+
+if __name__ == '__main__':
+    unittest.main()